@@ -0,0 +1,218 @@
+"""
+Stand-ins for the network services a scan talks to
+
+- FakeGeminiClient replaces genai.Client: it answers every prompt with a
+  valid report after a configurable latency, without any API call; it can
+  also inject failures (429s, 503s) and stalled requests, and its caches
+  stand in for Gemini context caching
+- StubNVDServer is a local HTTP server speaking the NVD CVE API's response
+  format, with a configurable per-request latency; point NVDClient (or the
+  NVD_API_BASE env var) at its url
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from compaction import FILE_HEADER
+
+FILE_PATTERN = re.compile(r'^\s*' + re.escape(FILE_HEADER) + r'(.+)$', re.MULTILINE)
+
+
+class FakeAPIError(Exception):
+    """Carries an HTTP status in .code, like google.genai.errors.APIError"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f'{code} {message}')
+        self.code = code
+
+
+class FakeCaches:
+    """
+    Mimics client.caches. Entries are shared by every instance in the
+    process, as the API keeps them per project rather than per client.
+    """
+    _entries: Dict[str, Tuple[str, float]] = {}  # name -> (instructions, expiry)
+    _lock = threading.Lock()
+
+    def create(self, model: str, config: Dict[str, Any]):
+        ttl = float(str(config.get('ttl', '3600s')).rstrip('s'))
+        instructions = config['system_instruction']
+        expires_at = time.time() + ttl
+        with self._lock:
+            name = f'cachedContents/fake-{len(self._entries)}'
+            self._entries[name] = (instructions, expires_at)
+        return SimpleNamespace(name=name, expire_time=datetime.fromtimestamp(expires_at, timezone.utc))
+
+    def instructions(self, name: str) -> str:
+        with self._lock:
+            instructions, expires_at = self._entries.get(name, ('', 0.0))
+        if expires_at < time.time():
+            raise FakeAPIError(404, f'CachedContent not found: {name}')
+        return instructions
+
+
+class FakeGeminiClient:
+    """
+    Mimics client.models.generate_content(_stream). latency is paid once per
+    request, tokens_per_second (if set) for every token of the response. One
+    warning is reported for every finding_every-th file of a batch.
+
+    Of all requests, throttle_rate fail with a 429, error_rate with a 503 and
+    stall_rate hang for stall seconds before answering. Which requests fail
+    is drawn from a seeded generator, so runs are repeatable.
+
+    Responses carry usage_metadata (about 4 characters per token). With
+    prefill_tokens_per_second, every uncached input token adds latency;
+    instructions held in caches (see context_cache.py) are not paid again.
+    """
+
+    def __init__(self, latency: float = 0.0, tokens_per_second: Optional[float] = None, finding_every: int = 10,
+                 throttle_rate: float = 0.0, error_rate: float = 0.0, stall_rate: float = 0.0,
+                 stall: float = 60.0, seed: int = 0, prefill_tokens_per_second: Optional[float] = None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.finding_every = finding_every
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.models = self
+        self.caches = FakeCaches()
+        self.stats = {'requests': 0, 'prompt_chars': 0, 'throttled': 0, 'errors': 0, 'stalled': 0,
+                      'prompt_tokens': 0, 'cached_tokens': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _report(self, contents: str) -> str:
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['prompt_chars'] += len(contents)
+            draw = self._rng.random()
+        if draw < self.throttle_rate:
+            self._fail('throttled', 429, 'RESOURCE_EXHAUSTED')
+        draw -= self.throttle_rate
+        if draw < self.error_rate:
+            self._fail('errors', 503, 'UNAVAILABLE')
+        draw -= self.error_rate
+        if draw < self.stall_rate:
+            with self._lock:
+                self.stats['stalled'] += 1
+            time.sleep(self.stall)
+        paths = FILE_PATTERN.findall(contents)
+        warnings = [
+            {'file_name': path.rsplit('/', 1)[-1], 'file_path': path, 'description': 'Synthetic benchmark finding'}
+            for path in paths[::self.finding_every]
+        ]
+        return json.dumps({'directory': '', 'critical': [], 'warning': warnings, 'suggestion': []}, indent=2)
+
+    def _fail(self, counter: str, code: int, message: str) -> None:
+        with self._lock:
+            self.stats[counter] += 1
+        time.sleep(self.latency)
+        raise FakeAPIError(code, message)
+
+    def _delay(self, text: str) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return len(text) / 4 / self.tokens_per_second
+
+    def _usage(self, contents: str, config: Optional[Dict[str, Any]], text: str) -> SimpleNamespace:
+        """Token counts of a request; pays the prefill time of its uncached part"""
+        config = config or {}
+        cached = 0
+        instructions = config.get('system_instruction') or ''
+        if config.get('cached_content'):
+            cached = len(self.caches.instructions(config['cached_content'])) // 4
+        prompt_tokens = cached + (len(instructions) + len(contents)) // 4
+        with self._lock:
+            self.stats['prompt_tokens'] += prompt_tokens
+            self.stats['cached_tokens'] += cached
+        if self.prefill_tokens_per_second:
+            time.sleep((prompt_tokens - cached) / self.prefill_tokens_per_second)
+        return SimpleNamespace(prompt_token_count=prompt_tokens, cached_content_token_count=cached or None,
+                               candidates_token_count=len(text) // 4)
+
+    def generate_content(self, model: str, contents: str, config=None):
+        text = self._report(contents)
+        usage = self._usage(contents, config, text)
+        time.sleep(self.latency + self._delay(text))
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def generate_content_stream(self, model: str, contents: str, config=None):
+        text = self._report(contents)
+        usage = self._usage(contents, config, text)
+        time.sleep(self.latency)
+        chunk = 400
+        for start in range(0, len(text), chunk):
+            piece = text[start:start + chunk]
+            time.sleep(self._delay(piece))
+            # Like the API, the last chunk carries the usage of the whole response
+            yield SimpleNamespace(text=piece, usage_metadata=usage if start + chunk >= len(text) else None)
+
+
+def _cve(keyword: str, index: int) -> dict:
+    return {'cve': {
+        'id': f'CVE-2024-{int(hashlib.sha1(keyword.encode()).hexdigest()[:5], 16) + index}',
+        'descriptions': [{'lang': 'en', 'value': f'Synthetic vulnerability in {keyword}'}],
+        'metrics': {'cvssMetricV31': [{'cvssData': {'baseScore': 7.5, 'baseSeverity': 'HIGH'}}]},
+    }}
+
+
+class StubNVDServer:
+    """
+    Serves keywordSearch queries on 127.0.0.1. vulnerable_percent of the
+    keywords (chosen by hash, so runs are repeatable) get one CVE back.
+    """
+
+    def __init__(self, latency: float = 0.0, vulnerable_percent: int = 20):
+        self.latency = latency
+        self.vulnerable_percent = vulnerable_percent
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like NVD; the client's pooled session reuses connections
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub.requests += 1
+                keyword = parse_qs(urlparse(self.path).query).get('keywordSearch', [''])[0]
+                time.sleep(stub.latency)
+                bucket = int(hashlib.sha1(keyword.encode()).hexdigest(), 16) % 100
+                found = [_cve(keyword, 0)] if bucket < stub.vulnerable_percent else []
+                body = json.dumps({'resultsPerPage': len(found), 'totalResults': len(found),
+                                   'vulnerabilities': found}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/rest/json/cves/2.0'
+
+    def __enter__(self) -> 'StubNVDServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Scan benchmark
+
+Generates a synthetic project (see synthetic.py), then times Sanches.process
+against a fake Gemini client and DependencyChecker.scan_directory against a
+local stub NVD server (see fakes.py). Reported per run, as the median over
+--repeat runs:
+
+- walk, read, prescan, compact, prompt_build, llm, dependencies, merge and
+  total seconds of Sanches.process (phases overlap: the dependency audit runs
+  alongside the LLM stage, and compaction/prompt building happen inside it)
+- llm_retries, llm_timeouts, llm_hedges: how often the fake Gemini client's
+  injected failures and stalls (--llm-throttle-rate, --llm-error-rate,
+  --llm-stall-rate) made the client retry or hedge
+- llm_uncached_tokens: input tokens the fake Gemini client was sent outside
+  the context cache (--llm-context-cache-ttl; 0 resends the instructions
+  with every request)
+- dependency_scan: a separate DependencyChecker.scan_directory run
+- peak_mb: peak Python heap during one extra, traced run of both
+- import: seconds `python -X importtime -c "import sanches"` reports for
+  importing the CLI (the slowest modules are listed under 'startup')
+- noop_scan: wall time of a fresh `python sanches.py --dir ...` process on
+  the project just scanned, i.e. the no-change fast path including startup
+
+Results can be saved as a baseline and later runs compared against it; the
+exit status is 1 when any metric regressed by more than --tolerance.
+
+    python benchmarks/run.py --files 2000 --node-modules 20000 --save-baseline benchmarks/baseline.json
+    python benchmarks/run.py --files 2000 --node-modules 20000 --baseline benchmarks/baseline.json
+"""
+import argparse
+import functools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Tuple
+
+CLI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cli')
+sys.path.insert(0, CLI_DIR)
+
+from fakes import FakeGeminiClient, StubNVDServer  # noqa: E402
+from synthetic import ProjectShape, generate  # noqa: E402
+
+# Regressions smaller than this are noise, whatever the ratio
+MIN_DELTA = {'seconds': 0.005, 'mb': 1.0}
+
+
+class PhaseTimer:
+    """Accumulates wall time of wrapped callables per phase (thread-safe)"""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._restore: List[Callable[[], None]] = []
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+    def wrap(self, owner: Any, attribute: str, phase: str) -> None:
+        original = getattr(owner, attribute)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter() - started)
+
+        had_own = attribute in vars(owner)
+        setattr(owner, attribute, timed)
+        self._restore.append(lambda: setattr(owner, attribute, original) if had_own else delattr(owner, attribute))
+
+    def restore(self) -> None:
+        for undo in reversed(self._restore):
+            undo()
+        self._restore.clear()
+
+
+def make_checker(args, nvd_url: str):
+    from dependency_checker import DependencyChecker
+    from nvd_client import NVDClient, SlidingWindowLimiter
+
+    nvd = NVDClient(api_key='', base_url=nvd_url, max_workers=args.nvd_workers)
+    # The real quota would make the benchmark measure NVD's rate limit, not the scanner
+    nvd.limiter = SlidingWindowLimiter(args.nvd_rate, 1.0)
+    return DependencyChecker(nvd=nvd, audit_tools=False)
+
+
+def run_process(root: str, args, nvd_url: str) -> Dict[str, float]:
+    import sanches as sanches_module
+    from gemini_client import RetryPolicy
+    from sanches import Sanches
+
+    policy = RetryPolicy(request_timeout=args.llm_request_timeout, backoff_base=args.llm_backoff,
+                         hedge=args.llm_hedge)
+    scanner = Sanches('benchmark', concurrency=args.concurrency, batch_tokens=args.batch_tokens,
+                      dependency_checker=make_checker(args, nvd_url), retry_policy=policy,
+                      context_cache_ttl=args.llm_context_cache_ttl, read_workers=args.read_workers)
+    scanner.client = FakeGeminiClient(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second,
+                                      throttle_rate=args.llm_throttle_rate, error_rate=args.llm_error_rate,
+                                      stall_rate=args.llm_stall_rate, stall=args.llm_stall, seed=args.seed,
+                                      prefill_tokens_per_second=args.llm_prefill_tokens_per_second)
+
+    timer = PhaseTimer()
+    timer.wrap(scanner, 'collect_files', 'walk')
+    timer.wrap(scanner, 'read_files', 'read')
+    timer.wrap(scanner.prescanner, 'scan', 'prescan')
+    timer.wrap(scanner, '_build_prompt', 'prompt_build')
+    timer.wrap(scanner, 'send_to_gemini', 'llm')
+    timer.wrap(scanner, 'check_dependencies', 'dependencies')
+    timer.wrap(sanches_module, 'compact', 'compact')
+    timer.wrap(sanches_module, 'merge_reports', 'merge')
+    try:
+        started = time.perf_counter()
+        scanner.process(root, full=True)
+        total = time.perf_counter() - started
+    finally:
+        timer.restore()
+        scanner.dependency_checker.nvd.close()
+
+    phases = dict(timer.seconds)
+    # read_files walks the tree itself; report reading on its own
+    phases['read'] = phases.get('read', 0.0) - phases.get('walk', 0.0)
+    phases['total'] = total
+    for name in ('retries', 'timeouts', 'hedges'):
+        phases[f'llm_{name}'] = scanner.gemini.stats[name]
+    phases['llm_uncached_tokens'] = scanner.client.stats['prompt_tokens'] - scanner.client.stats['cached_tokens']
+    return phases
+
+
+def run_dependency_scan(root: str, args, nvd_url: str) -> float:
+    checker = make_checker(args, nvd_url)
+    started = time.perf_counter()
+    try:
+        checker.scan_directory(root, refresh=True)
+    finally:
+        checker.nvd.close()
+    return time.perf_counter() - started
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Module -> (self, cumulative) microseconds from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_import(repeat: int) -> Tuple[float, List[Dict[str, Any]]]:
+    """Median seconds to import the CLI module, and the slowest modules of the last run"""
+    env = dict(os.environ, PYTHONPATH=CLI_DIR)
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import sanches'],
+                                   env=env, capture_output=True, text=True, check=True)
+        modules = parse_importtime(completed.stderr)
+        runs.append(modules['sanches'][1] / 1_000_000)
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:10]
+    return statistics.median(runs), [{'module': name, 'self_ms': round(us / 1000, 2)} for name, (us, _) in slowest]
+
+
+def measure_noop_scan(root: str, repeat: int) -> float:
+    """Median wall time of a CLI run on an unchanged project; fails if it did not take the fast path"""
+    # Should the fast path be missed, the Gemini request must fail at once instead of reaching the real API
+    env = dict(os.environ, GOOGLE_GEMINI_BASE_URL='http://127.0.0.1:9')
+    command = [sys.executable, os.path.join(CLI_DIR, 'sanches.py'), '--dir', root, '--api-key', 'benchmark',
+               '--llm-retries', '0', '--metrics']
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+        runs.append(time.perf_counter() - started)
+        counters = json.loads(completed.stdout)['metrics']['counters']
+        if not counters.get('scan.unchanged'):
+            raise RuntimeError('the no-op scan did not use the stored result')
+    return statistics.median(runs)
+
+
+def measure(root: str, args, nvd_url: str) -> Dict[str, float]:
+    runs: List[Dict[str, float]] = []
+    for _ in range(args.repeat):
+        phases = run_process(root, args, nvd_url)
+        phases['dependency_scan'] = run_dependency_scan(root, args, nvd_url)
+        runs.append(phases)
+    result = {name: round(statistics.median(run.get(name, 0.0) for run in runs), 4) for name in runs[0]}
+
+    # Tracing slows everything down, so memory is measured in a run of its own
+    tracemalloc.start()
+    try:
+        run_process(root, args, nvd_url)
+        run_dependency_scan(root, args, nvd_url)
+        result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def compare(current: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Metrics that got slower (or bigger) than the baseline allows"""
+    regressions = []
+    for name, value in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        min_delta = MIN_DELTA['mb'] if name.endswith('_mb') else MIN_DELTA['seconds']
+        if value > before * (1 + tolerance) and value - before > min_delta:
+            regressions.append(f'{name}: {before} -> {value} (+{(value / before - 1) * 100 if before else 100:.0f}%)')
+    return regressions
+
+
+def main():
+    defaults = ProjectShape()
+    parser = argparse.ArgumentParser(description='Benchmark Sanches scans on a synthetic project')
+    parser.add_argument('--files', type=int, default=defaults.files, help='Source files to generate')
+    parser.add_argument('--depth', type=int, default=defaults.depth, help='Maximum directory depth of source files')
+    parser.add_argument('--node-modules', type=int, default=defaults.node_modules_files,
+                        help='Files to generate in node_modules (ignored by the scan)')
+    parser.add_argument('--binary-ratio', type=float, default=defaults.binary_ratio,
+                        help='Share of files that are binary assets')
+    parser.add_argument('--manifests', type=int, default=defaults.manifests, help='npm/pip manifests to generate')
+    parser.add_argument('--packages', type=int, default=defaults.packages_per_manifest,
+                        help='Dependencies per manifest')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--project', help='Benchmark this existing directory instead of generating one')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (the median is reported)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Parallel (fake) Gemini requests')
+    parser.add_argument('--batch-tokens', type=int, default=200_000)
+    parser.add_argument('--read-workers', type=int, help='Threads reading and hashing files (default: CPU based)')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='Seconds of fake Gemini latency per request')
+    parser.add_argument('--llm-tokens-per-second', type=float, help='Fake Gemini output speed (default: instant)')
+    parser.add_argument('--llm-prefill-tokens-per-second', type=float,
+                        help='Fake Gemini input processing speed; uncached input tokens add latency (default: free)')
+    parser.add_argument('--llm-context-cache-ttl', type=float, default=3600.0,
+                        help='Seconds the analysis instructions stay in the (fake) context cache; 0 disables it')
+    parser.add_argument('--llm-throttle-rate', type=float, default=0.0,
+                        help='Share of fake Gemini requests answered with a 429')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0,
+                        help='Share of fake Gemini requests failing with a 503')
+    parser.add_argument('--llm-stall-rate', type=float, default=0.0, help='Share of fake Gemini requests that hang')
+    parser.add_argument('--llm-stall', type=float, default=60.0, help='Seconds a stalled fake Gemini request hangs')
+    parser.add_argument('--llm-request-timeout', type=float, default=5.0,
+                        help='Seconds before a (stalled) Gemini request is abandoned and retried')
+    parser.add_argument('--llm-backoff', type=float, default=0.05, help='Base retry backoff in seconds')
+    parser.add_argument('--llm-hedge', action='store_true', help='Hedge Gemini requests that take unusually long')
+    parser.add_argument('--nvd-latency', type=float, default=0.02, help='Seconds of stub NVD latency per request')
+    parser.add_argument('--nvd-rate', type=int, default=1000, help='NVD requests allowed per second')
+    parser.add_argument('--nvd-workers', type=int, default=8, help='Concurrent NVD requests')
+    parser.add_argument('--startup-budget-ms', type=float,
+                        help='Fail when a no-op scan (process start included) takes longer than this')
+    parser.add_argument('--baseline', help='Compare against this saved result')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline (0.25 = 25%%)')
+    parser.add_argument('--save-baseline', metavar='PATH', help='Save this result as a baseline')
+    args = parser.parse_args()
+
+    shape = ProjectShape(files=args.files, depth=args.depth, node_modules_files=args.node_modules,
+                         binary_ratio=args.binary_ratio, manifests=args.manifests,
+                         packages_per_manifest=args.packages, seed=args.seed)
+
+    with tempfile.TemporaryDirectory(prefix='sanches-bench-') as workdir:
+        # Keep scan manifests and caches out of the user's cache directory
+        os.environ['SANCHES_CACHE_DIR'] = os.path.join(workdir, 'cache')
+        root = args.project
+        generated = None
+        if root is None:
+            root = os.path.join(workdir, 'project')
+            os.makedirs(root)
+            generated = generate(root, shape)
+
+        with StubNVDServer(latency=args.nvd_latency) as nvd:
+            os.environ['NVD_API_BASE'] = nvd.url
+            results = measure(root, args, nvd.url)
+            # The scans above left a stored result, so this run has nothing to do
+            results['noop_scan'] = round(measure_noop_scan(root, args.repeat), 4)
+        import_seconds, slowest_imports = measure_import(args.repeat)
+        results['import'] = round(import_seconds, 4)
+
+    report = {
+        'shape': asdict(shape) if generated is not None else {'project': args.project},
+        'generated': generated,
+        'settings': {name: getattr(args, name) for name in (
+            'repeat', 'concurrency', 'batch_tokens', 'read_workers', 'llm_latency', 'llm_tokens_per_second', 'llm_throttle_rate',
+            'llm_error_rate', 'llm_stall_rate', 'llm_stall', 'llm_request_timeout', 'llm_hedge',
+            'llm_prefill_tokens_per_second', 'llm_context_cache_ttl',
+            'nvd_latency', 'nvd_rate')},
+        'results': results,
+        'startup': {'slowest_imports': slowest_imports},
+    }
+    if args.startup_budget_ms is not None and results['noop_scan'] * 1000 > args.startup_budget_ms:
+        report['startup']['over_budget'] = f"noop_scan took {results['noop_scan'] * 1000:.0f} ms"
+
+    status = 1 if 'over_budget' in report['startup'] else 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('shape') != report['shape'] or baseline.get('settings') != report['settings']:
+            print('warning: baseline was recorded with a different shape or settings', file=sys.stderr)
+        regressions = compare(results, baseline.get('results', {}), args.tolerance)
+        report['regressions'] = regressions
+        status = 1 if regressions else status
+
+    print(json.dumps(report, indent=2))
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Token-budgeted batching of project files and merging of per-batch reports
+"""
+import pathlib
+from typing import Dict, List, Any, Iterable
+
+SEVERITIES = ('critical', 'warning', 'suggestion')
+
+# Rough characters-per-token ratio for source code; good enough for budgeting
+CHARS_PER_TOKEN = 4
+# Per-file overhead of the JSON framing (path, quotes, escaping)
+FILE_OVERHEAD_TOKENS = 16
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _file_tokens(path: str, content: str) -> int:
+    return estimate_tokens(path) + estimate_tokens(content) + FILE_OVERHEAD_TOKENS
+
+
+def _truncate(content: str, budget: int) -> str:
+    keep = max(budget - FILE_OVERHEAD_TOKENS, 0) * CHARS_PER_TOKEN
+    return content[:keep] + "\n[... truncated to fit the token budget ...]"
+
+
+def make_batches(files_content: Dict[str, str], token_budget: int) -> List[Dict[str, str]]:
+    """
+    Split files into batches that each fit in token_budget.
+
+    Files are grouped by directory and directories are packed in path order,
+    so related files (a module and its tests, siblings in a package) end up in
+    the same request whenever the budget allows. A single file larger than the
+    budget is truncated and sent on its own.
+    """
+    by_dir: Dict[str, List[str]] = {}
+    for path in sorted(files_content):
+        by_dir.setdefault(str(pathlib.Path(path).parent), []).append(path)
+
+    batches: List[Dict[str, str]] = []
+    current: Dict[str, str] = {}
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            batches.append(current)
+        current, current_tokens = {}, 0
+
+    for directory in sorted(by_dir):
+        paths = by_dir[directory]
+        dir_tokens = sum(_file_tokens(p, files_content[p]) for p in paths)
+
+        # Start a fresh batch rather than splitting a directory that would fit on its own
+        if current and current_tokens + dir_tokens > token_budget and dir_tokens <= token_budget:
+            flush()
+
+        for path in paths:
+            content = files_content[path]
+            tokens = _file_tokens(path, content)
+            if tokens > token_budget:
+                content = _truncate(content, token_budget)
+                tokens = _file_tokens(path, content)
+            if current and current_tokens + tokens > token_budget:
+                flush()
+            current[path] = content
+            current_tokens += tokens
+
+    flush()
+    return batches
+
+
+def merge_reports(reports: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge per-batch reports into one, dropping duplicate findings"""
+    merged: Dict[str, Any] = {'directory': '', **{s: [] for s in SEVERITIES}}
+    seen = set()
+
+    for report in reports:
+        if not merged['directory'] and report.get('directory'):
+            merged['directory'] = report['directory']
+        for severity in SEVERITIES:
+            for finding in report.get(severity, []) or []:
+                # The same issue on two lines of a file is two findings
+                key = (
+                    finding.get('file_path', ''),
+                    finding.get('line'),
+                    ' '.join(finding.get('description', '').lower().split()),
+                )
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged[severity].append(finding)
+
+    return merged
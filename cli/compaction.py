@@ -0,0 +1,182 @@
+"""
+Prompt compaction
+
+Shrinks what is sent to Gemini without losing anything the analysis needs:
+
+- files are framed with a plain "=== FILE <path>" header instead of being
+  embedded as indented JSON strings (which escapes every newline and quote)
+- files with identical content are sent once; findings for the copy that was
+  sent are reported for every duplicate path afterwards
+- licence/copyright comment headers and runs of blank lines are dropped
+- very long lines (inlined data, base64 blobs) are truncated, and so is the
+  tail of generated data: lockfiles, test fixtures and large machine-written
+  dumps. Hand-written data files such as configuration are sent whole
+
+Whenever lines are removed a "@@ line N @@" marker says which line of the
+original file comes next, so reported line numbers stay correct.
+"""
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from batching import estimate_tokens
+
+FILE_HEADER = '=== FILE '
+
+# Comment lines that can make up a licence header
+HEADER_COMMENT = re.compile(r'^\s*(#|//|/\*|\*|\*/|--|;|<!--|-->)')
+LICENCE_WORDS = re.compile(r'copyright|licen[cs]e|spdx-license-identifier|all rights reserved', re.IGNORECASE)
+MIN_HEADER_LINES = 3
+MIN_BLANK_RUN = 3
+
+MAX_LINE_CHARS = 1000
+LINE_KEEP_CHARS = 200
+
+# Generated data is cut after this many lines; anything worth flagging in it sits near the top
+MAX_DATA_LINES = 400
+DATA_EXTENSIONS = {'.json', '.csv', '.tsv', '.xml', '.svg', '.geojson', '.ndjson', '.jsonl', '.yaml', '.yml'}
+LOCKFILES = {
+    'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml', 'composer.lock',
+    'Pipfile.lock', 'poetry.lock', 'Gemfile.lock', 'Cargo.lock', 'go.sum', 'packages.lock.json',
+}
+FIXTURE_DIRS = {'fixtures', '__fixtures__', 'testdata', 'test-data', '__snapshots__'}
+GENERATED_MARKER = re.compile(r'@generated|auto-?generated|generated by|do not edit', re.IGNORECASE)
+# Data files longer than this are taken to be written by a program, not by hand
+DATA_DUMP_LINES = 5000
+
+
+@dataclass
+class CompactionOptions:
+    strip_licence_headers: bool = True
+    collapse_blank_lines: bool = True
+    truncate_generated: bool = True
+    dedupe: bool = True
+
+
+@dataclass
+class CompactedFiles:
+    files: Dict[str, str]  # Compacted content of every file that is sent
+    aliases: Dict[str, str] = field(default_factory=dict)  # Duplicate path -> path whose content is sent
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'tokens_before': self.tokens_before,
+            'tokens_after': self.tokens_after,
+            'duplicates': len(self.aliases),
+        }
+
+
+def _marker(next_line: int) -> str:
+    return f'@@ line {next_line} @@'
+
+
+def _licence_header_end(lines: List[str]) -> int:
+    """Index of the first line after a leading licence comment block, or 0 if there is none"""
+    start = 1 if lines and lines[0].startswith('#!') else 0
+    end = start
+    while end < len(lines) and (HEADER_COMMENT.match(lines[end]) or not lines[end].strip()):
+        end += 1
+    block = lines[start:end]
+    if len([line for line in block if line.strip()]) < MIN_HEADER_LINES:
+        return 0
+    if not any(LICENCE_WORDS.search(line) for line in block):
+        return 0
+    return end
+
+
+def is_generated_data(path: str, lines: List[str]) -> bool:
+    """Whether a file is machine-written data (lockfile, fixture, dump) rather than hand-written config"""
+    parts = path.replace(os.sep, '/').split('/')
+    if parts[-1] in LOCKFILES:
+        return True
+    if os.path.splitext(parts[-1])[1].lower() not in DATA_EXTENSIONS:
+        return False
+    if FIXTURE_DIRS.intersection(parts[:-1]) or len(lines) > DATA_DUMP_LINES:
+        return True
+    return any(GENERATED_MARKER.search(line) for line in lines[:5])
+
+
+def compact_text(path: str, text: str, options: CompactionOptions) -> str:
+    """Compact one file's content, keeping line numbers recoverable through markers"""
+    lines = [line.rstrip() for line in text.split('\n')]
+    out: List[str] = []
+    start = 0
+
+    if options.strip_licence_headers:
+        header_end = _licence_header_end(lines)
+        if header_end:
+            if lines[0].startswith('#!'):
+                out.append(lines[0])
+            out.append(_marker(header_end + 1))
+            start = header_end
+
+    is_data = options.truncate_generated and is_generated_data(path, lines)
+    index = start
+    while index < len(lines):
+        line = lines[index]
+
+        if is_data and index - start >= MAX_DATA_LINES:
+            out.append(f'[... {len(lines) - index} more lines of data truncated ...]')
+            break
+
+        if options.collapse_blank_lines and not line:
+            run_end = index
+            while run_end < len(lines) and not lines[run_end]:
+                run_end += 1
+            if run_end - index >= MIN_BLANK_RUN and run_end < len(lines):
+                out.append(_marker(run_end + 1))
+                index = run_end
+                continue
+
+        if options.truncate_generated and len(line) > MAX_LINE_CHARS:
+            line = f'{line[:LINE_KEEP_CHARS]}[... {len(line) - LINE_KEEP_CHARS} chars truncated]'
+        out.append(line)
+        index += 1
+
+    return '\n'.join(out)
+
+
+def frame_files(files: Dict[str, str]) -> str:
+    """Concatenate files under plain-text headers; content follows verbatim"""
+    return '\n'.join(f'{FILE_HEADER}{path}\n{content}' for path, content in files.items())
+
+
+def compact(files_content: Dict[str, str], options: CompactionOptions = CompactionOptions()) -> CompactedFiles:
+    """Compact all files of a scan and measure the prompt tokens saved"""
+    result = CompactedFiles(files={})
+    by_digest: Dict[str, str] = {}
+
+    for path in sorted(files_content):
+        text = files_content[path]
+        # Counted per file, so the whole prompt is never built just to measure it
+        result.tokens_before += estimate_tokens(path) + estimate_tokens(text)
+        if options.dedupe:
+            digest = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+            original = by_digest.setdefault(digest, path)
+            if original != path:
+                result.aliases[path] = original
+                continue
+        result.files[path] = compact_text(path, text, options)
+        result.tokens_after += estimate_tokens(f'{FILE_HEADER}{path}\n') + estimate_tokens(result.files[path])
+    return result
+
+
+def expand_aliases(report: Dict[str, List[Dict]], aliases: Dict[str, str], severities) -> None:
+    """Repeat every finding of a file that was sent for each duplicate of it"""
+    if not aliases:
+        return
+    copies: Dict[str, List[str]] = {}
+    for duplicate, original in aliases.items():
+        copies.setdefault(original, []).append(duplicate)
+
+    for severity in severities:
+        findings = report.get(severity) or []
+        extra = []
+        for finding in findings:
+            for duplicate in copies.get(finding.get('file_path', ''), []):
+                extra.append({**finding, 'file_path': duplicate, 'file_name': os.path.basename(duplicate)})
+        findings.extend(extra)
@@ -0,0 +1,148 @@
+"""
+Gemini context caching of the fixed analysis instructions
+
+The security-analysis instructions are identical for every batch. They are
+registered once as cached content and requests refer to the cache entry by
+name, so the instructions are neither resent nor prefilled again; the API
+bills the cached tokens at a reduced rate. An entry is reused across
+batches, scans and runs (its name is remembered in the cache dir) until its
+TTL runs out. Changed instructions or another model give a different key,
+so a new entry is created when the prompt version changes; replaced entries
+are left to expire on their own.
+
+The backend that creates entries is pluggable: GenaiContextBackend uses
+client.caches, and anything with the same create method (such as
+the benchmark fakes) can stand in. If an entry can't be created (e.g. the
+instructions are below the model's minimum cacheable size), or an entry
+turns out to be gone before its expiry, requests are sent uncached and
+creation is retried after a pause.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from manifest import default_cache_dir
+
+DEFAULT_TTL = 3600.0
+# An entry this close to expiry is replaced rather than used, so in-flight requests don't outlive it
+REFRESH_MARGIN = 120.0
+# Seconds to send requests uncached after an entry could not be created
+FAILURE_PAUSE = 600.0
+# Errors of a request that refers to an entry the API no longer has
+STALE_STATUSES = {403, 404}
+
+
+def is_stale_error(exc: BaseException) -> bool:
+    """Whether a request failed because its cached content expired or was deleted"""
+    status = getattr(exc, 'code', None) or getattr(exc, 'status_code', None)
+    if status in STALE_STATUSES:
+        return True
+    return status == 400 and 'cached' in str(exc).lower()
+
+
+class GenaiContextBackend:
+    """Creates entries through client.caches of google.genai"""
+
+    def __init__(self, get_caches: Callable[[], Any]):
+        self.get_caches = get_caches  # Returns client.caches; called per use
+
+    def create(self, model: str, instructions: str, ttl: float) -> Tuple[str, Optional[float]]:
+        """Register the instructions; returns the entry name and its expiry (epoch seconds) if known"""
+        cached = self.get_caches().create(model=model, config={
+            'system_instruction': instructions,
+            'ttl': f'{int(ttl)}s',
+            'display_name': 'sanches-instructions',
+        })
+        expire_time = getattr(cached, 'expire_time', None)
+        return cached.name, expire_time.timestamp() if expire_time is not None else None
+
+
+@dataclass
+class CachedContext:
+    name: str
+    expires_at: float
+
+
+class ContextCache:
+    def __init__(self, backend: Any, ttl: float = DEFAULT_TTL, scope: str = '',
+                 path: Optional[pathlib.Path] = None):
+        self.backend = backend
+        self.ttl = ttl
+        self.scope = scope  # Entries belong to an API project; keeps keys of different accounts apart
+        self.path = path or default_cache_dir() / 'context_cache.json'
+        self.stats = {'hits': 0, 'created': 0, 'failures': 0, 'invalidated': 0}
+        self._entries: Optional[Dict[str, CachedContext]] = None
+        self._failed_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, model: str, instructions: str) -> str:
+        payload = '\0'.join((self.scope, model, instructions))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _load(self) -> Dict[str, CachedContext]:
+        if self._entries is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._entries = {k: CachedContext(v['name'], v['expires_at']) for k, v in data.items()}
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self, now: float) -> None:
+        entries = {k: e for k, e in self._load().items() if e.expires_at > now}
+        self._entries = entries
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({k: {'name': e.name, 'expires_at': e.expires_at} for k, e in entries.items()}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # The entry still serves this process
+
+    def get(self, model: str, instructions: str) -> Optional[str]:
+        """Name of a live entry holding the instructions, created if needed; None to send them uncached"""
+        key = self._key(model, instructions)
+        now = time.time()
+        # Held while creating, so concurrent batches wait for one entry instead of creating several
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is not None and entry.expires_at - now > REFRESH_MARGIN:
+                self.stats['hits'] += 1
+                return entry.name
+            if self._failed_until.get(key, 0) > now:
+                return None
+            try:
+                name, expires_at = self.backend.create(model, instructions, self.ttl)
+            except Exception:
+                self.stats['failures'] += 1
+                self._failed_until[key] = now + FAILURE_PAUSE
+                return None
+            self.stats['created'] += 1
+            self._load()[key] = CachedContext(name, expires_at or now + self.ttl)
+            self._save(now)
+            return name
+
+    def invalidate(self, name: str) -> None:
+        """Forget an entry the API reported as gone; no new one is created for a while"""
+        with self._lock:
+            now = time.time()
+            entries = self._load()
+            stale = [k for k, e in entries.items() if e.name == name]
+            for key in stale:
+                del entries[key]
+                # Entries vanishing early (deleted, or another account's) shouldn't cost a create per batch
+                self._failed_until[key] = now + FAILURE_PAUSE
+            if stale:
+                self.stats['invalidated'] += 1
+                self._save(now)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
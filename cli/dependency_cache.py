@@ -0,0 +1,79 @@
+"""
+Cache of dependency audit results
+
+Results are stored per project and ecosystem, keyed by a hash of that
+ecosystem's manifests and lockfiles. An ecosystem is only re-audited when one
+of its input files changed or its cached result is older than the freshness
+window (new advisories are published all the time).
+"""
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from manifest import default_cache_dir, project_key
+
+DEFAULT_MAX_AGE = 6 * 3600
+
+# Files whose content determines the audit result of each ecosystem
+ECOSYSTEM_INPUTS = {
+    'npm': ('package.json', 'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock'),
+    'pip': ('requirements.txt', 'Pipfile', 'Pipfile.lock', 'poetry.lock', 'pyproject.toml'),
+}
+
+
+def inputs_hash(root: pathlib.Path, directories: List[pathlib.Path], ecosystem: str) -> str:
+    """Hash of the ecosystem's manifests and lockfiles in every given directory"""
+    digest = hashlib.sha256()
+    for directory in sorted(set(directories)):
+        for name in ECOSYSTEM_INPUTS[ecosystem]:
+            path = directory / name
+            try:
+                data = path.read_bytes()
+            except OSError:
+                continue
+            relative = os.path.relpath(path, root)
+            digest.update(relative.encode('utf-8') + b'\0' + hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+class DependencyCache:
+    def __init__(self, cache_dir: Optional[pathlib.Path] = None, max_age: float = DEFAULT_MAX_AGE):
+        self.cache_dir = (cache_dir or default_cache_dir()) / 'dependencies'
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _path(self, directory: pathlib.Path) -> pathlib.Path:
+        return self.cache_dir / f'{project_key(str(directory))}.json'
+
+    def _load(self, directory: pathlib.Path) -> Dict[str, Any]:
+        try:
+            with open(self._path(directory), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def get(self, directory: pathlib.Path, ecosystem: str, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Cached vulnerabilities if the inputs are unchanged and the result is fresh"""
+        with self._lock:
+            entry = self._load(directory).get(ecosystem)
+        if not entry or entry.get('key') != key:
+            return None
+        if time.time() - entry.get('checked_at', 0) > self.max_age:
+            return None
+        return entry.get('vulnerabilities', [])
+
+    def put(self, directory: pathlib.Path, ecosystem: str, key: str,
+            vulnerabilities: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            data = self._load(directory)
+            data[ecosystem] = {'key': key, 'checked_at': time.time(), 'vulnerabilities': vulnerabilities}
+            path = self._path(directory)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
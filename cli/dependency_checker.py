@@ -1,85 +1,306 @@
 import json
+import os
 import subprocess
-import time
+import threading
 import re
-from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Dict, Any, Optional, Tuple
 from pathlib import Path
-from urllib.parse import quote
-try:
-    import requests
-except ImportError:
-    requests = None
+
+from dependency_cache import DependencyCache, inputs_hash
+from lockfiles import LOCKFILES, ResolvedGraph, find_lockfile, parse_lockfile
+from metrics import Metrics
+from stages import run_concurrently
+from vulndb import VulnDB, normalize_package
+from walker import walk
+
+if TYPE_CHECKING:
+    from nvd_client import NVDClient
+
+# Files that mark a project of each ecosystem
+MANIFEST_FILES = {'npm': ('package.json',), 'pip': ('requirements.txt', 'poetry.lock', 'Pipfile.lock')}
+NPM_LOCKFILES = ('package-lock.json', 'npm-shrinkwrap.json')
+# Live NVD lookups for a lockfile that doesn't tell which packages are direct; NVD allows 5 per 30 s
+MAX_LIVE_LOCKFILE_PACKAGES = 50
 
 
 class DependencyChecker:
-    def __init__(self):
-        self.nvd_api_base = "https://services.nvd.nist.gov/rest/json/cves/2.0"
-        self.request_delay = 0.6  # NVD API rate limit: max 5 requests per 30 seconds without API key
+    def __init__(self, cache: Optional[DependencyCache] = None, nvd: Optional['NVDClient'] = None,
+                 stage_timeout: Optional[float] = None, vulndb: Optional[VulnDB] = None, max_workers: int = 4,
+                 audit_tools: bool = True):
+        self.cache = cache  # None disables result caching
+        self.vulndb = vulndb  # Local index; when set it replaces live NVD queries
+        self.stage_timeout = stage_timeout  # Max seconds for each audit/NVD stage (None = no limit)
+        self.nvd = nvd  # Created lazily; rate limiting is handled by NVDClient
+        self.max_workers = max_workers  # Parallel audit tool runs across manifests
+        self.audit_tools = audit_tools  # Run npm audit / pip-audit (they need network access to their registries)
+        self._nvd_lock = threading.Lock()
+
+    def discover_manifests(self, directory_path: Path) -> Dict[str, List[Path]]:
+        """
+        Find every package.json, requirements.txt and Python lockfile in the tree, using the
+        same pruning and .gitignore rules as the file walker (so nothing under
+        node_modules or .venv is picked up)
+        """
+        found: Dict[str, List[Path]] = {ecosystem: [] for ecosystem in MANIFEST_FILES}
+        if not directory_path.is_dir():
+            return found
 
-    def scan_directory(self, directory: str) -> List[Dict[str, Any]]:
+        for path in walk(str(directory_path), skip_files=frozenset()):
+            name = os.path.basename(path)
+            for ecosystem, manifest_names in MANIFEST_FILES.items():
+                if name in manifest_names:
+                    found[ecosystem].append(Path(path))
+        return found
+
+    def scan_directory(self, directory: str, refresh: bool = False,
+                       metrics: Optional[Metrics] = None) -> List[Dict[str, Any]]:
         """
         Scan a directory for dependency vulnerabilities
         Returns a list of vulnerable dependencies with their descriptions
+
+        All manifests in the tree are audited (monorepo workspaces included).
+        Each entry lists the manifests that reference the vulnerable package
+        under 'manifests'. Exact versions come from lockfiles where present.
+        Ecosystems, and the audit tool and NVD passes within
+        each, run concurrently. Results are cached per ecosystem; only
+        ecosystems whose manifests or lockfiles changed (or whose cached result
+        expired) are audited again. Pass refresh=True to ignore the cache.
+        Spans, counters and recovered errors are recorded in metrics, if given.
+        Ecosystems whose audit failed, timed out or lost NVD lookups are
+        counted under 'dependencies.incomplete': the result then lacks
+        whatever those would have found.
         """
+        metrics = metrics or Metrics()
         directory_path = Path(directory)
         vulnerabilities = []
-        seen_vulnerabilities = set()  # Track unique vulnerabilities to avoid duplicates
+        seen_vulnerabilities = {}  # Track unique vulnerabilities to avoid duplicates
+        nvd_before = dict(self.nvd.stats) if self.nvd is not None else {}
 
-        # Check for npm vulnerabilities using npm audit
-        if (directory_path / "package.json").exists():
-            npm_vulns = self._check_npm_vulnerabilities(directory_path)
-            for vuln in npm_vulns:
-                key = (vuln['package_type'], vuln['package'], vuln['description'])
-                if key not in seen_vulnerabilities:
-                    vulnerabilities.append(vuln)
-                    seen_vulnerabilities.add(key)
+        with metrics.span('dependencies.discover') as span:
+            manifests = self.discover_manifests(directory_path)
+            span.update({ecosystem: len(found) for ecosystem, found in manifests.items()})
+        ecosystems = tuple(MANIFEST_FILES)
+        results, failed = run_concurrently({
+            ecosystem: (lambda e=ecosystem: self._scan_ecosystem_cached(directory_path, e, manifests[e], refresh, metrics))
+            for ecosystem in ecosystems
+        })
+        metrics.count('dependencies.failed_ecosystems', len(failed))
+        incomplete = len(failed) + sum(1 for _, complete in results.values() if not complete)
+        if incomplete:
+            metrics.count('dependencies.incomplete', incomplete)
+        if self.nvd is not None:
+            metrics.add_counters('nvd', {k: v - nvd_before.get(k, 0) for k, v in self.nvd.stats.items()})
 
-        # Check for Python vulnerabilities using pip-audit/safety
-        if (directory_path / "requirements.txt").exists():
-            python_vulns = self._check_python_vulnerabilities(directory_path)
-            for vuln in python_vulns:
+        for ecosystem in ecosystems:
+            for vuln in results.get(ecosystem, ([], True))[0]:
                 key = (vuln['package_type'], vuln['package'], vuln['description'])
-                if key not in seen_vulnerabilities:
+                existing = seen_vulnerabilities.get(key)
+                if existing is None:
                     vulnerabilities.append(vuln)
-                    seen_vulnerabilities.add(key)
+                    seen_vulnerabilities[key] = vuln
+                else:
+                    # Same finding from another source: just merge where it is referenced
+                    for manifest in vuln.get('manifests', []):
+                        if manifest not in existing.setdefault('manifests', []):
+                            existing['manifests'].append(manifest)
+
+        return vulnerabilities
+
+    def _scan_ecosystem_cached(self, directory_path: Path, ecosystem: str, manifests: List[Path],
+                               refresh: bool, metrics: Metrics) -> Tuple[List[Dict[str, Any]], bool]:
+        """Vulnerabilities of one ecosystem, from the cache if possible, and whether the audit was complete"""
+        if not manifests:
+            return [], True
+        if self.cache is None:
+            return self._scan_ecosystem(directory_path, ecosystem, manifests, metrics)
+
+        key = inputs_hash(directory_path, [m.parent for m in manifests], ecosystem)
+        if not refresh:
+            cached = self.cache.get(directory_path, ecosystem, key)
+            if cached is not None:
+                metrics.count('dependency_cache.hits')
+                return cached, True
+        metrics.count('dependency_cache.misses')
+
+        vulnerabilities, complete = self._scan_ecosystem(directory_path, ecosystem, manifests, metrics)
+        # Partial results (a stage timed out or failed, NVD lookups failed) are not worth remembering
+        if complete:
+            self.cache.put(directory_path, ecosystem, key, vulnerabilities)
+        return vulnerabilities, complete
+
+    def _scan_ecosystem(self, directory_path: Path, ecosystem: str, manifests: List[Path],
+                        metrics: Metrics) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Run the audit tool and the NVD checks for one ecosystem in parallel.
+        Returns the vulnerabilities and whether every stage completed in time
+        (and every NVD lookup succeeded).
+        """
+        stages = {}
+
+        if self.audit_tools:
+            if ecosystem == 'npm':
+                # npm audit needs a lockfile and already covers every workspace below it
+                audit_dirs = [m.parent for m in manifests if any((m.parent / lock).exists() for lock in NPM_LOCKFILES)]
+                audit_dirs = audit_dirs or [m.parent for m in manifests if m.parent == directory_path]
+                stages['audit'] = lambda: self._audit_each(
+                    directory_path, audit_dirs, 'package.json',
+                    lambda directory: self._check_npm_vulnerabilities(directory, metrics))
+
+            else:
+                # Check for Python vulnerabilities using pip-audit/safety
+                requirement_dirs = [m.parent for m in manifests if m.name == 'requirements.txt']
+                stages['audit'] = lambda: self._audit_each(
+                    directory_path, requirement_dirs, 'requirements.txt',
+                    lambda directory: self._check_python_vulnerabilities(directory, metrics))
+
+        graphs: Dict[Path, Optional[ResolvedGraph]] = {}
+        packages: Dict[Path, List[Tuple[str, str]]] = {}
+        skipped: List[str] = []  # Packages left out of the live lookups
+        with metrics.span(f'dependencies.{ecosystem}.lockfiles') as span:
+            for manifest in manifests:
+                packages[manifest], left_out = self._manifest_packages(directory_path, manifest, ecosystem, graphs,
+                                                                       metrics)
+                skipped.extend(left_out)
+            span['packages'] = sum(len(p) for p in packages.values())
 
         # Enhanced NVD checks - parse package files directly and query NVD
-        if requests is not None:
-            # Check npm packages via NVD
-            if (directory_path / "package.json").exists():
-                npm_packages = self._parse_package_json(directory_path / "package.json")
-                if npm_packages:
-                    nvd_npm_vulns = self._check_nvd_vulnerabilities(npm_packages, 'npm')
-                    for vuln in nvd_npm_vulns:
-                        key = (vuln['package_type'], vuln['package'], vuln['description'])
-                        if key not in seen_vulnerabilities:
-                            vulnerabilities.append(vuln)
-                            seen_vulnerabilities.add(key)
-
-            # Check Python packages via NVD
-            if (directory_path / "requirements.txt").exists():
-                python_packages = self._parse_requirements_txt(directory_path / "requirements.txt")
-                if python_packages:
-                    nvd_python_vulns = self._check_nvd_vulnerabilities(python_packages, 'pip')
-                    for vuln in nvd_python_vulns:
-                        key = (vuln['package_type'], vuln['package'], vuln['description'])
-                        if key not in seen_vulnerabilities:
-                            vulnerabilities.append(vuln)
-                            seen_vulnerabilities.add(key)
+        if any(packages.values()):
+            stages['nvd'] = lambda: self._check_referenced_packages(directory_path, packages, ecosystem, metrics)
+
+        def timed(name: str, stage: Callable[[], Any]) -> Callable[[], Any]:
+            def run() -> Any:
+                with metrics.span(f'dependencies.{ecosystem}.{name}'):
+                    return stage()
+            return run
+
+        results, failed = run_concurrently({name: timed(name, stage) for name, stage in stages.items()},
+                                           timeout=self.stage_timeout)
+        for name in failed:
+            metrics.count(f'dependencies.{ecosystem}.{name}.failed')
+        nvd_vulnerabilities, unaudited = results.get('nvd', ([], []))
+        vulnerabilities = results.get('audit', []) + nvd_vulnerabilities
+        return vulnerabilities, not failed and not unaudited and not skipped
 
+    def _manifest_packages(self, root: Path, manifest: Path, ecosystem: str,
+                           graphs: Dict[Path, Optional[ResolvedGraph]],
+                           metrics: Optional[Metrics] = None) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """
+        (package, version) pairs to look up for one manifest, using exact
+        versions from the lockfile next to it (or, for npm workspaces, the
+        nearest one above it) and falling back to the manifest's own ranges.
+
+        Transitive packages are included when matching against the local
+        index; live NVD lookups are rate limited, so they stay restricted to
+        the direct dependencies. When the lockfile doesn't mark those, the
+        manifest's declared dependencies are pinned instead; a bare lockfile
+        is looked up up to MAX_LIVE_LOCKFILE_PACKAGES. Also returns the names
+        of the packages left out, which make the audit incomplete.
+        """
+        metrics = metrics or Metrics()
+        if manifest.name in LOCKFILES[ecosystem]:
+            lockfile = manifest
+        else:
+            lockfile = find_lockfile(manifest.parent, LOCKFILES[ecosystem], root if ecosystem == 'npm' else None)
+
+        graph = None
+        if lockfile is not None:
+            if lockfile not in graphs:
+                graphs[lockfile] = parse_lockfile(lockfile)
+            graph = graphs[lockfile]
+
+        if manifest.name == 'package.json':
+            declared = self._parse_package_json(manifest)
+        elif manifest.name == 'requirements.txt':
+            declared = self._parse_requirements_txt(manifest)
+        else:
+            declared = []
+
+        if not graph:
+            return declared, []
+
+        if lockfile.parent != manifest.parent:
+            # Workspace package: pin its declared ranges to the versions the root lockfile resolved
+            versions = graph.versions()
+            return [(name, versions.get(normalize_package(ecosystem, name), version)) for name, version in declared], []
+
+        resolved = list(graph)
+        if self.vulndb is not None:
+            return [(p.name, p.version) for p in resolved], []
+        if any(p.direct for p in resolved):
+            return [(p.name, p.version) for p in resolved if p.direct], []
+        if declared:
+            versions = graph.versions()
+            return [(name, versions.get(normalize_package(ecosystem, name), version)) for name, version in declared], []
+        left_out = [p.name for p in resolved[MAX_LIVE_LOCKFILE_PACKAGES:]]
+        if left_out:
+            metrics.count(f'dependencies.{ecosystem}.unaudited', len(left_out))
+        return [(p.name, p.version) for p in resolved[:MAX_LIVE_LOCKFILE_PACKAGES]], left_out
+
+    def _audit_each(self, root: Path, directories: List[Path], manifest_name: str,
+                    check: Callable[[Path], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Run an audit tool in several directories with bounded parallelism"""
+        if not directories:
+            return []
+        vulnerabilities = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(directories))) as executor:
+            for directory, vulns in zip(directories, executor.map(check, directories)):
+                manifest = os.path.relpath(directory / manifest_name, root)
+                for vuln in vulns:
+                    vulnerabilities.append({**vuln, 'manifests': [manifest]})
         return vulnerabilities
 
-    def _check_npm_vulnerabilities(self, directory: Path) -> List[Dict[str, Any]]:
+    def _check_referenced_packages(self, root: Path, packages: Dict[Path, List[Tuple[str, str]]],
+                                   package_type: str, metrics: Metrics) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Look up every unique (package, version) once, however many manifests
+        reference it, then map the results back to those manifests. Also
+        returns the packages that could not be looked up.
+        """
+        references: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for manifest, manifest_packages in packages.items():
+            relative = os.path.relpath(manifest, root)
+            for pkg_name, version in manifest_packages:
+                entry = references.setdefault(
+                    (normalize_package(package_type, pkg_name), version),
+                    {'name': pkg_name, 'manifests': []},
+                )
+                if relative not in entry['manifests']:
+                    entry['manifests'].append(relative)
+
+        unique = [(entry['name'], version) for (_, version), entry in references.items()]
+        found, unaudited = self._check_advisories(unique, package_type)
+        if unaudited:
+            metrics.error(f'dependencies.{package_type}.nvd',
+                          RuntimeError(f'{len(unaudited)} NVD lookups failed: {", ".join(unaudited[:5])}'))
+
+        vulnerabilities = []
+        for (normalized, version), entry in references.items():
+            for vuln in found.get((entry['name'], version), []):
+                vulnerabilities.append({**vuln, 'manifests': list(entry['manifests'])})
+        return vulnerabilities, unaudited
+
+    def _record_audit_error(self, tool: str, exc: Exception, metrics: Metrics) -> None:
+        if isinstance(exc, FileNotFoundError):
+            metrics.count(f'audit.{tool}.not_installed')
+        else:
+            metrics.error(f'audit.{tool}', exc)
+
+    def _check_npm_vulnerabilities(self, directory: Path, metrics: Optional[Metrics] = None) -> List[Dict[str, Any]]:
         """Check npm packages for vulnerabilities using npm audit"""
+        metrics = metrics or Metrics()
         try:
-            result = subprocess.run(
-                ['npm', 'audit', '--json'],
-                cwd=str(directory),
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
+            with metrics.span('audit.npm', directory=str(directory)):
+                result = subprocess.run(
+                    ['npm', 'audit', '--json'],
+                    cwd=str(directory),
+                    capture_output=True,
+                    text=True,
+                    timeout=30
+                )
+            # npm audit exits 1 when it found vulnerabilities, so only the output tells failures apart
+            metrics.count(f'audit.npm.exit_{result.returncode}')
+
             if result.stdout:
                 data = json.loads(result.stdout)
                 vulnerabilities = []
@@ -125,24 +346,27 @@ class DependencyChecker:
                         })
                 
                 return vulnerabilities
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, json.JSONDecodeError, FileNotFoundError):
-            pass
+        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, json.JSONDecodeError, FileNotFoundError) as e:
+            self._record_audit_error('npm', e, metrics)
         
         return []
 
-    def _check_python_vulnerabilities(self, directory: Path) -> List[Dict[str, Any]]:
+    def _check_python_vulnerabilities(self, directory: Path, metrics: Optional[Metrics] = None) -> List[Dict[str, Any]]:
         """Check Python packages for vulnerabilities using pip-audit or safety"""
+        metrics = metrics or Metrics()
         vulnerabilities = []
         
         # Try pip-audit first (more modern and accurate)
         try:
-            result = subprocess.run(
-                ['pip-audit', '--format', 'json', '-r', str(directory / 'requirements.txt')],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
+            with metrics.span('audit.pip-audit', directory=str(directory)):
+                result = subprocess.run(
+                    ['pip-audit', '--format', 'json', '-r', str(directory / 'requirements.txt')],
+                    capture_output=True,
+                    text=True,
+                    timeout=30
+                )
+            metrics.count(f'audit.pip-audit.exit_{result.returncode}')
+
             if result.stdout:
                 data = json.loads(result.stdout)
                 
@@ -162,18 +386,20 @@ class DependencyChecker:
                             })
                 
                 return vulnerabilities
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, json.JSONDecodeError, FileNotFoundError):
-            pass
+        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, json.JSONDecodeError, FileNotFoundError) as e:
+            self._record_audit_error('pip-audit', e, metrics)
         
         # Fallback to safety check
         try:
-            result = subprocess.run(
-                ['safety', 'check', '--json', '-r', str(directory / 'requirements.txt')],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
+            with metrics.span('audit.safety', directory=str(directory)):
+                result = subprocess.run(
+                    ['safety', 'check', '--json', '-r', str(directory / 'requirements.txt')],
+                    capture_output=True,
+                    text=True,
+                    timeout=30
+                )
+            metrics.count(f'audit.safety.exit_{result.returncode}')
+
             if result.stdout:
                 data = json.loads(result.stdout)
                 
@@ -189,8 +415,8 @@ class DependencyChecker:
                         })
                 
                 return vulnerabilities
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, json.JSONDecodeError, FileNotFoundError):
-            pass
+        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, json.JSONDecodeError, FileNotFoundError) as e:
+            self._record_audit_error('safety', e, metrics)
         
         return []
 
@@ -248,7 +474,37 @@ class DependencyChecker:
         
         return packages
 
-    def _check_nvd_vulnerabilities(self, packages: List[Tuple[str, str]], package_type: str) -> List[Dict[str, Any]]:
+    def _check_advisories(self, packages: List[Tuple[str, str]],
+                          package_type: str) -> Tuple[Dict[Tuple[str, str], List[Dict[str, Any]]], List[str]]:
+        """
+        Match packages against the local vulnerability index if built, else query NVD live.
+        Returns the vulnerabilities found for each (package_name, version), and
+        the names of packages whose lookup failed (their vulnerabilities are unknown).
+        """
+        if self.vulndb is not None:
+            return self._check_local_vulnerabilities(packages, package_type), []
+        return self._check_nvd_vulnerabilities(packages, package_type)
+
+    def _check_local_vulnerabilities(self, packages: List[Tuple[str, str]],
+                                     package_type: str) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """Match packages and versions against the offline index (no network)"""
+        found = {}
+        for pkg_name, version in packages:
+            vulnerabilities = found.setdefault((pkg_name, version), [])
+            for advisory in self.vulndb.lookup(package_type, pkg_name, version):
+                severity_info = f" [CVSS: {advisory['severity']}]" if advisory['severity'] else ''
+                vuln_description = f"{advisory['id']}: {advisory['summary'][:200]}{severity_info}"
+                if version:
+                    vuln_description = f"{vuln_description} (Package version: {version})"
+                vulnerabilities.append({
+                    'package_type': package_type,
+                    'package': pkg_name,
+                    'description': vuln_description
+                })
+        return found
+
+    def _check_nvd_vulnerabilities(self, packages: List[Tuple[str, str]],
+                                   package_type: str) -> Tuple[Dict[Tuple[str, str], List[Dict[str, Any]]], List[str]]:
         """
         Check packages against NVD (National Vulnerability Database) API
         
@@ -257,82 +513,88 @@ class DependencyChecker:
             package_type: 'npm' or 'pip'
         
         Returns:
-            List of vulnerability dictionaries
+            Vulnerability dictionaries for each (package_name, version), and the
+            packages whose search failed after the client's retries
         """
-        if requests is None:
-            return []
-        
-        vulnerabilities = []
-        
+        nvd = self._get_nvd_client()
+        if nvd is None:
+            return {}, sorted({pkg_name for pkg_name, _ in packages})
+
+        # Construct search keyword based on package type
+        prefix = 'npm' if package_type == 'npm' else 'python'
+        keywords = {pkg_name: f"{prefix} {pkg_name}" for pkg_name, _ in packages}
+
+        # Queries run concurrently behind the client's NVD rate limiter
+        responses = nvd.search_many(keywords.values())
+
+        found = {}
+        # None means the search failed (quota, 5xx, network), not that nothing was found
+        unaudited = sorted({pkg_name for pkg_name, keyword in keywords.items() if responses.get(keyword) is None})
         for pkg_name, version in packages:
-            try:
-                # Construct search keyword based on package type
-                if package_type == 'npm':
-                    keyword = f"npm {pkg_name}"
-                else:
-                    keyword = f"python {pkg_name}"
-                
-                # Query NVD API
-                params = {
-                    'keywordSearch': keyword,
-                    'resultsPerPage': 5  # Limit results to avoid too much data
-                }
-                
-                response = requests.get(
-                    self.nvd_api_base,
-                    params=params,
-                    timeout=10,
-                    headers={'User-Agent': 'Sanches-Dependency-Checker/1.0'}
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Parse vulnerabilities from response
-                    if 'vulnerabilities' in data and data['vulnerabilities']:
-                        for vuln_item in data['vulnerabilities']:
-                            cve = vuln_item.get('cve', {})
-                            cve_id = cve.get('id', 'Unknown CVE')
-                            
-                            # Get description
-                            descriptions = cve.get('descriptions', [])
-                            description = 'No description available'
-                            for desc in descriptions:
-                                if desc.get('lang') == 'en':
-                                    description = desc.get('value', 'No description available')
-                                    break
-                            
-                            # Get severity score if available
-                            metrics = cve.get('metrics', {})
-                            severity_info = ''
-                            
-                            # Try CVSS v3.1 first, then v3.0, then v2.0
-                            for cvss_version in ['cvssMetricV31', 'cvssMetricV30', 'cvssMetricV2']:
-                                if cvss_version in metrics and metrics[cvss_version]:
-                                    cvss_data = metrics[cvss_version][0].get('cvssData', {})
-                                    base_score = cvss_data.get('baseScore', 'N/A')
-                                    severity = cvss_data.get('baseSeverity', 'UNKNOWN')
-                                    severity_info = f" [CVSS: {base_score} - {severity}]"
-                                    break
-                            
-                            # Format vulnerability entry
-                            vuln_description = f"{cve_id}: {description[:200]}{severity_info}"
-                            if version:
-                                vuln_description = f"{vuln_description} (Package version: {version})"
-                            
-                            vulnerabilities.append({
-                                'package_type': package_type,
-                                'package': pkg_name,
-                                'description': vuln_description
-                            })
-                
-                # Respect rate limiting
-                time.sleep(self.request_delay)
-                
-            except (requests.RequestException, json.JSONDecodeError, KeyError):
-                # Continue with next package on error
-                continue
-        
+            data = responses.get(keywords[pkg_name])
+            if data:
+                try:
+                    found[(pkg_name, version)] = self._parse_nvd_response(data, pkg_name, version, package_type)
+                except (KeyError, TypeError, AttributeError):
+                    # Continue with next package on malformed data
+                    continue
+
+        return found, unaudited
+
+    def _get_nvd_client(self) -> Optional['NVDClient']:
+        """Shared NVD client (pooled session, rate limiter), created on first use"""
+        with self._nvd_lock:
+            if self.nvd is None:
+                # Imported here: requests is slow to import, and cached or offline runs never query NVD
+                from nvd_client import NVDClient
+                try:
+                    self.nvd = NVDClient()
+                except RuntimeError:
+                    return None
+            return self.nvd
+
+    def _parse_nvd_response(self, data: Dict[str, Any], pkg_name: str, version: str,
+                            package_type: str) -> List[Dict[str, Any]]:
+        """Turn an NVD CVE API response into vulnerability entries for one package"""
+        vulnerabilities = []
+
+        # Parse vulnerabilities from response
+        for vuln_item in data.get('vulnerabilities') or []:
+            cve = vuln_item.get('cve', {})
+            cve_id = cve.get('id', 'Unknown CVE')
+
+            # Get description
+            descriptions = cve.get('descriptions', [])
+            description = 'No description available'
+            for desc in descriptions:
+                if desc.get('lang') == 'en':
+                    description = desc.get('value', 'No description available')
+                    break
+
+            # Get severity score if available
+            metrics = cve.get('metrics', {})
+            severity_info = ''
+
+            # Try CVSS v3.1 first, then v3.0, then v2.0
+            for cvss_version in ['cvssMetricV31', 'cvssMetricV30', 'cvssMetricV2']:
+                if cvss_version in metrics and metrics[cvss_version]:
+                    cvss_data = metrics[cvss_version][0].get('cvssData', {})
+                    base_score = cvss_data.get('baseScore', 'N/A')
+                    severity = cvss_data.get('baseSeverity', 'UNKNOWN')
+                    severity_info = f" [CVSS: {base_score} - {severity}]"
+                    break
+
+            # Format vulnerability entry
+            vuln_description = f"{cve_id}: {description[:200]}{severity_info}"
+            if version:
+                vuln_description = f"{vuln_description} (Package version: {version})"
+
+            vulnerabilities.append({
+                'package_type': package_type,
+                'package': pkg_name,
+                'description': vuln_description
+            })
+
         return vulnerabilities
 
 
@@ -0,0 +1,205 @@
+"""
+Persistent store of findings across scans
+
+Every finding of a scan (code findings and vulnerable dependencies) is kept
+per project under a fingerprint that survives unrelated edits: it is made of
+the severity, the file path relative to the project and the description with
+line numbers and other digits masked. Findings that only differ in their
+digits are told apart by their order in the file (the second one gets
+occurrence 1, and so on). Recording a scan returns the delta against the
+previous one:
+
+- new: findings not open before (first seen now, or reintroduced)
+- resolved: open findings the scan no longer reports
+- unchanged: findings that are still open, with the time they were first seen
+
+Resolved findings are kept, so a finding that comes back is recognised. The
+table is indexed by project, severity and file so the UI can query open
+findings without loading whole reports.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from manifest import default_cache_dir
+
+FINDING_SEVERITIES = ('critical', 'warning')
+# Vulnerable dependencies are stored alongside code findings under their own severity
+DEPENDENCY = 'dependency'
+
+DIGITS = re.compile(r'\d+')
+LINE = re.compile(r'\blines?\s*(\d+)', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+
+def _normalize(text: str) -> str:
+    # Line numbers end up in descriptions; they must not make a moved finding look new
+    return WHITESPACE.sub(' ', DIGITS.sub('#', text or '')).strip().lower()
+
+
+def _line(description: str) -> int:
+    # Line the description mentions; 0 (keep the reported order) when there is none
+    match = LINE.search(description or '')
+    return int(match.group(1)) if match else 0
+
+
+def _relative(path: str, root: str) -> str:
+    if path and os.path.isabs(path):
+        relative = os.path.relpath(path, root)
+        if not relative.startswith('..'):
+            return relative.replace(os.sep, '/')
+    return (path or '').replace(os.sep, '/')
+
+
+def fingerprint(severity: str, file_path: str, description: str, occurrence: int = 0) -> str:
+    """
+    Stable identity of a finding; file_path is relative to the project and
+    occurrence counts earlier findings of the file with the same fingerprint
+    """
+    parts = (severity, file_path, _normalize(description))
+    if occurrence:
+        parts += (str(occurrence),)
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+
+def _entries(root: str, result: Dict[str, Any]) -> Dict[str, Tuple[str, str, Dict[str, Any]]]:
+    """fingerprint -> (severity, relative file path, finding) for every finding of a result"""
+    entries = {}
+    occurrences: Dict[str, int] = {}
+
+    def add(severity: str, key_path: str, file_path: str, finding: Dict[str, Any]) -> None:
+        first = fingerprint(severity, key_path, finding.get('description', ''))
+        occurrence = occurrences.get(first, 0)
+        occurrences[first] = occurrence + 1
+        key = fingerprint(severity, key_path, finding.get('description', ''), occurrence) if occurrence else first
+        entries[key] = (severity, file_path, finding)
+
+    for severity in FINDING_SEVERITIES:
+        # In line order, so occurrences keep their numbers when unrelated findings come and go
+        findings = sorted(result.get(severity) or [], key=lambda f: _line(f.get('description', '')))
+        for finding in findings:
+            file_path = _relative(finding.get('file_path', ''), root)
+            add(severity, file_path, file_path, finding)
+    for dependency in result.get('dependencies') or []:
+        manifests = dependency.get('manifests') or ['']
+        key = f"{dependency.get('package_type', '')}:{dependency.get('package', '')}"
+        add(DEPENDENCY, key, _relative(manifests[0], root), dependency)
+    return entries
+
+
+class FindingsStore:
+    def __init__(self, path: Optional[pathlib.Path] = None):
+        self.path = path or default_cache_dir() / 'findings.sqlite3'
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS findings ('
+            ' project TEXT, fingerprint TEXT, severity TEXT, file_path TEXT, finding TEXT,'
+            ' first_seen REAL, last_seen REAL, resolved_at REAL,'
+            ' PRIMARY KEY (project, fingerprint))'
+        )
+        # Open findings are what the UI asks for; resolved_at IS NULL is part of every index
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_findings_severity ON findings(project, resolved_at, severity)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_findings_file ON findings(project, file_path, resolved_at)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_findings_open ON findings(resolved_at, severity)')
+        self._db.commit()
+
+    @staticmethod
+    def _project(root: str) -> str:
+        return str(pathlib.Path(root).resolve())
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = {
+            'fingerprint': row['fingerprint'],
+            'severity': row['severity'],
+            'file_path': row['file_path'],
+            'first_seen': row['first_seen'],
+            'last_seen': row['last_seen'],
+            'finding': json.loads(row['finding']),
+        }
+        if row['resolved_at'] is not None:
+            entry['resolved_at'] = row['resolved_at']
+        return entry
+
+    def record(self, root: str, result: Dict[str, Any], unresolved_files: Iterable[str] = (),
+               dependencies_complete: bool = True) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Store the findings of a scan of root and return the delta against the
+        previous scan. Findings in unresolved_files (whose analysis failed) and,
+        unless dependencies_complete, missing dependency findings are not
+        resolved, as the scan couldn't tell whether they are still there.
+        """
+        project = self._project(root)
+        current = _entries(project, result)
+        keep_open = {_relative(p, project) for p in unresolved_files}
+        now = time.time()
+        delta: Dict[str, List[Dict[str, Any]]] = {'new': [], 'resolved': [], 'unchanged': []}
+
+        with self._lock:
+            rows = self._db.execute('SELECT * FROM findings WHERE project = ?', (project,)).fetchall()
+            known = {row['fingerprint']: row for row in rows}
+
+            updates = []
+            for key, (severity, file_path, finding) in current.items():
+                row = known.get(key)
+                is_new = row is None or row['resolved_at'] is not None
+                first_seen = now if is_new else row['first_seen']
+                updates.append((project, key, severity, file_path, json.dumps(finding), first_seen, now))
+                entry = {'fingerprint': key, 'severity': severity, 'file_path': file_path,
+                         'first_seen': first_seen, 'last_seen': now, 'finding': finding}
+                delta['new' if is_new else 'unchanged'].append(entry)
+            self._db.executemany(
+                'INSERT OR REPLACE INTO findings VALUES (?, ?, ?, ?, ?, ?, ?, NULL)', updates)
+
+            resolved = []
+            for key, row in known.items():
+                if key in current or row['resolved_at'] is not None:
+                    continue
+                if row['file_path'] in keep_open or (row['severity'] == DEPENDENCY and not dependencies_complete):
+                    delta['unchanged'].append(self._row(row))
+                    continue
+                resolved.append((now, project, key))
+                delta['resolved'].append({**self._row(row), 'resolved_at': now})
+            self._db.executemany(
+                'UPDATE findings SET resolved_at = ? WHERE project = ? AND fingerprint = ?', resolved)
+            self._db.commit()
+        return delta
+
+    def query(self, root: Optional[str] = None, severity: Optional[str] = None,
+              file_path: Optional[str] = None, include_resolved: bool = False) -> List[Dict[str, Any]]:
+        """Stored findings, open ones only unless include_resolved; every filter is optional"""
+        clauses, params = [], []
+        if root is not None:
+            project = self._project(root)
+            clauses.append('project = ?')
+            params.append(project)
+            if file_path is not None:
+                file_path = _relative(file_path, project)
+        if not include_resolved:
+            clauses.append('resolved_at IS NULL')
+        if severity is not None:
+            clauses.append('severity = ?')
+            params.append(severity)
+        if file_path is not None:
+            clauses.append('file_path = ?')
+            params.append(file_path)
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT * FROM findings{where} ORDER BY project, severity, file_path', params).fetchall()
+        return [{'project': row['project'], **self._row(row)} for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,357 @@
+"""
+Resilient Gemini request layer
+
+Wraps client.models.generate_content(_stream) so that one slow or failing
+request cannot stall or sink a scan:
+
+- every attempt has a deadline; a stalled attempt is abandoned and retried
+  (it keeps its concurrency slot until its call really returns, so the
+  requests in flight never exceed the limit)
+- 429 and 5xx responses, timeouts and connection errors are retried with
+  jittered exponential backoff, honouring Retry-After when the API sends it
+- concurrency adapts AIMD-style: it grows by one after a window of successful
+  requests and halves when the API answers 429 (rate limited)
+- optionally, an attempt that is slower than usual (long-tail) is hedged with
+  a duplicate request and whichever answers first wins
+
+Works with anything that looks like genai.Client().models, so it can be
+exercised against a local fake that injects latency and errors.
+"""
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+THROTTLED = 429
+
+DEFAULT_REQUEST_TIMEOUT = 180.0
+DEFAULT_MAX_RETRIES = 3
+# Latencies remembered for picking the hedging delay, and the quantile used
+LATENCY_WINDOW = 50
+HEDGE_QUANTILE = 0.95
+MIN_LATENCY_SAMPLES = 10
+
+
+class RequestTimeout(Exception):
+    """An attempt did not finish within its deadline"""
+
+
+def _status(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, 'code', None) or getattr(exc, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = _status(exc)
+    if status is not None:
+        return status in RETRY_STATUSES
+    if isinstance(exc, (RequestTimeout, TimeoutError, ConnectionError)):
+        return True
+    # google.genai talks through httpx; not imported here, as a failed request means it is loaded already
+    httpx = sys.modules.get('httpx')
+    return httpx is not None and isinstance(exc, httpx.TransportError)
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+    try:
+        return max(float(headers.get('Retry-After')), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimit:
+    """
+    AIMD concurrency limit. Each success adds 1/limit, i.e. one more slot per
+    window of successful requests; a 429 halves the limit, at most once per
+    window (requests already in flight when it was lowered don't lower it again).
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self._lowered_at = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, deadline: Optional[float] = None, block: bool = True) -> Optional[float]:
+        """Take a slot; returns the time it was taken, or None if none was free in time"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                if not block:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, taken_at: float, outcome: str) -> None:
+        """outcome is 'ok', 'throttled', 'error' or 'abandoned'"""
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == 'ok':
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif outcome == 'throttled' and taken_at >= self._lowered_at:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._lowered_at = time.monotonic()
+            self._cond.notify_all()
+
+
+@dataclass
+class RetryPolicy:
+    request_timeout: float = DEFAULT_REQUEST_TIMEOUT  # Max seconds per attempt
+    max_retries: int = DEFAULT_MAX_RETRIES
+    backoff_base: float = 1.0  # Seconds; doubled on every retry, then jittered
+    backoff_cap: float = 30.0
+    hedge: bool = False  # Race a duplicate request against one that is slower than usual
+    hedge_after: Optional[float] = None  # Seconds before hedging; None: the 95th percentile of recent latencies
+    min_concurrency: int = 1  # Throttling never lowers the concurrency below this
+
+
+@dataclass
+class GenerateResult:
+    text: str
+    usage: Any = None  # usage_metadata of the response, if the API reported it
+    attempts: int = 1
+    hedged: bool = False
+    first_chunk_ms: Optional[float] = None
+
+
+class _Attempt:
+    """One request running on its own thread, so it can be abandoned at its deadline"""
+
+    def __init__(self, client: 'GeminiClient', request: Dict[str, Any],
+                 stream: Optional['_StreamOwner'], slot: float):
+        self.future: Future = Future()
+        self.slot = slot
+        self.started = time.monotonic()
+        self.first_chunk_ms: Optional[float] = None
+        self._client = client
+        self._request = request
+        self._stream = stream
+        threading.Thread(target=self._run, name='gemini request', daemon=True).start()
+
+    def _run(self) -> None:
+        try:
+            models = self._client.get_models()
+            if self._stream is None:
+                response = models.generate_content(**self._request)
+                result = (response.text or '', getattr(response, 'usage_metadata', None))
+            else:
+                parts: List[str] = []
+                usage = None
+                for chunk in models.generate_content_stream(**self._request):
+                    if self.first_chunk_ms is None:
+                        self.first_chunk_ms = (time.monotonic() - self.started) * 1000
+                    text = chunk.text or ''
+                    parts.append(text)
+                    # The last chunk carries the usage of the whole response
+                    usage = getattr(chunk, 'usage_metadata', None) or usage
+                    self._stream.feed(self, text)
+                result = (''.join(parts), usage)
+        except BaseException as e:
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+
+
+class _StreamOwner:
+    """
+    Streamed text of concurrent attempts (a hedge, or a retry while an
+    abandoned attempt is still running) must not be interleaved: the first
+    attempt to produce text gets a fresh listener, the others are only
+    collected.
+    """
+
+    def __init__(self, new_listener: Callable[[], Callable[[str], None]]):
+        self.new_listener = new_listener
+        self._owner: Optional[_Attempt] = None
+        self._listener: Optional[Callable[[str], None]] = None
+        self._abandoned: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def feed(self, attempt: _Attempt, text: str) -> None:
+        with self._lock:
+            if id(attempt) in self._abandoned:
+                return
+            if self._owner is None:
+                self._owner, self._listener = attempt, self.new_listener()
+            if self._owner is not attempt:
+                return
+            listener = self._listener
+        listener(text)
+
+    def disown(self, attempt: _Attempt) -> None:
+        """An abandoned or losing attempt never streams again"""
+        with self._lock:
+            self._abandoned.add(id(attempt))
+            if self._owner is attempt:
+                self._owner = self._listener = None
+
+
+class GeminiClient:
+    def __init__(self, get_models: Callable[[], Any], concurrency: int = 4, policy: Optional[RetryPolicy] = None):
+        self.get_models = get_models  # Returns client.models; called per request
+        self.policy = policy or RetryPolicy()
+        self.limit = AdaptiveLimit(concurrency, self.policy.min_concurrency)
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'timeouts': 0,
+                      'hedges': 0, 'hedge_wins': 0, 'failures': 0}
+        self._latencies: List[float] = []
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, 'concurrency_limit': int(self.limit.limit)}
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps concurrent batches from retrying in lockstep
+        return random.uniform(0, min(self.policy.backoff_cap, self.policy.backoff_base * 2 ** attempt))
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.policy.hedge:
+            return None
+        if self.policy.hedge_after is not None:
+            return self.policy.hedge_after
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_QUANTILE))]
+
+    def _record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            del self._latencies[:-LATENCY_WINDOW]
+
+    def _start(self, request: Dict[str, Any], stream: Optional[_StreamOwner], deadline: Optional[float],
+               block: bool = True) -> Optional[_Attempt]:
+        slot = self.limit.acquire(deadline, block)
+        if slot is None:
+            return None
+        self._count('requests')
+        return _Attempt(self, request, stream, slot)
+
+    def _finish(self, attempt: _Attempt, stream: Optional[_StreamOwner], won: bool = False) -> None:
+        """
+        Give back the slot of an attempt once its call has returned; an
+        abandoned attempt is left to run out on its own and holds its slot until then
+        """
+        abandoned = not attempt.future.done()
+
+        def release(future: Future) -> None:
+            exc = future.exception()
+            if exc is None:
+                # A late answer nobody waited for says little about how much the API can take
+                outcome = 'abandoned' if abandoned else 'ok'
+            elif _status(exc) == THROTTLED:
+                outcome = 'throttled'
+            else:
+                outcome = 'error'
+            self.limit.release(attempt.slot, outcome)
+
+        attempt.future.add_done_callback(release)
+        if stream is not None and not won:
+            stream.disown(attempt)
+
+    def _await(self, attempts: List[_Attempt], timeout: float) -> Optional[_Attempt]:
+        """First attempt to succeed within timeout; raises the last error if all of them failed"""
+        pending = set(a.future for a in attempts)
+        by_future = {a.future: a for a in attempts}
+        end = time.monotonic() + timeout
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, end - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                return None
+            for future in done:
+                if future.exception() is None:
+                    return by_future[future]
+                error = future.exception()
+        raise error
+
+    def generate(self, request: Dict[str, Any],
+                 on_stream: Optional[Callable[[], Callable[[str], None]]] = None,
+                 deadline: Optional[float] = None) -> GenerateResult:
+        """
+        Run one request with retries. With on_stream the response is streamed;
+        on_stream() is called for a fresh text listener each time an attempt
+        starts producing text. deadline (time.monotonic()) bounds all attempts;
+        the last error is raised when they all fail.
+        """
+        stream = _StreamOwner(on_stream) if on_stream is not None else None
+        last_error: BaseException = RequestTimeout('no attempt could be started before the deadline')
+
+        for retry in range(self.policy.max_retries + 1):
+            if retry:
+                self._count('retries')
+            timeout = self.policy.request_timeout
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                break
+
+            # Slots of abandoned attempts come back when their calls return; wait for one up to the deadline
+            primary = self._start(request, stream, deadline)
+            if primary is None:
+                break
+            attempt_deadline = primary.started + self.policy.request_timeout
+            if deadline is not None:
+                attempt_deadline = min(attempt_deadline, deadline)
+            attempts = [primary]
+            hedged = False
+            try:
+                winner = None
+                delay = self._hedge_delay()
+                if delay is not None and delay < attempt_deadline - time.monotonic():
+                    winner = self._await(attempts, delay)
+                    if winner is None:
+                        # Long-tail request: race a duplicate, if a slot is free right now
+                        hedge = self._start(request, stream, attempt_deadline, block=False)
+                        if hedge is not None:
+                            self._count('hedges')
+                            attempts.append(hedge)
+                            hedged = True
+                if winner is None:
+                    winner = self._await(attempts, attempt_deadline - time.monotonic())
+                if winner is None:
+                    raise RequestTimeout(f'no response within {timeout:.0f}s')
+            except Exception as e:
+                if isinstance(e, RequestTimeout):
+                    self._count('timeouts')
+                elif _status(e) == THROTTLED:
+                    self._count('throttled')
+                for attempt in attempts:
+                    self._finish(attempt, stream)
+                last_error = e
+                if not is_retryable(e):
+                    break
+                pause = _retry_after(e)
+                if pause is None:
+                    pause = self._backoff(retry)
+                if deadline is not None:
+                    pause = min(pause, max(0.0, deadline - time.monotonic()))
+                time.sleep(pause)
+                continue
+
+            for attempt in attempts:
+                self._finish(attempt, stream, won=attempt is winner)
+            if hedged and winner is not primary:
+                self._count('hedge_wins')
+            self._record_latency(time.monotonic() - winner.started)
+            text, usage = winner.future.result()
+            return GenerateResult(text, usage, retry + 1, hedged, winner.first_chunk_ms)
+
+        self._count('failures')
+        raise last_error
@@ -0,0 +1,243 @@
+"""
+Git index reader
+
+Reads .git/index (versions 2, 3 and 4) directly, without running git, to get
+the tracked files of a repository together with the stat data and blob hash
+git recorded for each of them. A tracked file whose size and mtime still
+match the index is clean, and its content hash is known without reading it.
+
+Content hashes are git blob ids (SHA-1 over "blob <size>\\0" + content), so
+hashes computed for changed files and hashes taken from the index compare
+directly.
+
+changed_since() is the one place that runs git: it lists the files that
+differ from a given revision (plus untracked ones) for --since.
+"""
+import hashlib
+import os
+import struct
+import subprocess
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from walker import DEPENDENCY_FILES, is_pruned_dir
+
+INDEX_SIGNATURE = b'DIRC'
+SUPPORTED_VERSIONS = (2, 3, 4)
+# ctime, mtime (seconds, nanoseconds), dev, ino, mode, uid, gid, size, blob id, flags
+ENTRY_HEADER = struct.Struct('>IIIIIIIIII20sH')
+CHECKSUM_BYTES = 20
+
+FLAG_EXTENDED = 0x4000
+NAME_MASK = 0x0FFF
+STAGE_SHIFT = 12
+EXTENDED_SKIP_WORKTREE = 0x4000
+EXTENDED_INTENT_TO_ADD = 0x2000
+
+MODE_TYPE_MASK = 0o170000
+MODE_REGULAR = 0o100000
+
+
+def blob_hash(data) -> str:
+    """Git blob id of the content; accepts any bytes-like object (bytes, mmap)"""
+    digest = hashlib.sha1(b'blob %d\0' % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+@dataclass
+class IndexEntry:
+    path: str  # Relative to the work tree, '/'-separated
+    mode: int
+    size: int
+    mtime_s: int
+    mtime_ns: int
+    ino: int
+    blob: str  # Hex blob id
+
+
+def find_git_dir(path: str) -> Optional[Tuple[str, str]]:
+    """(work tree root, git dir) of the repository containing path, or None"""
+    current = os.path.abspath(path if os.path.isdir(path) else os.path.dirname(path))
+    while True:
+        dot_git = os.path.join(current, '.git')
+        if os.path.isdir(dot_git):
+            return current, dot_git
+        if os.path.isfile(dot_git):
+            # Linked work trees and submodules: "gitdir: <path>"
+            try:
+                with open(dot_git, 'r', encoding='utf-8') as f:
+                    line = f.readline().strip()
+            except OSError:
+                return None
+            if line.startswith('gitdir:'):
+                return current, os.path.normpath(os.path.join(current, line[len('gitdir:'):].strip()))
+            return None
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def _varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """Git's offset encoding (used by index v4 path compression); returns (value, next offset)"""
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, offset
+
+
+def parse_index(data: bytes) -> Optional[List[IndexEntry]]:
+    """
+    Stage-0 entries of an index file. Returns None for anything this reader
+    does not handle (unknown version, split index, SHA-256 repositories,
+    corruption), so callers can fall back to walking the tree.
+    """
+    if len(data) < 12 + CHECKSUM_BYTES or data[:4] != INDEX_SIGNATURE:
+        return None
+    version, count = struct.unpack_from('>II', data, 4)
+    if version not in SUPPORTED_VERSIONS:
+        return None
+    # index.skipHash leaves the checksum zeroed; otherwise it guards against torn reads
+    checksum = data[-CHECKSUM_BYTES:]
+    if checksum != bytes(CHECKSUM_BYTES) and hashlib.sha1(data[:-CHECKSUM_BYTES]).digest() != checksum:
+        return None
+
+    entries: List[IndexEntry] = []
+    offset = 12
+    previous = b''
+    try:
+        for _ in range(count):
+            (_, _, mtime_s, mtime_ns, _, ino, mode, _, _, size,
+             blob, flags) = ENTRY_HEADER.unpack_from(data, offset)
+            position = offset + ENTRY_HEADER.size
+            extended = 0
+            if flags & FLAG_EXTENDED:
+                extended, = struct.unpack_from('>H', data, position)
+                position += 2
+
+            if version == 4:
+                strip, position = _varint(data, position)
+                end = data.index(b'\0', position)
+                name = previous[:len(previous) - strip] + data[position:end]
+                offset = end + 1
+            else:
+                length = flags & NAME_MASK
+                end = position + length if length < NAME_MASK else data.index(b'\0', position)
+                name = data[position:end]
+                # Entries are NUL-padded to a multiple of 8 bytes
+                offset += (end - offset + 8) & ~7
+            previous = name
+
+            if (flags >> STAGE_SHIFT) & 3 or extended & (EXTENDED_SKIP_WORKTREE | EXTENDED_INTENT_TO_ADD):
+                continue
+            entries.append(IndexEntry(name.decode('utf-8', 'surrogateescape'), mode, size,
+                                      mtime_s, mtime_ns, ino, blob.hex()))
+
+        # A split index keeps most entries in a shared file
+        while offset + 8 <= len(data) - CHECKSUM_BYTES:
+            signature, length = struct.unpack_from('>4sI', data, offset)
+            if signature == b'link':
+                return None
+            offset += 8 + length
+    except (struct.error, ValueError, IndexError):
+        return None
+    return entries
+
+
+class GitIndex:
+    """Tracked files of a repository, as of its index"""
+
+    def __init__(self, work_tree: str, entries: List[IndexEntry], index_mtime_ns: int):
+        self.work_tree = work_tree
+        self.entries: Dict[str, IndexEntry] = {e.path: e for e in entries}
+        # Files modified in the same instant the index was written may not show in their stat data
+        self.index_mtime_ns = index_mtime_ns
+
+    @classmethod
+    def open(cls, path: str) -> Optional['GitIndex']:
+        """Index of the repository containing path; None outside a repository or if it can't be read"""
+        found = find_git_dir(path)
+        if found is None:
+            return None
+        work_tree, git_dir = found
+        index_path = os.path.join(git_dir, 'index')
+        try:
+            with open(index_path, 'rb') as f:
+                index_mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+                data = f.read()
+        except OSError:
+            return None
+        entries = parse_index(data)
+        if entries is None:
+            return None
+        return cls(work_tree, entries, index_mtime_ns)
+
+    def _relative(self, path: str) -> Optional[str]:
+        rel_path = os.path.relpath(os.path.abspath(path), self.work_tree)
+        if rel_path == '.' or rel_path.startswith('..'):
+            return None
+        return rel_path.replace(os.sep, '/')
+
+    def tracked(self, root: str, skip_files: Set[str] = DEPENDENCY_FILES) -> Set[str]:
+        """
+        Regular files tracked under root, relative to root ('/'-separated),
+        leaving out what the walker never yields (dependency folders and files)
+        """
+        prefix = self._relative(root)
+        prefix = prefix + '/' if prefix else ''
+        tracked = set()
+        for rel_path, entry in self.entries.items():
+            if entry.mode & MODE_TYPE_MASK != MODE_REGULAR or not rel_path.startswith(prefix):
+                continue
+            parts = rel_path[len(prefix):].split('/')
+            if parts[-1] in skip_files or any(is_pruned_dir(part) for part in parts[:-1]):
+                continue
+            tracked.add('/'.join(parts))
+        return tracked
+
+    def clean_blob(self, path: str, st: Optional[os.stat_result] = None) -> Optional[str]:
+        """
+        The blob id of a tracked file if its stat data still matches the index
+        (so its content is what git recorded), else None
+        """
+        rel_path = self._relative(path)
+        entry = self.entries.get(rel_path) if rel_path is not None else None
+        if entry is None:
+            return None
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return None
+        if st.st_size != entry.size or st.st_ino & 0xFFFFFFFF != entry.ino and entry.ino:
+            return None
+        if st.st_mtime_ns >= self.index_mtime_ns:
+            return None
+        mtime_s, mtime_ns = divmod(st.st_mtime_ns, 1_000_000_000)
+        # Without nanosecond support git stores 0; compare whole seconds then
+        if mtime_s & 0xFFFFFFFF != entry.mtime_s or (entry.mtime_ns and mtime_ns != entry.mtime_ns):
+            return None
+        return entry.blob
+
+
+def changed_since(root: str, revision: str) -> List[str]:
+    """
+    Absolute paths under root that differ from revision in the work tree
+    (modified, added or deleted), plus untracked files that aren't ignored
+    """
+    def git(*args: str) -> List[str]:
+        try:
+            completed = subprocess.run(['git', '-C', root, *args], capture_output=True, check=True)
+        except FileNotFoundError:
+            raise RuntimeError('--since needs git on the PATH')
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"git {args[0]} failed: {e.stderr.decode('utf-8', 'replace').strip()}")
+        return [p for p in completed.stdout.decode('utf-8', 'surrogateescape').split('\0') if p]
+
+    changed = git('diff', '--name-only', '--relative', '--no-renames', '-z', revision, '--')
+    changed += git('ls-files', '--others', '--exclude-standard', '-z')
+    return sorted({os.path.join(root, p) for p in changed})
@@ -0,0 +1,130 @@
+"""
+File ingestion: cheap binary sniffing, size caps and bounded-memory reads
+
+Every candidate file is classified from its extension and a small header
+before it is read in full. Binaries, oversized files and minified bundles
+(generated or not) are skipped and reported instead of being sent to Gemini.
+Generated sources that read like code are kept; compaction truncates
+generated data.
+"""
+import mmap
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+from gitindex import blob_hash
+
+BINARY_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.icns', '.webp', '.tiff', '.psd',
+    '.mp3', '.mp4', '.mov', '.avi', '.wav', '.ogg', '.flac', '.webm',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.tar', '.jar', '.war',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+    '.exe', '.dll', '.so', '.dylib', '.a', '.o', '.lib', '.class', '.pyc', '.pyo', '.wasm',
+    '.db', '.sqlite', '.sqlite3', '.bin', '.dat', '.pack', '.idx',
+}
+
+MAGIC_NUMBERS = (
+    b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'II*\x00', b'MM\x00*', b'\x00\x00\x01\x00',
+    b'%PDF', b'PK\x03\x04', b'\x1f\x8b', b'BZh', b'\xfd7zXZ', b'7z\xbc\xaf', b'Rar!',
+    b'\x7fELF', b'\xca\xfe\xba\xbe', b'\xcf\xfa\xed\xfe', b'\xce\xfa\xed\xfe', b'\x00asm',
+    b'SQLite format 3', b'wOFF', b'wOF2', b'ID3', b'OggS', b'RIFF', b'fLaC',
+)
+
+MINIFIED_SUFFIXES = ('.min.js', '.min.css', '.min.mjs', '.bundle.js', '.chunk.js', '.js.map', '.css.map')
+GENERATED_MARKERS = (b'@generated', b'DO NOT EDIT', b'<auto-generated', b'Code generated by', b'This file is automatically generated')
+
+HEADER_BYTES = 8192
+MMAP_THRESHOLD = 256 * 1024
+# Average line length above which a file is treated as minified
+MINIFIED_LINE_LENGTH = 500
+
+
+@dataclass
+class IngestLimits:
+    max_file_bytes: int = 1_000_000
+    max_total_bytes: int = 20_000_000
+
+
+@dataclass
+class IngestedFile:
+    text: str
+    digest: str
+    size: int = 0
+
+
+def sniff(header: bytes) -> Optional[str]:
+    """Classify a file from its first bytes; returns a skip reason or None"""
+    if b'\x00' in header or header.startswith(MAGIC_NUMBERS):
+        return 'binary'
+
+    if len(header) < 2048 or len(header) / (header.count(b'\n') + 1) <= MINIFIED_LINE_LENGTH:
+        return None
+    # A generator marker in the leading comment block only names the reason: generated
+    # code with ordinary lines (protobuf stubs, ORM models) is still worth scanning
+    if any(marker in header[:1024] for marker in GENERATED_MARKERS):
+        return 'generated'
+    return 'minified'
+
+
+class Ingestor:
+    def __init__(self, limits: Optional[IngestLimits] = None):
+        self.limits = limits or IngestLimits()
+        self.total_bytes = 0
+        self.skipped: List[Dict[str, str]] = []
+
+    def _skip(self, path: str, reason: str) -> None:
+        self.skipped.append({'file_path': path, 'reason': reason})
+
+    def load(self, path: str, digest: Optional[str] = None) -> Union[IngestedFile, str]:
+        """
+        Read, hash and decode one file; returns it, or the reason it is skipped.
+        digest, if known (e.g. from the git index), is used instead of hashing.
+        Changes nothing on the ingestor, so several threads may load at once;
+        accept() then applies the total size budget (see pipeline.py).
+        """
+        name = os.path.basename(path).lower()
+        if os.path.splitext(name)[1] in BINARY_EXTENSIONS:
+            return 'binary'
+        if name.endswith(MINIFIED_SUFFIXES):
+            return 'minified'
+
+        try:
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size > self.limits.max_file_bytes:
+                    return 'too_large'
+                # total_bytes only grows, so a file that doesn't fit now won't fit in accept() either
+                if self.total_bytes + size > self.limits.max_total_bytes:
+                    return 'total_size_limit'
+
+                header = f.read(HEADER_BYTES)
+                reason = sniff(header)
+                if reason:
+                    return reason
+
+                if size < MMAP_THRESHOLD:
+                    data = header + f.read()
+                    return IngestedFile(data.decode('utf-8'), digest or blob_hash(data), size)
+                # Hash and decode straight from the mapping, without an extra bytes copy
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return IngestedFile(str(mapped, 'utf-8'), digest or blob_hash(mapped), size)
+        except UnicodeDecodeError:
+            return 'binary'
+        except (OSError, ValueError):
+            return 'unreadable'
+
+    def accept(self, path: str, loaded: Union[IngestedFile, str]) -> Optional[IngestedFile]:
+        """Count a loaded file against the total size budget, or record why it was skipped"""
+        if isinstance(loaded, str):
+            self._skip(path, loaded)
+            return None
+        if self.total_bytes + loaded.size > self.limits.max_total_bytes:
+            self._skip(path, 'total_size_limit')
+            return None
+        self.total_bytes += loaded.size
+        return loaded
+
+    def read(self, path: str, digest: Optional[str] = None) -> Optional[IngestedFile]:
+        """Read, hash and decode one file, or record why it was skipped"""
+        return self.accept(path, self.load(path, digest))
@@ -0,0 +1,137 @@
+"""
+On-disk cache of Gemini analysis results
+
+Maps (batch content, prompt version, model) to the parsed report so identical
+batches seen on another branch, clone or project cost no API call. Entries
+expire after a TTL and the cache is kept under a byte budget by evicting the
+least recently used entries.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from manifest import SEVERITIES, content_hash, default_cache_dir
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+# Bumped when the stored report format changes, so older entries are never read back
+CACHE_FORMAT = 2
+# Marks the finding paths put made relative to the batch; only those are rebased by get
+RELATIVE_PREFIX = './'
+
+
+def _relative_base(files_content: Dict[str, str]) -> str:
+    paths = list(files_content)
+    if len(paths) == 1:
+        return os.path.dirname(paths[0])
+    return os.path.commonpath(paths)
+
+
+def _relativize(path: str, base: str, prefix: str = '') -> str:
+    if base and path.startswith(base + os.sep):
+        return prefix + path[len(base) + 1:]
+    return path
+
+
+class LLMCache:
+    def __init__(self, path: Optional[pathlib.Path] = None, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path or default_cache_dir() / 'llm_cache.sqlite3'
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS llm_results ('
+            ' key TEXT PRIMARY KEY, model TEXT, prompt_version TEXT, report TEXT,'
+            ' size INTEGER, created_at REAL, last_used REAL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_llm_results_last_used ON llm_results(last_used)')
+        self._db.commit()
+
+    @staticmethod
+    def batch_key(files_content: Dict[str, str], prompt_version: str, model: str) -> str:
+        """
+        Key a batch by its contents and paths relative to the batch's common
+        directory, so the same files in another checkout share an entry
+        """
+        base = _relative_base(files_content)
+        items = sorted((_relativize(p, base), content_hash(c.encode('utf-8'))) for p, c in files_content.items())
+        payload = json.dumps({'files': items, 'prompt_version': prompt_version, 'model': model,
+                              'format': CACHE_FORMAT})
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, files_content: Dict[str, str], prompt_version: str, model: str) -> Optional[Dict[str, Any]]:
+        key = self.batch_key(files_content, prompt_version, model)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute('SELECT report, created_at FROM llm_results WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._db.execute('DELETE FROM llm_results WHERE key = ?', (key,))
+                    self._db.commit()
+                self.stats['misses'] += 1
+                return None
+            self._db.execute('UPDATE llm_results SET last_used = ? WHERE key = ?', (now, key))
+            self._db.commit()
+            self.stats['hits'] += 1
+
+        # Stored paths are relative to the batch; point them at this checkout
+        base = _relative_base(files_content)
+        report = json.loads(row[0])
+        for severity in SEVERITIES:
+            for finding in report.get(severity, []) or []:
+                file_path = finding.get('file_path', '')
+                if file_path.startswith(RELATIVE_PREFIX):
+                    finding['file_path'] = os.path.join(base, file_path[len(RELATIVE_PREFIX):])
+        return report
+
+    def put(self, files_content: Dict[str, str], prompt_version: str, model: str,
+            report: Dict[str, Any]) -> None:
+        key = self.batch_key(files_content, prompt_version, model)
+        base = _relative_base(files_content)
+        # 'directory' is checkout specific, so it is not cached
+        stored = {k: v for k, v in report.items() if k not in SEVERITIES and k != 'directory'}
+        for severity in SEVERITIES:
+            stored[severity] = [
+                {**finding, 'file_path': _relativize(finding.get('file_path', ''), base, RELATIVE_PREFIX)}
+                for finding in report.get(severity, []) or []
+            ]
+        payload = json.dumps(stored)
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO llm_results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, model, prompt_version, payload, len(payload), now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        cursor = self._db.execute('DELETE FROM llm_results WHERE created_at < ?', (now - self.ttl,))
+        self.stats['evictions'] += cursor.rowcount
+
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM llm_results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute('SELECT key, size FROM llm_results ORDER BY last_used').fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute('DELETE FROM llm_results WHERE key = ?', (key,))
+            self.stats['evictions'] += 1
+            total -= size
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,373 @@
+"""
+Streaming lockfile parsers
+
+Resolve the exact installed versions (direct and transitive) from
+package-lock.json / npm-shrinkwrap.json, yarn.lock, poetry.lock and
+Pipfile.lock. Files are read line by line where the format allows it, so
+multi-megabyte lockfiles never have to be loaded into a full JSON document:
+
+- package-lock.json v2/v3 as written by npm (2-space indented) is scanned
+  line by line; v1 or minified files fall back to json.load
+- yarn.lock (classic and berry) and poetry.lock are line-oriented already
+- Pipfile.lock is small and flat, so it is decoded with json
+
+Package names are normalised (lower-case, PEP 503 for Python) so duplicates
+collapse before any lookup.
+"""
+import json
+import pathlib
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from vulndb import normalize_package
+
+# Lockfiles of each ecosystem, in order of preference
+LOCKFILES = {
+    'npm': ('package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock'),
+    'pip': ('poetry.lock', 'Pipfile.lock'),
+}
+
+
+@dataclass
+class ResolvedPackage:
+    ecosystem: str
+    name: str
+    version: str
+    direct: bool = False
+    requires: Tuple[str, ...] = ()
+
+
+class ResolvedGraph:
+    """Resolved packages of one lockfile, collapsed by (name, version)"""
+
+    def __init__(self, ecosystem: str):
+        self.ecosystem = ecosystem
+        self.packages: Dict[Tuple[str, str], ResolvedPackage] = {}
+
+    def add(self, name: str, version: str, direct: bool = False, requires: Tuple[str, ...] = ()) -> None:
+        if not name or not version:
+            return
+        name = normalize_package(self.ecosystem, name)
+        requires = tuple(normalize_package(self.ecosystem, r) for r in requires)
+        existing = self.packages.get((name, version))
+        if existing is None:
+            self.packages[(name, version)] = ResolvedPackage(self.ecosystem, name, version, direct, requires)
+        else:
+            existing.direct = existing.direct or direct
+            existing.requires = tuple(dict.fromkeys(existing.requires + requires))
+
+    def versions(self) -> Dict[str, str]:
+        """name -> version, preferring direct (hoisted) entries when a name resolves twice"""
+        result: Dict[str, str] = {}
+        for package in sorted(self.packages.values(), key=lambda p: not p.direct):
+            result.setdefault(package.name, package.version)
+        return result
+
+    def __iter__(self) -> Iterator[ResolvedPackage]:
+        return iter(self.packages.values())
+
+    def __len__(self) -> int:
+        return len(self.packages)
+
+
+def _declared_npm_names(package_json: pathlib.Path) -> Set[str]:
+    try:
+        with open(package_json, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return set()
+    names = set()
+    for dep_type in ('dependencies', 'devDependencies', 'optionalDependencies'):
+        names.update(normalize_package('npm', n) for n in (data.get(dep_type) or {}))
+    return names
+
+
+# --- package-lock.json -------------------------------------------------------
+
+_LOCK_PACKAGE = re.compile(r'^    "(.*)": \{$')
+_LOCK_FIELD = re.compile(r'^      "(version|name|link)": (.*?),?$')
+_LOCK_DEPS = re.compile(r'^      "(dependencies|devDependencies|optionalDependencies|peerDependencies)": \{$')
+_LOCK_DEP = re.compile(r'^        "(.*)": ".*",?$')
+
+
+def _parse_package_lock_lines(path: pathlib.Path, graph: ResolvedGraph) -> bool:
+    """Line scan of npm's pretty-printed v2/v3 layout; returns False if the layout is different"""
+    entries: List[Dict] = []
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline().rstrip('\n')
+        if first != '{':
+            return False
+
+        in_packages = False
+        current: Optional[Dict] = None
+        deps_kind: Optional[str] = None
+        for line in f:
+            line = line.rstrip('\n')
+            if not in_packages:
+                if line == '  "packages": {':
+                    in_packages = True
+                elif line.startswith('  "lockfileVersion": 1'):
+                    return False
+                continue
+            if line.startswith('  }'):
+                break
+
+            match = _LOCK_PACKAGE.match(line)
+            if match:
+                current = {'key': match.group(1), 'deps': [], 'declared': []}
+                entries.append(current)
+                deps_kind = None
+                continue
+            if current is None:
+                continue
+            if deps_kind is not None:
+                if line.startswith('      }'):
+                    deps_kind = None
+                    continue
+                match = _LOCK_DEP.match(line)
+                if match:
+                    current['deps'].append(match.group(1))
+                    if deps_kind != 'peerDependencies':
+                        current['declared'].append(match.group(1))
+                continue
+            match = _LOCK_DEPS.match(line)
+            if match:
+                deps_kind = match.group(1)
+                continue
+            match = _LOCK_FIELD.match(line)
+            if match:
+                current[match.group(1)] = json.loads(match.group(2))
+
+    if not in_packages:
+        return False
+
+    # The root ("") and workspace entries declare the direct dependencies
+    direct = set()
+    for entry in entries:
+        if 'node_modules/' not in entry['key']:
+            direct.update(normalize_package('npm', n) for n in entry['declared'])
+
+    for entry in entries:
+        key = entry['key']
+        if 'node_modules/' not in key or entry.get('link'):
+            continue
+        name = entry.get('name') or key.rsplit('node_modules/', 1)[-1]
+        hoisted = key.count('node_modules/') == 1
+        graph.add(name, entry.get('version', ''), hoisted and normalize_package('npm', name) in direct,
+                  tuple(entry['deps']))
+    return True
+
+
+def _walk_lock_v1(dependencies: Dict, direct: Set[str], graph: ResolvedGraph, top_level: bool) -> None:
+    for name, info in (dependencies or {}).items():
+        graph.add(name, info.get('version', ''), top_level and normalize_package('npm', name) in direct,
+                  tuple(info.get('requires', {}) or {}))
+        _walk_lock_v1(info.get('dependencies'), direct, graph, False)
+
+
+def parse_package_lock(path: pathlib.Path) -> ResolvedGraph:
+    graph = ResolvedGraph('npm')
+    if _parse_package_lock_lines(path, graph):
+        return graph
+
+    # Lockfile v1 or non-standard formatting: decode the whole document
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    graph = ResolvedGraph('npm')
+    packages = data.get('packages')
+    if packages:
+        direct = set()
+        for key, info in packages.items():
+            if 'node_modules/' not in key:
+                for dep_type in ('dependencies', 'devDependencies', 'optionalDependencies'):
+                    direct.update(normalize_package('npm', n) for n in (info.get(dep_type) or {}))
+        for key, info in packages.items():
+            if 'node_modules/' not in key or info.get('link'):
+                continue
+            name = info.get('name') or key.rsplit('node_modules/', 1)[-1]
+            hoisted = key.count('node_modules/') == 1
+            graph.add(name, info.get('version', ''), hoisted and normalize_package('npm', name) in direct,
+                      tuple(info.get('dependencies') or {}))
+    else:
+        direct = _declared_npm_names(path.parent / 'package.json')
+        _walk_lock_v1(data.get('dependencies'), direct, graph, True)
+    return graph
+
+
+# --- yarn.lock ---------------------------------------------------------------
+
+def _yarn_spec_name(spec: str) -> str:
+    spec = spec.strip().strip('"')
+    # "@scope/name@^1.0.0" or "name@npm:^1.0.0": the name ends at the last '@' after position 0
+    at = spec.rfind('@', 1)
+    return spec[:at] if at > 0 else spec
+
+
+def parse_yarn_lock(path: pathlib.Path) -> ResolvedGraph:
+    """Parse classic (v1) and berry yarn.lock files line by line"""
+    graph = ResolvedGraph('npm')
+    direct = _declared_npm_names(path.parent / 'package.json')
+
+    name: Optional[str] = None
+    version = ''
+    requires: List[str] = []
+    in_deps = False
+
+    def flush():
+        if name and version:
+            graph.add(name, version, normalize_package('npm', name) in direct, tuple(requires))
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for raw in f:
+            line = raw.rstrip('\n')
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            if not line.startswith(' '):
+                flush()
+                header = line.rstrip(':')
+                name = None if header.startswith('__metadata') else _yarn_spec_name(header.split(',')[0])
+                version, requires, in_deps = '', [], False
+                continue
+            if line.startswith('    '):
+                if in_deps:
+                    dep = line.strip()
+                    if dep.startswith('"'):
+                        requires.append(dep[1:dep.index('"', 1)])
+                    else:
+                        requires.append(re.split(r'[:\s]', dep, 1)[0])
+                continue
+
+            stripped = line.strip()
+            in_deps = stripped in ('dependencies:', 'optionalDependencies:')
+            if stripped.startswith('version'):
+                version = stripped[len('version'):].lstrip(':').strip().strip('"')
+    flush()
+    return graph
+
+
+# --- poetry.lock -------------------------------------------------------------
+
+_TOML_KEY = re.compile(r'^("?)([A-Za-z0-9_.\-]+)\1\s*=\s*(.*)$')
+
+
+def _declared_python_names(directory: pathlib.Path) -> Set[str]:
+    """Direct dependencies from pyproject.toml (poetry/PEP 621) or Pipfile, if tomllib is available"""
+    names: Set[str] = set()
+    try:
+        # Imported here: only Python projects without a requirements file get this far
+        import tomllib
+    except ImportError:
+        return names
+    for filename in ('pyproject.toml', 'Pipfile'):
+        try:
+            with open(directory / filename, 'rb') as f:
+                data = tomllib.load(f)
+        except (OSError, ValueError):
+            continue
+        poetry = data.get('tool', {}).get('poetry', {})
+        sections = [poetry.get('dependencies', {}), poetry.get('dev-dependencies', {}),
+                    data.get('packages', {}), data.get('dev-packages', {})]
+        for group in (poetry.get('group') or {}).values():
+            sections.append(group.get('dependencies', {}))
+        for section in sections:
+            names.update(normalize_package('pip', n) for n in section if n.lower() != 'python')
+        for requirement in data.get('project', {}).get('dependencies', []):
+            match = re.match(r'^([A-Za-z0-9_.\-]+)', requirement)
+            if match:
+                names.add(normalize_package('pip', match.group(1)))
+    return names
+
+
+def parse_poetry_lock(path: pathlib.Path) -> ResolvedGraph:
+    graph = ResolvedGraph('pip')
+    direct = _declared_python_names(path.parent)
+
+    name = version = ''
+    requires: List[str] = []
+    section = ''
+
+    def flush():
+        if name:
+            graph.add(name, version, normalize_package('pip', name) in direct, tuple(requires))
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line == '[[package]]':
+                flush()
+                name = version = ''
+                requires = []
+                section = 'package'
+                continue
+            if line.startswith('['):
+                section = line
+                continue
+
+            match = _TOML_KEY.match(line)
+            if not match:
+                continue
+            key, value = match.group(2), match.group(3)
+            if section == 'package' and key in ('name', 'version'):
+                value = value.strip().strip('"')
+                if key == 'name':
+                    name = value
+                else:
+                    version = value
+            elif section == '[package.dependencies]':
+                requires.append(key)
+    flush()
+    return graph
+
+
+# --- Pipfile.lock ------------------------------------------------------------
+
+def parse_pipfile_lock(path: pathlib.Path) -> ResolvedGraph:
+    graph = ResolvedGraph('pip')
+    direct = _declared_python_names(path.parent)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    for section in ('default', 'develop'):
+        for name, info in (data.get(section) or {}).items():
+            version = (info.get('version') or '').lstrip('=')
+            graph.add(name, version, normalize_package('pip', name) in direct)
+    return graph
+
+
+PARSERS = {
+    'package-lock.json': parse_package_lock,
+    'npm-shrinkwrap.json': parse_package_lock,
+    'yarn.lock': parse_yarn_lock,
+    'poetry.lock': parse_poetry_lock,
+    'Pipfile.lock': parse_pipfile_lock,
+}
+
+
+def parse_lockfile(path: pathlib.Path) -> Optional[ResolvedGraph]:
+    """Parse a supported lockfile; returns None if it is unsupported or unreadable"""
+    parser = PARSERS.get(path.name)
+    if parser is None:
+        return None
+    try:
+        return parser(path)
+    except (OSError, ValueError, UnicodeDecodeError):
+        return None
+
+
+def find_lockfile(directory: pathlib.Path, names: Tuple[str, ...],
+                  root: Optional[pathlib.Path] = None) -> Optional[pathlib.Path]:
+    """
+    First lockfile in directory or, when root is given, in the nearest
+    ancestor up to root (workspace packages share the root lockfile)
+    """
+    current = directory
+    while True:
+        for name in names:
+            candidate = current / name
+            if candidate.is_file():
+                return candidate
+        if root is None or current == root or current.parent == current:
+            return None
+        current = current.parent
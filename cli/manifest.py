@@ -0,0 +1,276 @@
+"""
+Persistent per-project scan manifest used for incremental scans
+
+For every file that was analysed the manifest remembers its size, mtime,
+content hash and the findings Gemini reported for it, so the next run only
+has to send new or modified files.
+
+ScanSnapshot keeps the complete result of the last scan, so a run in which
+nothing changed can return it from a few stat calls, without walking the
+tree, reading files or starting the dependency audit.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import time
+from typing import Dict, List, Any, Iterable, Optional
+
+# 2: content hashes are git blob ids (see gitindex.py)
+MANIFEST_VERSION = 2
+SNAPSHOT_VERSION = 1
+SEVERITIES = ('critical', 'warning', 'suggestion')
+
+
+def default_cache_dir() -> pathlib.Path:
+    """Return the directory used for Sanches caches (SANCHES_CACHE_DIR overrides)"""
+    override = os.getenv('SANCHES_CACHE_DIR')
+    if override:
+        return pathlib.Path(override)
+    xdg = os.getenv('XDG_CACHE_HOME')
+    base = pathlib.Path(xdg) if xdg else pathlib.Path.home() / '.cache'
+    return base / 'sanches'
+
+
+def project_key(path: str) -> str:
+    """Stable identifier for a project root, used to name cache files"""
+    resolved = str(pathlib.Path(path).resolve())
+    return hashlib.sha256(resolved.encode('utf-8')).hexdigest()[:16]
+
+
+def content_hash(data) -> str:
+    """Hash of file content; accepts any bytes-like object (bytes, mmap)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ScanManifest:
+    def __init__(self, root: str, cache_dir: Optional[pathlib.Path] = None):
+        self.root = pathlib.Path(root)
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.path = self.cache_dir / 'manifests' / f'{project_key(root)}.json'
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # Findings that could not be attributed to a scanned file
+        self.orphans: Dict[str, List[Dict[str, Any]]] = {s: [] for s in SEVERITIES}
+        self._seen = set()
+
+    def load(self) -> None:
+        """Load the manifest from disk, starting empty if it is missing or stale"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return
+
+        if data.get('version') != MANIFEST_VERSION:
+            return
+        self.entries = data.get('files', {})
+        orphans = data.get('orphans', {})
+        self.orphans = {s: orphans.get(s, []) for s in SEVERITIES}
+
+    def save(self) -> None:
+        """Write the manifest atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'root': str(self.root),
+                'files': self.entries,
+                'orphans': self.orphans,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def is_fresh(self, file_path: str) -> bool:
+        """
+        Cheap stat-only check: True when size and mtime match the previous run,
+        in which case the file does not need to be read at all
+        """
+        entry = self.entries.get(file_path)
+        if entry is None:
+            return False
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False
+        if st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime']:
+            self._seen.add(file_path)
+            return True
+        return False
+
+    def unchanged(self, file_path: str, digest: str) -> bool:
+        """
+        True if the file's content hash is the recorded one (e.g. known from
+        the git index without reading the file); its stat data is refreshed
+        """
+        entry = self.entries.get(file_path)
+        if entry is None or entry['hash'] != digest:
+            return False
+        self.record(file_path, digest)
+        return True
+
+    def record(self, file_path: str, digest: str) -> bool:
+        """
+        Record the content hash of a file.
+        Returns True if the content is new or modified and must be analysed.
+        """
+        self._seen.add(file_path)
+        try:
+            st = os.stat(file_path)
+            size, mtime = st.st_size, st.st_mtime_ns
+        except OSError:
+            size, mtime = 0, 0
+
+        entry = self.entries.get(file_path)
+        if entry is not None and entry['hash'] == digest:
+            # Touched but not modified: keep the findings, refresh the stat data
+            entry['size'], entry['mtime'] = size, mtime
+            return False
+
+        self.entries[file_path] = {
+            'size': size,
+            'mtime': mtime,
+            'hash': digest,
+            'findings': {s: [] for s in SEVERITIES},
+        }
+        return True
+
+    def prune(self) -> List[str]:
+        """Drop entries (and their findings) for files not seen in this run"""
+        removed = [p for p in self.entries if p not in self._seen]
+        for file_path in removed:
+            del self.entries[file_path]
+        return removed
+
+    def forget(self, file_paths: Iterable[str]) -> None:
+        """Remove entries so the files are treated as new on the next run"""
+        for file_path in file_paths:
+            self.entries.pop(file_path, None)
+
+    def _match(self, reported_path: str, candidates: List[str]) -> Optional[str]:
+        """Map a file_path reported by Gemini back to a scanned file"""
+        if reported_path in candidates:
+            return reported_path
+
+        reported = pathlib.Path(reported_path)
+        if not reported.is_absolute():
+            base = self.root if self.root.is_dir() else self.root.parent
+            absolute = str(base / reported)
+            if absolute in candidates:
+                return absolute
+
+        by_name = [c for c in candidates if pathlib.Path(c).name == reported.name]
+        if len(by_name) == 1:
+            return by_name[0]
+        return None
+
+    def assign_findings(self, result: Dict[str, Any], scanned: Iterable[str]) -> None:
+        """Store the findings of a Gemini run against the files that were sent"""
+        candidates = list(scanned)
+        self.orphans = {s: [] for s in SEVERITIES}
+
+        for severity in SEVERITIES:
+            for finding in result.get(severity, []) or []:
+                target = self._match(finding.get('file_path', ''), candidates)
+                entry = self.entries.get(target) if target else None
+                if entry is None:
+                    self.orphans[severity].append(finding)
+                else:
+                    entry['findings'][severity].append(finding)
+
+    def findings(self, include_orphans: bool = True) -> Dict[str, List[Dict[str, Any]]]:
+        """All current findings: fresh ones for changed files, carried forward for the rest"""
+        merged = {s: list(self.orphans[s]) if include_orphans else [] for s in SEVERITIES}
+        for file_path in sorted(self.entries):
+            for severity in SEVERITIES:
+                merged[severity].extend(self.entries[file_path]['findings'].get(severity, []))
+        return merged
+
+
+class ScanSnapshot:
+    """
+    The last result of a project, with the mtime of every directory the walk
+    entered and the size and mtime of every file in those directories.
+    Adding, removing or renaming a file changes its directory's mtime, and
+    editing one (including .gitignore and lockfiles, which are not analysed)
+    its own stat data, so unchanged stat data means an unchanged project.
+    """
+
+    def __init__(self, root: str, cache_dir: Optional[pathlib.Path] = None):
+        self.root = root
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.path = self.cache_dir / 'results' / f'{project_key(root)}.json'
+        self._dirs: Dict[str, int] = {}
+        self._files: Dict[str, List[int]] = {}
+        self._complete = True
+
+    def load(self, options: str, max_age: float) -> Optional[Dict[str, Any]]:
+        """
+        The stored result if it was produced with the same options, is at most
+        max_age seconds old and nothing on disk changed since; None otherwise
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return None
+        if (data.get('version') != SNAPSHOT_VERSION or data.get('options') != options
+                or time.time() - data.get('saved_at', 0) > max_age):
+            return None
+
+        try:
+            for directory, mtime in data['dirs'].items():
+                if os.stat(directory).st_mtime_ns != mtime:
+                    return None
+            for file_path, (size, mtime) in data['files'].items():
+                st = os.stat(file_path)
+                if st.st_size != size or st.st_mtime_ns != mtime:
+                    return None
+        except (OSError, KeyError, TypeError, ValueError):
+            return None
+        return data.get('result')
+
+    def observe(self, path: str) -> None:
+        """
+        Record the stat data of a directory and the files in it (or of a single
+        file). Pass as walk's on_dir: directories are observed before any of
+        their files is read, so a file edited during the scan is not missed.
+        """
+        try:
+            st = os.stat(path)
+            if not os.path.isdir(path):
+                self._files[path] = [st.st_size, st.st_mtime_ns]
+                return
+            self._dirs[path] = st.st_mtime_ns
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        self._files[entry.path] = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            self._complete = False
+
+    def save(self, options: str, result: Dict[str, Any]) -> None:
+        """Store result with the stat data observed during the scan"""
+        if not self._complete or not (self._dirs or self._files):
+            self.clear()
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': SNAPSHOT_VERSION,
+                'root': self.root,
+                'options': options,
+                'saved_at': time.time(),
+                'dirs': self._dirs,
+                'files': self._files,
+                'result': result,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Drop the stored result, e.g. after a scan that must be repeated"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
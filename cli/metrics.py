@@ -0,0 +1,142 @@
+"""
+Scan metrics: timed spans and counters
+
+One Metrics object collects everything about a scan: a span per stage (walk,
+read, prescan, each Gemini batch, each dependency audit, ...) and counters
+(files walked/read/skipped, bytes, tokens, API retries, audit tool exit
+codes, cache hits). Errors that the scan recovers from are recorded too,
+instead of disappearing into empty results.
+
+report() gives the summary returned under 'metrics' in the scan result;
+chrome_trace() the spans in Chrome's trace event format (chrome://tracing,
+Perfetto).
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+# Recorded errors beyond this are only counted
+MAX_ERRORS = 50
+
+
+@dataclass
+class Span:
+    name: str
+    start: float  # Seconds since the Metrics object was created
+    duration: float
+    thread: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+class Metrics:
+    """Thread-safe collector; spans may be recorded from any worker thread"""
+
+    def __init__(self, origin: Optional[float] = None):
+        self.spans: List[Span] = []
+        self.counters: Dict[str, int] = {}
+        self.errors: List[Dict[str, str]] = []
+        # perf_counter() value spans are timed from; shared by Metrics that end up in one trace
+        self._origin = origin if origin is not None else time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Time the enclosed block. The yielded dict can be used to attach
+        attributes that are only known at the end (e.g. a response size).
+        """
+        started = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            ended = time.perf_counter()
+            span = Span(name, started - self._origin, ended - started, threading.get_ident(), attributes)
+            with self._lock:
+                self.spans.append(span)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_counters(self, prefix: str, values: Mapping[str, int]) -> None:
+        for name, value in values.items():
+            if value:
+                self.count(f'{prefix}.{name}', value)
+
+    def error(self, where: str, exc: BaseException) -> None:
+        """Record an error the scan carried on after"""
+        self.count('errors')
+        with self._lock:
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append({'stage': where, 'error': f'{type(exc).__name__}: {exc}'})
+
+    def report(self) -> Dict[str, Any]:
+        """Per-span-name totals, counters (with derived cache hit rates) and errors"""
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+            errors = list(self.errors)
+
+        stages: Dict[str, Dict[str, Any]] = {}
+        for span in spans:
+            entry = stages.setdefault(span.name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += span.duration * 1000
+            entry['max_ms'] = max(entry['max_ms'], span.duration * 1000)
+        for entry in stages.values():
+            entry['total_ms'] = round(entry['total_ms'], 2)
+            entry['max_ms'] = round(entry['max_ms'], 2)
+
+        # e.g. llm_cache.hits and llm_cache.misses give llm_cache.hit_rate
+        for prefix in sorted({name.rsplit('.', 1)[0] for name in counters if name.endswith('.hits')}):
+            hits = counters.get(f'{prefix}.hits', 0)
+            lookups = hits + counters.get(f'{prefix}.misses', 0)
+            if lookups:
+                counters[f'{prefix}.hit_rate'] = round(hits / lookups, 3)
+
+        return {
+            'elapsed_ms': round((time.perf_counter() - self._origin) * 1000, 2),
+            'spans': stages,
+            'counters': dict(sorted(counters.items())),
+            'errors': errors,
+        }
+
+    def chrome_trace(self, pid: Optional[int] = None, label: Optional[str] = None) -> Dict[str, Any]:
+        """Spans as complete ('X') events of the Chrome trace event format"""
+        with self._lock:
+            spans = list(self.spans)
+        pid = pid or os.getpid()
+        threads = {}
+        events = []
+        if label:
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': label}})
+        for span in sorted(spans, key=lambda s: s.start):
+            tid = threads.setdefault(span.thread, len(threads) + 1)
+            events.append({
+                'name': span.name,
+                'cat': span.name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': round(span.start * 1_000_000, 1),
+                'dur': round(span.duration * 1_000_000, 1),
+                'pid': pid,
+                'tid': tid,
+                'args': span.attributes,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+
+def write_traces(path: str, metrics: Mapping[str, Metrics]) -> None:
+    """Write several scans (e.g. one per project) to one trace file, one row group per label"""
+    events: List[Dict[str, Any]] = []
+    for pid, (label, collected) in enumerate(metrics.items(), start=1):
+        events.extend(collected.chrome_trace(pid=pid, label=label)['traceEvents'])
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
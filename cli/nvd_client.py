@@ -0,0 +1,216 @@
+"""
+Concurrent NVD CVE API client
+
+All requests share one pooled requests.Session and go through a sliding-window
+limiter sized to NVD's quota (5 requests per rolling 30 s without an API key,
+50 with NVD_API_KEY). Rate-limit responses (403/429/503) are retried with
+exponential backoff, honouring Retry-After when NVD sends it.
+
+Concurrent callers (e.g. several projects scanned in one run) share the
+client's request slots, and a keyword that is already being looked up, or was
+looked up in the last memo_ttl seconds, is not requested again.
+
+The base URL can be pointed at a local stub server (NVD_API_BASE env var or
+the base_url argument) for testing and benchmarks.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+NVD_API_BASE = "https://services.nvd.nist.gov/rest/json/cves/2.0"
+
+# NVD quotas: requests per rolling 30 second window
+PUBLIC_RATE = (5, 30.0)
+KEYED_RATE = (50, 30.0)
+
+RETRY_STATUSES = {403, 429, 500, 502, 503, 504}
+
+# Seconds a successful keyword search is reused by later callers
+DEFAULT_MEMO_TTL = 600.0
+
+
+class SlidingWindowLimiter:
+    """
+    Thread-safe limiter allowing at most capacity acquisitions in any rolling
+    period; acquire() blocks until one is allowed
+    """
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.period = period
+        self._sent: Deque[float] = deque()  # Times of the acquisitions in the current window
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= self.period:
+                    self._sent.popleft()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif len(self._sent) < self.capacity:
+                    self._sent.append(now)
+                    return
+                else:
+                    wait = self._sent[0] + self.period - now
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Stop allowing requests for a while, e.g. after the server asked us to back off"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _retry_after(response) -> Optional[float]:
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class NVDClient:
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_workers: Optional[int] = None, max_retries: int = 4, timeout: float = 10,
+                 backoff_base: float = 1.0, backoff_cap: float = 30.0, memo_ttl: float = DEFAULT_MEMO_TTL):
+        if requests is None:
+            raise RuntimeError("The requests package is required for NVD lookups")
+
+        self.api_key = api_key if api_key is not None else os.getenv('NVD_API_KEY')
+        self.base_url = base_url or os.getenv('NVD_API_BASE', NVD_API_BASE)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.memo_ttl = memo_ttl
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'shared': 0}
+        self._stats_lock = threading.Lock()
+        # keyword -> (started_at, future) of searches in flight or recently completed
+        self._memo: Dict[str, Tuple[float, Future]] = {}
+        self._memo_lock = threading.Lock()
+
+        capacity, period = KEYED_RATE if self.api_key else PUBLIC_RATE
+        self.limiter = SlidingWindowLimiter(capacity, period)
+        # More workers than the window allows at once would only queue on the limiter
+        self.max_workers = max_workers or min(capacity, 8)
+        # Bounds requests in flight across all callers, not just within one search_many
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = 'Sanches-Dependency-Checker/1.0'
+        if self.api_key:
+            self.session.headers['apiKey'] = self.api_key
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def search(self, keyword: str, results_per_page: int = 5) -> Optional[Dict[str, Any]]:
+        """Run one keywordSearch query; returns the decoded response or None on failure"""
+        params = {'keywordSearch': keyword, 'resultsPerPage': results_per_page}
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count('retries')
+            self.limiter.acquire()
+            self._count('requests')
+            try:
+                with self._slots:
+                    response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            except requests.RequestException:
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code == 200:
+                try:
+                    return response.json()
+                except ValueError:
+                    break
+            if response.status_code not in RETRY_STATUSES:
+                break
+
+            delay = _retry_after(response)
+            if delay is None:
+                delay = self._backoff(attempt)
+            # NVD answers 403 or 429 when the quota is exceeded; slow every worker down
+            self.limiter.pause(delay)
+
+        self._count('failures')
+        return None
+
+    def search_many(self, keywords: Iterable[str], results_per_page: int = 5) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Run several keyword searches concurrently behind the shared rate limiter.
+        Keywords another caller is already searching for (or searched for
+        recently) are awaited instead of being requested again.
+        """
+        unique = list(dict.fromkeys(keywords))
+        if not unique:
+            return {}
+
+        futures: Dict[str, Future] = {}
+        todo: Dict[str, Future] = {}
+        now = time.monotonic()
+        with self._memo_lock:
+            self._memo = {k: (started, future) for k, (started, future) in self._memo.items()
+                          if now - started < self.memo_ttl or not future.done()}
+            for keyword in unique:
+                started, future = self._memo.get(keyword, (0.0, None))
+                if future is not None and now - started < self.memo_ttl:
+                    futures[keyword] = future
+                    continue
+                future = Future()
+                self._memo[keyword] = (now, future)
+                futures[keyword] = todo[keyword] = future
+        self._count_shared(len(unique) - len(todo))
+
+        def run(keyword: str) -> None:
+            result = None
+            try:
+                result = self.search(keyword, results_per_page)
+            finally:
+                if result is None:
+                    # Failures are not worth remembering; the next caller tries again
+                    with self._memo_lock:
+                        if self._memo.get(keyword, (0.0, None))[1] is todo[keyword]:
+                            del self._memo[keyword]
+                todo[keyword].set_result(result)
+
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(todo))) as executor:
+                list(executor.map(run, todo))
+        return {keyword: future.result() for keyword, future in futures.items()}
+
+    def _count_shared(self, amount: int) -> None:
+        if amount:
+            with self._stats_lock:
+                self.stats['shared'] += amount
+
+    def close(self) -> None:
+        self.session.close()
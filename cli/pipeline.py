@@ -0,0 +1,98 @@
+"""
+Parallel read-and-hash stage
+
+Reading, hashing (git blob ids, see gitindex.py) and decoding each file is
+done in one pass on a bounded thread pool: file I/O and hashlib release the
+GIL, so on fast disks throughput grows with the number of cores. Results
+are handed back in input order through a bounded window of in-flight
+reads, which
+
+- keeps memory bounded by the window: reads in flight or waiting for the
+  consumer add up to at most WINDOW_BYTES (going by file size, capped at
+  the ingest limit), however large the tree and however many workers
+- applies the total size budget in walk order, exactly as a serial read
+  would, so the same files are analysed whatever the thread timing
+
+Small inputs are read on the calling thread; starting threads would cost
+more than it saves.
+"""
+import itertools
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ingest import IngestedFile, Ingestor
+
+# Below this many files, reads stay on the calling thread
+PARALLEL_MIN_FILES = 64
+# Files per task: handing files to the pool one by one costs about as much as reading a small one
+CHUNK_FILES = 16
+# Tasks queued per worker, so a worker never waits for the consumer to hand it more
+WINDOW_PER_WORKER = 2
+# Bytes of files being read or read but not yet consumed
+WINDOW_BYTES = 32 * 1024 * 1024
+
+
+def default_workers() -> int:
+    # Reads mostly wait on the disk, so a few more threads than cores keep them all busy
+    return min(32, (os.cpu_count() or 1) * 2)
+
+
+def _chunk_bytes(chunk: List[Tuple[str, Optional[str]]], max_file_bytes: int) -> int:
+    """Memory a chunk takes once read; larger files are skipped after their header"""
+    total = 0
+    for path, _ in chunk:
+        try:
+            total += min(os.stat(path).st_size, max_file_bytes)
+        except OSError:
+            pass
+    return total
+
+
+def ingest(ingestor: Ingestor, items: Iterable[Tuple[str, Optional[str]]],
+           workers: Optional[int] = None) -> Iterator[Tuple[str, Optional[IngestedFile]]]:
+    """
+    (path, file) for every (path, known digest or None) item, in order; file
+    is None when the ingestor skipped it. items is consumed lazily, on the
+    calling thread, as the window drains.
+    """
+    workers = workers or default_workers()
+    items = iter(items)
+    head = list(itertools.islice(items, PARALLEL_MIN_FILES))
+    if workers <= 1 or len(head) < PARALLEL_MIN_FILES:
+        for path, digest in itertools.chain(head, items):
+            yield path, ingestor.read(path, digest)
+        return
+
+    def load(chunk: List[Tuple[str, Optional[str]]]) -> List[Union[IngestedFile, str]]:
+        return [ingestor.load(path, digest) for path, digest in chunk]
+
+    def accept(chunk: List[Tuple[str, Optional[str]]], future: Future) -> Iterator[Tuple[str, Optional[IngestedFile]]]:
+        for (path, _), loaded in zip(chunk, future.result()):
+            yield path, ingestor.accept(path, loaded)
+
+    window = workers * WINDOW_PER_WORKER
+    max_file_bytes = ingestor.limits.max_file_bytes
+    items = itertools.chain(head, items)
+    chunks = iter(lambda: list(itertools.islice(items, CHUNK_FILES)), [])
+    pending: Deque[Tuple[List[Tuple[str, Optional[str]]], Future, int]] = deque()
+    pending_bytes = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest') as executor:
+        try:
+            for chunk in chunks:
+                size = _chunk_bytes(chunk, max_file_bytes)
+                # Hand over the oldest reads first when the window is full, by count or by bytes
+                while pending and (len(pending) >= window or pending_bytes + size > WINDOW_BYTES):
+                    done, future, done_size = pending.popleft()
+                    pending_bytes -= done_size
+                    yield from accept(done, future)
+                pending.append((chunk, executor.submit(load, chunk), size))
+                pending_bytes += size
+            while pending:
+                done, future, _ = pending.popleft()
+                yield from accept(done, future)
+        finally:
+            # The consumer stopped early (or failed): don't read what nobody will take
+            for _, future, _ in pending:
+                future.cancel()
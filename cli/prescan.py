@@ -0,0 +1,251 @@
+"""
+Local secret and risk-pattern pre-scanner
+
+Runs before the Gemini stage. Every file is matched against precompiled
+secret patterns and risk signals, and candidate secrets are checked for
+Shannon entropy. Large scans are spread over worker processes (started with
+'spawn', as the scanner runs alongside other threads, and kept for the
+scanner's lifetime). The scanner:
+
+- reports definite secrets (cloud keys, private keys, tokens, credentials in
+  connection strings) directly as findings, without spending LLM tokens
+- gives every file a risk score, so clearly low-risk files (stylesheets,
+  docs, tooling config without any risk signal) can skip the LLM and the
+  riskiest batches are sent first
+"""
+import functools
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _words(*words: str) -> str:
+    """
+    Alternation of the usual spellings of each identifier (password, Password,
+    PASSWORD, api_key, apiKey, API_KEY, ...). Unlike re.IGNORECASE this keeps
+    literal prefixes, which lets the regex engine skip ahead quickly.
+    """
+    variants = set()
+    for word in words:
+        parts = word.split('_')
+        variants.update({
+            '_'.join(parts), '-'.join(parts), ''.join(parts), '_'.join(parts).upper(),
+            parts[0] + ''.join(p.capitalize() for p in parts[1:]), ''.join(p.capitalize() for p in parts),
+        })
+    return '(?:' + '|'.join(re.escape(v) for v in sorted(variants, key=len, reverse=True)) + ')'
+
+
+# (name, severity, pattern, description). Every pattern starts with a literal so it
+# is found with a fast prefix search instead of being tried at every position.
+SECRET_PATTERNS = [
+    ('aws_access_key', 'critical', r'A[KS]IA[0-9A-Z]{16}(?![0-9A-Z])',
+     'Hardcoded AWS access key ID'),
+    ('aws_secret_key', 'critical', _words('aws_secret_access_key') + r'["\']?\s*[:=]\s*["\']?[A-Za-z0-9/+]{40}',
+     'Hardcoded AWS secret access key'),
+    ('gcp_api_key', 'critical', r'AIza[0-9A-Za-z_\-]{35}',
+     'Hardcoded Google API key'),
+    ('gcp_service_account', 'critical', r'"type"\s*:\s*"service_account"',
+     'Google Cloud service account credentials in source'),
+    ('private_key', 'critical', r'-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP |ENCRYPTED )?PRIVATE KEY',
+     'Private key embedded in source'),
+    ('github_token', 'critical', r'gh[pousr]_[A-Za-z0-9]{36,}|github_pat_[A-Za-z0-9_]{60,}',
+     'Hardcoded GitHub token'),
+    ('slack_token', 'critical', r'xox[abprs]-[0-9A-Za-z\-]{10,}',
+     'Hardcoded Slack token'),
+    ('stripe_key', 'critical', r'[sr]k_live_[0-9A-Za-z]{24,}',
+     'Hardcoded Stripe live secret key'),
+    ('azure_storage_key', 'critical', r'AccountKey=[A-Za-z0-9+/=]{40,}',
+     'Hardcoded Azure storage account key'),
+    ('connection_string', 'critical',
+     r'(?:postgres(?:ql)?|mysql|mariadb|mongodb(?:\+srv)?|rediss?|amqps?|mssql)://[^\s:/@\'"]+:[^\s@\'"]+@[^\s\'"]+',
+     'Database or broker connection string with embedded credentials'),
+    # Only reported when the value is not a placeholder and has some entropy
+    ('credential', 'critical',
+     _words('password', 'passwd', 'pwd', 'secret', 'api_key', 'access_token', 'auth_token', 'client_secret')
+     + r'["\']?\s*[:=]\s*["\'](?P<value>[^"\'\s]{8,})["\']',
+     'Possible hardcoded credential'),
+    ('high_entropy', 'warning', r'["\'](?P<value>[A-Za-z0-9+/_\-]{32,}={0,2})["\']',
+     'High-entropy string literal that may be a secret'),
+]
+
+# Risk signals: (name, weight, pattern); only their presence counts
+RISK_PATTERNS = [
+    ('code_execution', 3, r'eval\s*\(|exec\s*\(|new Function\s*\(|os\.system\s*\(|subprocess\.|child_process|shell\s*=\s*True'),
+    ('unsafe_deserialization', 3, r'pickle\.loads?\s*\(|yaml\.load\s*\(|unserialize\s*\(|ObjectInputStream'),
+    ('sql', 2, r'(?:SELECT|select)\s[^\n]{0,200}?\s(?:FROM|from)\s|(?:INSERT|insert)\s+(?:INTO|into)\s'
+               r'|(?:DELETE|delete)\s+(?:FROM|from)\s|(?:UPDATE|update)\s[^\n]{0,200}?\s(?:SET|set)\s'),
+    ('html_injection', 2, r'innerHTML|dangerouslySetInnerHTML|document\.write\s*\(|v-html|\|\s*safe\b'),
+    ('tls', 2, r'verify\s*=\s*False|rejectUnauthorized\s*:\s*false|InsecureSkipVerify'),
+    ('weak_crypto', 1, r'md5|MD5|sha1|SHA1|Math\.random\s*\('),
+    ('request_input', 1, r'req(?:uest)?\.(?:body|query|params|args|form|files|cookies)|\$_(?:GET|POST|REQUEST|COOKIE)'),
+    ('filesystem', 1, r'open\s*\(|fs\.\w+|sendFile\s*\(|path\.join\s*\('),
+    ('auth', 1, _words('password', 'passwd', 'token', 'secret', 'jwt', 'session', 'cookie', 'auth', 'credential')),
+    ('network', 1, r'https?://|fetch\s*\(|axios|requests\.\w+\s*\(|urlopen\s*\('),
+    ('config', 1, _words('debug') + r'\s*[:=]\s*[Tt]rue|' + _words('cors') + r'|allow_origins|Access-Control-Allow-Origin'),
+]
+
+PLACEHOLDER = re.compile(r'(?i)x{3,}|\*{3,}|example|sample|dummy|changeme|placeholder|your[_-]|<|\$\{|\{\{|%\(|process\.env|os\.environ')
+
+CREDENTIAL_MIN_ENTROPY = 3.0
+HIGH_ENTROPY_MIN = 4.5
+SECRET_WEIGHT = 10
+MAX_FINDINGS_PER_PATTERN = 5
+
+# Files that are safe to leave to the local scan unless it found something risky in them
+LOW_RISK_EXTENSIONS = {
+    '.css', '.scss', '.sass', '.less', '.styl', '.md', '.mdx', '.rst', '.txt',
+    '.svg', '.snap', '.csv', '.tsv',
+}
+LOW_RISK_NAMES = re.compile(
+    r'^(?:tailwind|postcss|prettier|babel|jest|vitest|stylelint|commitlint|lint-staged)\.config\.[cm]?[jt]s$'
+    r'|^\.(?:prettierrc|editorconfig|browserslistrc|nvmrc|npmignore|gitattributes)'
+)
+
+# Below this much text, worker process startup costs more than it saves
+PARALLEL_MIN_BYTES = 2_000_000
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_patterns() -> Tuple[List[Tuple[str, str, 're.Pattern', str]], List[Tuple[str, int, 're.Pattern']]]:
+    """
+    SECRET_PATTERNS and RISK_PATTERNS, compiled on first use: compiling them
+    takes longer than the rest of the CLI's imports, and scans without
+    changed files never need them.
+
+    They stay separate patterns: re tries every branch of an alternation at
+    every position, so one combined pattern is several times slower than a
+    pass per pattern, each of which skips ahead to its literal prefix.
+    """
+    secrets = [(name, severity, re.compile(pattern), description)
+               for name, severity, pattern, description in SECRET_PATTERNS]
+    risks = [(name, weight, re.compile(pattern)) for name, weight, pattern in RISK_PATTERNS]
+    return secrets, risks
+
+
+def shannon_entropy(value: str) -> float:
+    """Bits of entropy per character"""
+    if not value:
+        return 0.0
+    length = len(value)
+    return -sum(count / length * math.log2(count / length) for count in Counter(value).values())
+
+
+def is_low_risk_file(path: str) -> bool:
+    name = os.path.basename(path)
+    return os.path.splitext(name)[1].lower() in LOW_RISK_EXTENSIONS or bool(LOW_RISK_NAMES.match(name))
+
+
+@dataclass
+class FileScan:
+    path: str
+    risk: int
+    findings: List[Tuple[str, Dict[str, Any]]]  # (severity, finding)
+
+
+def scan_text(path: str, text: str) -> FileScan:
+    """Run every secret pattern and risk signal over a file's text"""
+    findings: List[Tuple[str, Dict[str, Any]]] = []
+    risk = 0 if is_low_risk_file(path) else 1
+
+    flagged_lines = set()
+    secrets, risks = compiled_patterns()
+
+    for name, severity, pattern, description in secrets:
+        reported = 0
+        # Matches come in order, so lines are counted from the previous match rather than
+        # from the top (a lockfile has tens of thousands of high-entropy integrity hashes)
+        line, counted_to = 1, 0
+        for match in pattern.finditer(text):
+            if 'value' in pattern.groupindex:
+                value = match.group('value')
+                min_entropy = HIGH_ENTROPY_MIN if name == 'high_entropy' else CREDENTIAL_MIN_ENTROPY
+                if PLACEHOLDER.search(value) or shannon_entropy(value) < min_entropy:
+                    continue
+            line += text.count('\n', counted_to, match.start())
+            counted_to = match.start()
+            # A token matched by a specific pattern is usually high-entropy too; report it once
+            if name == 'high_entropy' and line in flagged_lines:
+                continue
+            flagged_lines.add(line)
+
+            risk += SECRET_WEIGHT
+            reported += 1
+            if reported > MAX_FINDINGS_PER_PATTERN:
+                continue
+            findings.append((severity, {
+                'file_name': os.path.basename(path),
+                'file_path': path,
+                'line': line,
+                'description': f'{description} (line {line}, value redacted; found by the local pre-scan)',
+            }))
+
+    for name, weight, pattern in risks:
+        if pattern.search(text):
+            risk += weight
+
+    return FileScan(path, risk, findings)
+
+
+def _scan_pair(item: Tuple[str, str]) -> FileScan:
+    return scan_text(*item)
+
+
+@dataclass
+class PrescanResult:
+    risk: Dict[str, int] = field(default_factory=dict)
+    findings: Dict[str, List[Dict[str, Any]]] = field(default_factory=lambda: {'critical': [], 'warning': []})
+    elapsed_ms: float = 0.0
+
+    def report(self) -> Dict[str, Any]:
+        """Findings in the shape of a Gemini report, so both can be merged"""
+        return {'directory': '', 'suggestion': [], **self.findings}
+
+
+class Prescanner:
+    def __init__(self, max_workers: Optional[int] = None, parallel_min_bytes: int = PARALLEL_MIN_BYTES):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_min_bytes = parallel_min_bytes
+        self._pool = None  # ProcessPoolExecutor, started by the first large scan
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # multiprocessing is slow to import and small scans never need it
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # Forking a process that runs other threads can copy a lock some thread holds; spawn starts clean
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def close(self) -> None:
+        """Stop the worker processes, if any were started"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def scan(self, files_content: Dict[str, str]) -> PrescanResult:
+        started = time.perf_counter()
+        result = PrescanResult()
+        items = sorted(files_content.items())
+
+        total = sum(len(text) for _, text in items)
+        if self.max_workers > 1 and total >= self.parallel_min_bytes and len(items) > 1:
+            chunksize = max(1, len(items) // (self.max_workers * 4))
+            scans = list(self._executor().map(_scan_pair, items, chunksize=chunksize))
+        else:
+            scans = [scan_text(path, text) for path, text in items]
+
+        for file_scan in scans:
+            result.risk[file_scan.path] = file_scan.risk
+            for severity, finding in file_scan.findings:
+                result.findings[severity].append(finding)
+        result.elapsed_ms = (time.perf_counter() - started) * 1000
+        return result
@@ -6,149 +6,109 @@ Sanches - A coding assist tool that reads files and sends them to Gemini API
 
 To run this script, use the virtual environment Python:
     ./cli/venv/bin/python ./cli/sanches.py --dir="path" --api-key="key"
+
+To keep a warm scanner running and send it JSON-RPC requests on stdin:
+    ./cli/venv/bin/python ./cli/sanches.py --serve
+
+To print newline-delimited JSON events as results arrive:
+    ./cli/venv/bin/python ./cli/sanches.py --dir="path" --stream
+
+To keep watching a project and rescan only the files that change:
+    ./cli/venv/bin/python ./cli/sanches.py --dir="path" --watch
+
+To scan several projects in one run (reports are keyed by directory):
+    ./cli/venv/bin/python ./cli/sanches.py --dir path1 path2 --projects projects.txt
 """
 import argparse
+import hashlib
 import json
 import os
 import pathlib
-from typing import Dict, Optional, List, Any
-import pathspec
-from google import genai
-from dependency_checker import check_dependencies
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, wait
+from dataclasses import asdict
+from typing import Callable, Dict, Iterable, Iterator, Optional, List, Any, Tuple
+from batching import SEVERITIES, estimate_tokens, make_batches, merge_reports
+from context_cache import DEFAULT_TTL as DEFAULT_CONTEXT_TTL, ContextCache, GenaiContextBackend, is_stale_error
+from compaction import CompactionOptions, compact, expand_aliases, frame_files
+from dependency_cache import DEFAULT_MAX_AGE, DependencyCache
+from dependency_checker import DependencyChecker
+from findings_store import FindingsStore, fingerprint
+from gitindex import GitIndex, changed_since
+from gemini_client import DEFAULT_MAX_RETRIES, DEFAULT_REQUEST_TIMEOUT, GeminiClient, RetryPolicy
+from ingest import IngestLimits, Ingestor
+from llm_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL, LLMCache
+from manifest import ScanManifest, ScanSnapshot
+from metrics import Metrics, write_traces
+from pipeline import ingest
+from prescan import Prescanner
+from streaming import EventStream, FindingExtractor, ndjson_writer
+from vulndb import VulnDB, update_vulndb
+from watcher import DEFAULT_DEBOUNCE
+from walker import DEPENDENCY_FILES, WalkStats, is_ignored, is_pruned_dir, root_matcher, walk
 # from google.genai import types
 
 
-class Sanches:
-    def __init__(self, api_key: str):
-        # genai.configure(api_key=api_key)
-        # self.model = genai.GenerativeModel('gemini-pro')
-        self.client = genai.Client(api_key=api_key)
-
-    def read_files(self, path: str) -> Dict[str, str]:
-        """Read all files in the given path and return their contents"""
-        files_content = {}
-        path_obj = pathlib.Path(path)
-
-        if not path_obj.exists():
-            raise FileNotFoundError(f"Path {path} does not exist")
-
-        # Common package dependency directories to ignore
-        dependency_dirs = {
-            'node_modules', '.venv', 'venv', 'env', '.env',
-            '__pycache__', '.pytest_cache', '.mypy_cache',
-            'dist', 'build', '.egg-info', '.eggs',
-            '.tox', 'htmlcov', '.coverage',
-            '.next', '.nuxt', 'out', '.vercel',
-            'vendor', '.bundle', 'Pods', '.cocoapods',
-            'target', 'bin', 'obj',
-        }
-
-        # Dependency files to ignore (handled by NVD API separately)
-        dependency_files = {
-            'package.json', 'package-lock.json', 'yarn.lock',
-            'requirements.txt', 'Pipfile', 'Pipfile.lock',
-            'poetry.lock', 'composer.json', 'composer.lock',
-            'Gemfile', 'Gemfile.lock', 'go.mod', 'go.sum',
-            'pom.xml', 'build.gradle', 'build.gradle.kts'
-        }
-
-        # TODO: get Claude to also explicitly ignore .env files
-
-        # Load .gitignore patterns if it exists
-        spec = None
-        gitignore_path = path_obj / '.gitignore' if path_obj.is_dir() else path_obj.parent / '.gitignore'
-        if gitignore_path.exists():
-            with open(gitignore_path, 'r', encoding='utf-8') as f:
-                patterns = f.read().splitlines()
-            spec = pathspec.PathSpec.from_lines('gitwildmatch', patterns)
-
-        def should_ignore(file_path: pathlib.Path) -> bool:
-            """Check if file should be ignored based on .gitignore rules, dependency directories, or dependency files"""
-            # Check if any part of the path is a known dependency directory
-            for part in file_path.parts:
-                if part in dependency_dirs:
-                    return True
-            
-            # Check if the filename is a dependency file
-            if file_path.name in dependency_files:
-                return True
-
-            if spec is None:
-                return False
-            # Get relative path from the root directory containing .gitignore
-            try:
-                rel_path = file_path.relative_to(path_obj if path_obj.is_dir() else path_obj.parent)
-                return spec.match_file(str(rel_path))
-            except ValueError:
-                return False
-
-        if path_obj.is_file():
-            if not should_ignore(path_obj):
-                with open(path_obj, 'r', encoding='utf-8') as f:
-                    files_content[str(path_obj)] = f.read()
-        else:
-            for file_path in path_obj.rglob('*'):
-                if file_path.is_file() and not should_ignore(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            files_content[str(file_path)] = f.read()
-                    except (UnicodeDecodeError, PermissionError):
-                        files_content[str(file_path)] = "[Binary file or permission denied]"
+MODEL = 'gemini-2.5-flash'
+# Bump whenever the prompt or RESPONSE_SCHEMA changes, so cached results are not reused
+PROMPT_VERSION = '3'
 
-        return files_content
+# Projects scanned at the same time by one run with several directories
+DEFAULT_MAX_PROJECTS = 4
 
-    def send_to_gemini(self, files_content: Dict[str, str]) -> Optional[str]:
-        """Send file contents to Gemini and get JSON response"""
-        
-        # Define the JSON schema for structured output
-        response_schema = {
-            "type": "object",
-            "properties": {
-                "directory": {
-                    "type": "string",
-                    "description": "The project root path"
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "directory": {
+            "type": "string",
+            "description": "The project root path"
+        },
+        "critical": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "file_name": {"type": "string"},
+                    "file_path": {"type": "string"},
+                    "description": {"type": "string"}
                 },
-                "critical": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "file_name": {"type": "string"},
-                            "file_path": {"type": "string"},
-                            "description": {"type": "string"}
-                        },
-                        "required": ["file_name", "file_path", "description"]
-                    }
+                "required": ["file_name", "file_path", "description"]
+            }
+        },
+        "warning": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "file_name": {"type": "string"},
+                    "file_path": {"type": "string"},
+                    "description": {"type": "string"}
                 },
-                "warning": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "file_name": {"type": "string"},
-                            "file_path": {"type": "string"},
-                            "description": {"type": "string"}
-                        },
-                        "required": ["file_name", "file_path", "description"]
-                    }
+                "required": ["file_name", "file_path", "description"]
+            }
+        },
+        "suggestion": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "file_name": {"type": "string"},
+                    "file_path": {"type": "string"},
+                    "description": {"type": "string"}
                 },
-                "suggestion": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "file_name": {"type": "string"},
-                            "file_path": {"type": "string"},
-                            "description": {"type": "string"}
-                        },
-                        "required": ["file_name", "file_path", "description"]
-                    }
-                }
-            },
-            "required": ["directory", "critical", "warning", "suggestion"]
+                "required": ["file_name", "file_path", "description"]
+            }
         }
-        
-        prompt = f"""
+    },
+    "required": ["directory", "critical", "warning", "suggestion"]
+}
+
+
+# Sent as the system instruction of every request, or held in a Gemini context cache (see context_cache.py)
+ANALYSIS_INSTRUCTIONS = """
         You are an experienced application security engineer and static analysis expert.
 
         Your task:
@@ -252,71 +212,864 @@ class Sanches:
 
         The below code files are one project.
 
+        Each file starts with a line "=== FILE <path>" and its content follows verbatim up to the next such line.
+        A line "@@ line N @@" means lines were omitted (licence header, blank lines) and the next line is line N of the file; use it when referring to line numbers.
+        Lines or data ending in "[... truncated ...]" were shortened because they held inlined data.
+        """
+
+
+def read_project_list(list_file: str) -> List[str]:
+    """Project directories listed one per line; blank lines and # comments are skipped"""
+    base = os.path.dirname(os.path.abspath(list_file))
+    with open(list_file, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    return [os.path.normpath(os.path.join(base, os.path.expanduser(line)))
+            for line in lines if line and not line.startswith('#')]
+
+
+class Sanches:
+    def __init__(self, api_key: str, concurrency: int = 4, batch_tokens: int = 200_000,
+                 ingest_limits: Optional[IngestLimits] = None, llm_cache: Optional[LLMCache] = None,
+                 dependency_checker: Optional[DependencyChecker] = None,
+                 llm_timeout: Optional[float] = None, deps_timeout: Optional[float] = None,
+                 compaction: Optional[CompactionOptions] = None,
+                 prescanner: Optional[Prescanner] = None, llm_min_risk: int = 1,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 findings_store: Optional[FindingsStore] = None,
+                 context_cache_ttl: float = 0, context_backend: Any = None,
+                 read_workers: Optional[int] = None):
+        # genai.configure(api_key=api_key)
+        # self.model = genai.GenerativeModel('gemini-pro')
+        self.api_key = api_key
+        self._client = None  # genai.Client, created by the first Gemini request (see client)
+        self.concurrency = concurrency  # Max parallel Gemini requests, across all scans using this scanner
+        # Retries, deadlines and adaptive concurrency; self.client is looked up per request so it can be replaced
+        self.gemini = GeminiClient(lambda: self.client.models, concurrency, retry_policy)
+        self.batch_tokens = batch_tokens  # Approximate token budget per request
+        self.ingest_limits = ingest_limits or IngestLimits()
+        self.read_workers = read_workers  # Threads reading and hashing files (None: based on the CPU count)
+        self.llm_cache = llm_cache  # None disables result caching
+        self.findings_store = findings_store  # None: results carry no new/resolved delta
+        # The instructions are sent once as cached content; 0 sends them with every request
+        self.context_cache = None
+        if context_cache_ttl > 0:
+            self.context_cache = ContextCache(context_backend or GenaiContextBackend(lambda: self.client.caches),
+                                              context_cache_ttl,
+                                              scope=hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:16])
+        self.dependency_checker = dependency_checker or DependencyChecker()
+        self.llm_timeout = llm_timeout  # Max seconds for the Gemini stage (None = no limit)
+        self.deps_timeout = deps_timeout  # Max seconds for the dependency stage (None = no limit)
+        self.compaction = compaction or CompactionOptions()
+        self.prescanner = prescanner or Prescanner()
+        self.llm_min_risk = llm_min_risk  # Files the pre-scan scores below this are not sent to Gemini
+
+    @property
+    def client(self):
+        """
+        The genai.Client. google.genai takes most of a second to import, so it
+        is only imported once a scan actually has files to send.
+        """
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
+
+    def collect_files(self, path: str, stats: Optional[WalkStats] = None,
+                      on_dir: Optional[Callable[[str], None]] = None,
+                      index: Optional[GitIndex] = None) -> List[pathlib.Path]:
+        """
+        List all files under the given path that should be analysed (on_dir:
+        see walker.walk). With the git index of the project, tracked files are
+        taken as they are and only untracked ones are matched against .gitignore.
+        """
+        path_obj = pathlib.Path(path)
+
+        if not path_obj.exists():
+            raise FileNotFoundError(f"Path {path} does not exist")
+
+        # TODO: get Claude to also explicitly ignore .env files
+
+        if path_obj.is_file():
+            matcher = root_matcher(str(path_obj.parent))
+            matcher.add_file(str(path_obj.parent / '.gitignore'))
+            if (path_obj.name in DEPENDENCY_FILES
+                    or any(is_pruned_dir(part) for part in path_obj.parent.parts)
+                    or matcher.match(path_obj.name)):
+                return []
+            return [path_obj]
+
+        tracked = index.tracked(str(path_obj)) if index is not None else None
+        return [pathlib.Path(p) for p in walk(str(path_obj), stats=stats, on_dir=on_dir, tracked=tracked)]
+
+    def read_files(self, path: str, manifest: Optional[ScanManifest] = None,
+                   ingestor: Optional[Ingestor] = None, metrics: Optional[Metrics] = None,
+                   on_dir: Optional[Callable[[str], None]] = None) -> Dict[str, str]:
+        """
+        Read all files in the given path and return their contents.
+        When a manifest is given, only new or modified files are returned.
+        Files the ingestor skips (binaries, oversized, minified, generated) are
+        listed in ingestor.skipped instead. In a git repository, files that are
+        clean according to the index are not hashed again (see gitindex.py).
+        Files are read on read_workers threads (see pipeline.py).
+        """
+        files_content = {}
+        ingestor = ingestor or Ingestor(self.ingest_limits)
+        metrics = metrics or Metrics()
+
+        index = None
+        if os.path.isdir(path):
+            with metrics.span('git.index'):
+                index = GitIndex.open(path)
+            if index is not None:
+                metrics.count('git.index_entries', len(index.entries))
+
+        stats = WalkStats()
+        with metrics.span('walk'):
+            file_paths = self.collect_files(path, stats, on_dir, index)
+        metrics.add_counters('walk', {'files': stats.files, 'entries_visited': stats.entries_visited,
+                                      'dirs_pruned': stats.dirs_pruned, 'ignore_files': stats.ignore_files})
+
+        def to_read() -> Iterator[Tuple[str, Optional[str]]]:
+            """Files whose content is needed, with their blob id if git knows it; stat-only checks"""
+            for file_path in file_paths:
+                key = str(file_path)
+                if manifest is not None and manifest.is_fresh(key):
+                    metrics.count('files.unchanged')
+                    continue
+
+                blob = index.clean_blob(key) if index is not None else None
+                if blob is not None:
+                    metrics.count('git.clean')
+                    if manifest is not None and manifest.unchanged(key, blob):
+                        # Touched since the last scan, but git knows the content is the same
+                        metrics.count('files.unchanged')
+                        continue
+                yield key, blob
+
+        with metrics.span('read'):
+            for key, ingested in ingest(ingestor, to_read(), self.read_workers):
+                if ingested is None:
+                    continue
+
+                if manifest is not None and not manifest.record(key, ingested.digest):
+                    metrics.count('files.unchanged')
+                    continue
+
+                files_content[key] = ingested.text
+
+        return files_content
+
+    def read_changed(self, path: str, changed: Iterable[str], manifest: ScanManifest,
+                     ingestor: Optional[Ingestor] = None) -> Dict[str, str]:
+        """
+        Like read_files, but only for the given paths (e.g. reported by a file
+        watcher) instead of walking the whole tree. Paths that were deleted or
+        are ignored are dropped from the manifest, along with everything below them.
+        """
+        files_content = {}
+        ingestor = ingestor or Ingestor(self.ingest_limits)
+
+        def to_read() -> Iterator[Tuple[str, Optional[str]]]:
+            for key in sorted(set(changed)):
+                if not os.path.isfile(key) or is_ignored(path, key):
+                    prefix = key.rstrip(os.sep) + os.sep
+                    manifest.forget([p for p in manifest.entries if p == key or p.startswith(prefix)])
+                    continue
+                if not manifest.is_fresh(key):
+                    yield key, None
+
+        for key, ingested in ingest(ingestor, to_read(), self.read_workers):
+            if ingested is None:
+                manifest.forget([key])
+                continue
+
+            if not manifest.record(key, ingested.digest):
+                continue
+
+            files_content[key] = ingested.text
+
+        return files_content
+
+    def _build_prompt(self, files_content: Dict[str, str]) -> str:
+        """The per-batch part of the prompt: the files, framed as ANALYSIS_INSTRUCTIONS describe"""
+        return f"""
         Files:
-        {json.dumps(files_content, indent=2)}
+        {frame_files(files_content)}
         """
 
-        # response = self.model.generate_content(prompt)
-        response = self.client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=prompt,
-            config={
+    def _generate(self, files_content: Dict[str, str],
+                  on_finding: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                  metrics: Optional[Metrics] = None, deadline: Optional[float] = None) -> str:
+        """
+        Run the Gemini request and return the response text. With on_finding the
+        response is streamed and each finding is passed on as soon as it is complete.
+        Failed and stalled requests are retried until deadline (see gemini_client.py).
+        """
+        metrics = metrics or Metrics()
+        with metrics.span('llm.prompt_build'):
+            prompt = self._build_prompt(files_content)
+        context = None
+        if self.context_cache is not None:
+            with metrics.span('llm.context_cache'):
+                context = self.context_cache.get(MODEL, ANALYSIS_INSTRUCTIONS)
+
+        def make_request(cached_content: Optional[str]) -> Dict[str, Any]:
+            config = {
                 'response_mime_type': 'application/json',
-                'response_schema': response_schema
+                # Generation config: the context cache can't hold it, so it goes with every request
+                'response_schema': RESPONSE_SCHEMA
             }
-        )
-        return response.text
+            if cached_content is not None:
+                config['cached_content'] = cached_content
+            else:
+                config['system_instruction'] = ANALYSIS_INSTRUCTIONS
+            return {'model': MODEL, 'contents': prompt, 'config': config}
+
+        listen = None
+        if on_finding is not None:
+            # An attempt abandoned mid-stream can't take back what it reported; the
+            # attempt that replaces it only passes on findings not reported already.
+            # Counted per fingerprint, as findings can differ in nothing but line numbers
+            emitted: Dict[str, int] = {}
+            emitted_lock = threading.Lock()
+
+            # A fresh extractor for each attempt that starts streaming, e.g. after a retry
+            def listen() -> Callable[[str], None]:
+                extractor = FindingExtractor()
+                seen: Dict[str, int] = {}
+
+                def feed(chunk_text: str) -> None:
+                    for severity, finding in extractor.feed(chunk_text):
+                        key = fingerprint(severity, finding.get('file_path', ''), finding.get('description', ''))
+                        seen[key] = seen.get(key, 0) + 1
+                        with emitted_lock:
+                            if seen[key] <= emitted.get(key, 0):
+                                continue
+                            emitted[key] = seen[key]
+                        on_finding(severity, finding)
+                return feed
+
+        metrics.count('llm.requests')
+        with metrics.span('llm.request', files=len(files_content)) as span:
+            # response = self.model.generate_content(prompt)
+            try:
+                result = self.gemini.generate(make_request(context), listen, deadline)
+            except Exception as e:
+                if context is None or not is_stale_error(e):
+                    raise
+                # The cache entry expired or was deleted early: send this request uncached
+                self.context_cache.invalidate(context)
+                context = None
+                result = self.gemini.generate(make_request(None), listen, deadline)
+            span['attempts'] = result.attempts
+            if result.hedged:
+                span['hedged'] = True
+            if result.first_chunk_ms is not None:
+                span['first_chunk_ms'] = round(result.first_chunk_ms, 1)
+            text, usage = result.text, result.usage
+
+            # Token counts reported by the API, estimated where it doesn't report them
+            prompt_tokens = getattr(usage, 'prompt_token_count', None)
+            if prompt_tokens is None:
+                prompt_tokens = estimate_tokens(ANALYSIS_INSTRUCTIONS) + estimate_tokens(prompt)
+            cached_tokens = getattr(usage, 'cached_content_token_count', None)
+            if cached_tokens is None:
+                cached_tokens = estimate_tokens(ANALYSIS_INSTRUCTIONS) if context is not None else 0
+            response_tokens = getattr(usage, 'candidates_token_count', None)
+            span['cached_tokens'] = cached_tokens
+            span['uncached_tokens'] = prompt_tokens - cached_tokens
+        metrics.count('llm.prompt_tokens', prompt_tokens)
+        metrics.count('llm.cached_tokens', cached_tokens)
+        metrics.count('llm.uncached_tokens', prompt_tokens - cached_tokens)
+        metrics.count('llm.response_tokens', response_tokens if response_tokens is not None else estimate_tokens(text))
+        return text
+
+    def _analyse_batch(self, files_content: Dict[str, str],
+                       on_finding: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                       metrics: Optional[Metrics] = None,
+                       deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Send one batch to Gemini; returns the parsed report or None if it is not valid JSON"""
+        metrics = metrics or Metrics()
+        if self.llm_cache is not None:
+            cached = self.llm_cache.get(files_content, PROMPT_VERSION, MODEL)
+            if cached is not None:
+                if on_finding is not None:
+                    for severity in ('critical', 'warning', 'suggestion'):
+                        for finding in cached.get(severity) or []:
+                            on_finding(severity, finding)
+                return cached
+
+        text = self._generate(files_content, on_finding, metrics, deadline)
+        try:
+            report = json.loads(text) if text else {}
+        except json.JSONDecodeError as e:
+            metrics.error('llm.parse', e)
+            return None
+
+        if self.llm_cache is not None:
+            self.llm_cache.put(files_content, PROMPT_VERSION, MODEL, report)
+        return report
+
+    def send_to_gemini(self, files_content: Dict[str, str],
+                       on_finding: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                       risk: Optional[Dict[str, int]] = None,
+                       metrics: Optional[Metrics] = None) -> Dict[str, Any]:
+        """
+        Send file contents to Gemini and get the merged JSON report.
+
+        Files are split into token-budgeted batches that are analysed concurrently.
+        Paths of files whose batch failed (after retries), returned an unusable
+        response, or did not finish within llm_timeout, are listed under
+        'failed_files'; the other batches' findings are still returned. Files are
+        compacted first (see compaction.py); the token counts before and after
+        are reported under 'compaction'.
+        When on_finding is given, responses are streamed and findings are
+        reported as they arrive. With risk scores (see prescan.py) the riskiest
+        batches are sent first.
+        """
+        metrics = metrics or Metrics()
+        with metrics.span('llm.compact'):
+            compacted = compact(files_content, self.compaction)
+            batches = make_batches(compacted.files, self.batch_tokens)
+        if risk:
+            batches.sort(key=lambda batch: max(risk.get(p, 0) for p in batch), reverse=True)
+        reports = []
+        failed_files: List[str] = []
+
+        finished = threading.Event()
+        report_finding = None
+        if on_finding is not None:
+            # Batches abandoned after the timeout must not report anything any more
+            def report_finding(severity: str, finding: Dict[str, Any]) -> None:
+                if not finished.is_set():
+                    on_finding(severity, finding)
+
+        # Retries of a batch stop when the stage as a whole runs out of time
+        deadline = time.monotonic() + self.llm_timeout if self.llm_timeout is not None else None
+        gemini_before = self.gemini.snapshot()
+        context_before = self.context_cache.snapshot() if self.context_cache is not None else None
 
-    def check_dependencies(self, path: str) -> List[Dict[str, Any]]:
+        def analyse(batch: Dict[str, str]) -> Optional[Dict[str, Any]]:
+            with metrics.span('llm.batch', files=len(batch)):
+                return self._analyse_batch(batch, report_finding, metrics, deadline)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(batches))))
+        futures = {executor.submit(analyse, batch): batch for batch in batches}
+        with metrics.span('llm', batches=len(batches)):
+            done, not_done = wait(futures, timeout=self.llm_timeout)
+        finished.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        metrics.count('llm.batches', len(batches))
+        metrics.count('llm.timed_out_batches', len(not_done))
+        for future in not_done:
+            failed_files.extend(futures[future])
+        errors = []
+        for future in done:
+            try:
+                report = future.result()
+            except Exception as e:
+                # One failing batch must not lose the findings of the others
+                metrics.error('llm.request', e)
+                errors.append(e)
+                failed_files.extend(futures[future])
+                continue
+            if report is None:
+                metrics.count('llm.invalid_responses')
+                failed_files.extend(futures[future])
+            else:
+                reports.append(report)
+        metrics.count('llm.failed_batches', len(errors))
+        gemini_after = self.gemini.snapshot()
+        metrics.add_counters('llm', {k: gemini_after[k] - gemini_before[k]
+                                     for k in ('retries', 'throttled', 'timeouts', 'hedges', 'hedge_wins')})
+        if context_before is not None:
+            context_after = self.context_cache.snapshot()
+            metrics.add_counters('llm.context_cache', {k: context_after[k] - context_before[k] for k in context_after})
+        if errors and len(errors) == len(batches):
+            # Nothing came back at all (e.g. a bad API key): report that rather than an empty result
+            raise errors[0]
+
+        merged = merge_reports(reports)
+        # Duplicates were sent once: their findings, and failures, are those of the copy that was sent
+        expand_aliases(merged, compacted.aliases, SEVERITIES)
+        failed = set(failed_files)
+        failed_files.extend(d for d, original in compacted.aliases.items() if original in failed)
+        merged['failed_files'] = failed_files
+        merged['compaction'] = compacted.stats()
+        return merged
+
+    def check_dependencies(self, path: str, refresh: bool = False,
+                           metrics: Optional[Metrics] = None) -> List[Dict[str, Any]]:
         """Check dependencies for vulnerabilities using dependency_checker"""
+        metrics = metrics or Metrics()
         try:
-            # check_dependencies now returns vulnerabilities directly in the correct format
-            vulnerabilities = check_dependencies(path)
+            # scan_directory returns vulnerabilities directly in the correct format
+            with metrics.span('dependencies'):
+                vulnerabilities = self.dependency_checker.scan_directory(path, refresh=refresh, metrics=metrics)
             return vulnerabilities
-        except Exception:
+        except Exception as e:
+            metrics.error('dependencies', e)
+            metrics.count('dependencies.incomplete')
             return []
 
-    def process(self, path: str) -> Optional[str]:
-        """Main processing function"""
-        files_content = self.read_files(path)
-        response = self.send_to_gemini(files_content)
-        
-        # Parse the Gemini response
-        try:
-            gemini_result = json.loads(response) if response else {}
-        except json.JSONDecodeError:
+    def scan(self, path: str, full: bool = False,
+             on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+             changed: Optional[Iterable[str]] = None,
+             dependencies: Optional[List[Dict[str, Any]]] = None,
+             metrics: Optional[Metrics] = None,
+             since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Scan a project and return the merged report.
+        Unless full is set, only files changed since the last run are sent to Gemini
+        and findings for unchanged files are carried forward from the manifest.
+
+        When on_event is given it receives progress events (see streaming.py)
+        as results arrive, ending with a summary that holds the returned report.
+        changed restricts the scan to those paths instead of walking the tree,
+        and dependencies, if given, are reused instead of auditing again
+        (both are used by watch mode). since, a git revision, restricts the
+        scan to the files git reports as changed since then, plus untracked ones.
+        When metrics is given, spans and counters of the scan are recorded in it
+        (see metrics.py) and its summary is returned under 'metrics'.
+        If nothing changed since the last complete scan, its result is returned
+        as is (see ScanSnapshot in manifest.py).
+        With a findings store, the result holds the new, resolved and unchanged
+        findings since the previous scan under 'delta' (see findings_store.py).
+        """
+        events = EventStream(on_event)
+        report_metrics = metrics is not None
+        metrics = metrics or Metrics()
+
+        if since is not None and changed is None and os.path.isdir(path):
+            with metrics.span('git.diff'):
+                changed = changed_since(path, since)
+            metrics.count('git.changed', len(changed))
+
+        snapshot = ScanSnapshot(path)
+        options = self._snapshot_options()
+        if not full and changed is None and dependencies is None:
+            with metrics.span('snapshot.load'):
+                stored = snapshot.load(options, self._snapshot_max_age())
+            if stored is not None:
+                metrics.count('scan.unchanged')
+                delta = self._record_findings(path, stored, metrics)
+                if delta is not None:
+                    stored['delta'] = delta
+                return self._replay(stored, events, metrics if report_metrics else None)
+
+        cache_before = self.llm_cache.snapshot() if self.llm_cache is not None else None
+        errors_before = metrics.counters.get('errors', 0)
+        incomplete_before = metrics.counters.get('dependencies.incomplete', 0)
+
+        # Dependency auditing is independent of the LLM analysis, so it runs alongside it
+        deps_future = None
+        if dependencies is None:
+            events.stage('dependencies', 'started')
+            deps_executor = ThreadPoolExecutor(max_workers=1)
+            deps_future = deps_executor.submit(self.check_dependencies, path, full, metrics)
+            deps_executor.shutdown(wait=False)
+
+            def report_dependencies(future):
+                found = future.result()
+                for dependency in found:
+                    events.emit('dependency', dependency=dependency)
+                events.stage('dependencies', 'finished', count=len(found))
+            deps_future.add_done_callback(report_dependencies)
+
+        manifest = ScanManifest(path)
+        if os.path.isfile(path):
+            snapshot.observe(path)
+        if not full:
+            with metrics.span('manifest.load'):
+                manifest.load()
+
+        events.stage('files', 'started')
+        ingestor = Ingestor(self.ingest_limits)
+        if changed is None or full:
+            files_content = self.read_files(path, manifest, ingestor, metrics, snapshot.observe)
+            manifest.prune()
+        else:
+            with metrics.span('read'):
+                files_content = self.read_changed(path, changed, manifest, ingestor)
+        metrics.count('files.read', len(files_content))
+        metrics.count('files.skipped', len(ingestor.skipped))
+        metrics.count('bytes.read', ingestor.total_bytes)
+        events.stage('files', 'finished', changed=len(files_content), skipped=len(ingestor.skipped))
+
+        # Findings of unchanged files are known already; report them before any Gemini call
+        carried = manifest.findings(include_orphans=not files_content)
+        for severity, severity_findings in carried.items():
+            for finding in severity_findings:
+                events.finding(severity, finding)
+
+        prescan = None
+        if files_content:
+            # Secrets are found locally; files without any risk signal don't need Gemini at all
+            events.stage('prescan', 'started', files=len(files_content))
+            with metrics.span('prescan', files=len(files_content)):
+                prescan = self.prescanner.scan(files_content)
+            for severity, severity_findings in prescan.findings.items():
+                for finding in severity_findings:
+                    events.finding(severity, finding)
+            llm_files = {p: c for p, c in files_content.items() if prescan.risk[p] >= self.llm_min_risk}
+            metrics.count('prescan.findings', sum(map(len, prescan.findings.values())))
+            metrics.count('prescan.llm_skipped', len(files_content) - len(llm_files))
+            events.stage('prescan', 'finished', findings=sum(map(len, prescan.findings.values())),
+                         llm_skipped=len(files_content) - len(llm_files), elapsed_ms=round(prescan.elapsed_ms, 1))
+
+            gemini_result = {'failed_files': []}
+            if llm_files:
+                events.stage('llm', 'started', files=len(llm_files))
+                gemini_result = self.send_to_gemini(llm_files, events.finding if on_event else None,
+                                                    prescan.risk, metrics)
+                metrics.add_counters('compaction', gemini_result['compaction'])
+                events.stage('llm', 'finished', failed=len(gemini_result['failed_files']),
+                             **gemini_result['compaction'])
+            with metrics.span('merge'):
+                manifest.assign_findings(merge_reports([prescan.report(), gemini_result]), files_content.keys())
+                # Don't remember files whose analysis failed, so they are retried next run
+                manifest.forget(gemini_result['failed_files'])
+        else:
             gemini_result = {}
-        
-        # Check dependencies using dependency_checker
-        dependencies = self.check_dependencies(path)
+
+        with metrics.span('manifest.save'):
+            manifest.save()
+        findings = manifest.findings()
+
+        # Collect the dependency results; a timed-out audit yields no entries
+        deps_timed_out = False
+        if deps_future is not None:
+            try:
+                with metrics.span('dependencies.wait'):
+                    dependencies = deps_future.result(timeout=self.deps_timeout)
+            except FuturesTimeoutError:
+                dependencies = []
+                deps_timed_out = True
+                metrics.count('dependencies.timed_out')
+                events.stage('dependencies', 'timed_out')
+        # A timed-out, failed or partial audit (e.g. NVD lookups that failed) can't tell which dependencies are fine
+        deps_complete = not deps_timed_out and metrics.counters.get('dependencies.incomplete', 0) == incomplete_before
         
         # Merge results
         final_result = {
-            'directory': gemini_result.get('directory', path),
-            'critical': gemini_result.get('critical', []),
-            'warning': gemini_result.get('warning', []),
-            'dependencies': dependencies  # Always include dependencies (empty array if none found)
+            'directory': gemini_result.get('directory') or path,
+            'critical': findings['critical'],
+            'warning': findings['warning'],
+            'dependencies': dependencies,  # Always include dependencies (empty array if none found)
+            'skipped': ingestor.skipped
         }
-        
-        return json.dumps(final_result)
+        if 'compaction' in gemini_result:
+            final_result['compaction'] = gemini_result['compaction']
+        if prescan is not None:
+            final_result['prescan'] = {
+                'files': len(prescan.risk),
+                'findings': sum(map(len, prescan.findings.values())),
+                'llm_skipped': sum(1 for r in prescan.risk.values() if r < self.llm_min_risk),
+                'elapsed_ms': round(prescan.elapsed_ms, 1),
+            }
+
+        if cache_before is not None:
+            cache_after = self.llm_cache.snapshot()
+            final_result['cache'] = {'llm': {k: cache_after[k] - cache_before[k] for k in cache_after}}
+            metrics.add_counters('llm_cache', final_result['cache']['llm'])
+
+        delta = self._record_findings(path, final_result, metrics, gemini_result.get('failed_files', ()),
+                                      dependencies_complete=deps_complete)
+        if delta is not None:
+            final_result['delta'] = delta
+
+        if changed is None and deps_future is not None:
+            # Only a complete, error-free scan may stand in for the next one
+            if (gemini_result.get('failed_files') or not deps_complete
+                    or metrics.counters.get('errors', 0) > errors_before):
+                snapshot.clear()
+            else:
+                with metrics.span('snapshot.save'):
+                    snapshot.save(options, {k: v for k, v in final_result.items() if k not in ('cache', 'delta')})
+        if report_metrics:
+            final_result['metrics'] = metrics.report()
+
+        events.emit('summary', result=final_result)
+        # A dependency audit that finishes after the timeout must not add to a finished stream
+        events.close()
+        return final_result
+
+    def _record_findings(self, path: str, result: Dict[str, Any], metrics: Metrics,
+                         unresolved_files: Iterable[str] = (),
+                         dependencies_complete: bool = True) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Store the findings of a scan and return what changed since the previous one"""
+        if self.findings_store is None:
+            return None
+        try:
+            with metrics.span('findings.record'):
+                delta = self.findings_store.record(path, result, unresolved_files, dependencies_complete)
+        except sqlite3.Error as e:
+            # The report itself is complete; only the comparison with the last scan is lost
+            metrics.error('findings.record', e)
+            return None
+        metrics.count('findings.new', len(delta['new']))
+        metrics.count('findings.resolved', len(delta['resolved']))
+        return delta
+
+    def _snapshot_options(self) -> str:
+        """Everything besides the files that a stored result depends on"""
+        return json.dumps({
+            'model': MODEL,
+            'prompt': PROMPT_VERSION,
+            'llm_min_risk': self.llm_min_risk,
+            'ingest': asdict(self.ingest_limits),
+            'compaction': asdict(self.compaction),
+        }, sort_keys=True)
+
+    def _snapshot_max_age(self) -> float:
+        # A stored result includes the dependency audit, so it is reused no longer than the audit would be
+        cache = self.dependency_checker.cache
+        return cache.max_age if cache is not None else 0.0
+
+    def _replay(self, result: Dict[str, Any], events: EventStream,
+                metrics: Optional[Metrics]) -> Dict[str, Any]:
+        """Report a stored result as if it had just been scanned"""
+        for severity in ('critical', 'warning'):
+            for finding in result.get(severity) or []:
+                events.finding(severity, finding)
+        for dependency in result.get('dependencies') or []:
+            events.emit('dependency', dependency=dependency)
+        if metrics is not None:
+            result = {**result, 'metrics': metrics.report()}
+        events.emit('summary', result=result)
+        events.close()
+        return result
+
+    def scan_many(self, paths: Iterable[str], full: bool = False,
+                  on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  metrics: Optional[Dict[str, Metrics]] = None,
+                  max_projects: int = DEFAULT_MAX_PROJECTS,
+                  since: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Scan several projects in one run and return their reports keyed by directory.
+
+        Up to max_projects scans run at once. They share this scanner's Gemini
+        client and request slots (so concurrency bounds the whole run), the
+        NVD client with its rate limiter and connection pool (a package used
+        by several projects is looked up once) and the caches. Events carry
+        the project's 'dir'; metrics, if given, holds one Metrics per path.
+        A project that cannot be scanned gets {'error': message}.
+        """
+        paths = list(dict.fromkeys(paths))
+        results: Dict[str, Dict[str, Any]] = {}
+
+        def scan_one(path: str) -> Dict[str, Any]:
+            project_events = None
+            if on_event is not None:
+                def project_events(event: Dict[str, Any]) -> None:
+                    on_event({'dir': path, **event})
+            return self.scan(path, full=full, on_event=project_events,
+                             metrics=metrics.get(path) if metrics is not None else None, since=since)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_projects, len(paths)))) as executor:
+            futures = {path: executor.submit(scan_one, path) for path in paths}
+            for path, future in futures.items():
+                try:
+                    results[path] = future.result()
+                except Exception as e:
+                    results[path] = {'error': str(e)}
+        return results
+
+    def process(self, path: str, full: bool = False, metrics: Optional[Metrics] = None,
+                since: Optional[str] = None) -> Optional[str]:
+        """Main processing function"""
+        result = self.scan(path, full=full, metrics=metrics, since=since)
+        if metrics is None:
+            return json.dumps(result)
+        # Only ends up in the trace file; the result's metrics block is already built
+        with metrics.span('serialize'):
+            return json.dumps(result)
 
 
 def main():
     parser = argparse.ArgumentParser(description='Sanches - Coding assist tool')
-    parser.add_argument('--dir', required=True, help='Path to file or directory to analyze')
+    parser.add_argument('--dir', nargs='+', action='extend', help='Path(s) to files or directories to analyze')
+    parser.add_argument('--projects', metavar='FILE', help='File listing project directories to analyze, one per line')
+    parser.add_argument('--max-projects', type=int, default=DEFAULT_MAX_PROJECTS,
+                        help='Projects scanned at the same time when several are given')
     parser.add_argument('--api-key', help='Gemini API key (or set GEMINI_API_KEY env var)')
+    parser.add_argument('--full', action='store_true', help='Ignore the scan manifest and rescan every file')
+    parser.add_argument('--since', metavar='REV',
+                        help='Only analyse files changed since this git revision (plus untracked files)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Maximum number of parallel Gemini requests')
+    parser.add_argument('--batch-tokens', type=int, default=200_000, help='Approximate token budget per Gemini request')
+    parser.add_argument('--max-file-bytes', type=int, default=IngestLimits.max_file_bytes,
+                        help='Skip files larger than this many bytes')
+    parser.add_argument('--max-total-bytes', type=int, default=IngestLimits.max_total_bytes,
+                        help='Stop reading files once this many bytes have been collected')
+    parser.add_argument('--read-workers', type=int,
+                        help='Threads reading and hashing files (default: twice the CPU count, at most 32)')
+    parser.add_argument('--no-compaction', action='store_true',
+                        help='Send files as they are (no licence header/blank line stripping, truncation or de-duplication)')
+    parser.add_argument('--llm-min-risk', type=int, default=1,
+                        help='Only send files the local pre-scan scores at least this risky to Gemini (0 sends everything)')
+    parser.add_argument('--no-llm-cache', action='store_true', help='Do not reuse or store cached Gemini results')
+    parser.add_argument('--llm-cache-ttl', type=float, default=DEFAULT_TTL,
+                        help='Seconds before a cached Gemini result expires')
+    parser.add_argument('--llm-cache-max-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help='Size budget of the Gemini result cache in MB')
+    parser.add_argument('--no-findings-store', action='store_true',
+                        help='Do not keep findings between scans (results then have no new/resolved "delta")')
+    parser.add_argument('--llm-context-cache-ttl', type=float, default=DEFAULT_CONTEXT_TTL,
+                        help='Seconds the analysis instructions stay in a Gemini context cache (0 sends them with every request)')
+    parser.add_argument('--deps-cache-ttl', type=float, default=DEFAULT_MAX_AGE,
+                        help='Seconds a cached dependency audit stays fresh (0 disables the cache)')
+    parser.add_argument('--llm-timeout', type=float, help='Give up on Gemini batches still running after this many seconds')
+    parser.add_argument('--llm-request-timeout', type=float, default=DEFAULT_REQUEST_TIMEOUT,
+                        help='Abandon and retry a single Gemini request after this many seconds')
+    parser.add_argument('--llm-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help='Retries of a Gemini request that failed, timed out or was rate limited')
+    parser.add_argument('--llm-hedge', action='store_true',
+                        help='Send a duplicate of Gemini requests that take unusually long; the first answer wins')
+    parser.add_argument('--deps-timeout', type=float,
+                        help='Give up on the dependency audit after this many seconds')
+    parser.add_argument('--update-vulndb', nargs='+', metavar='DUMP',
+                        help='Import OSV exports or NVD JSON feeds into the offline vulnerability index and exit')
+    parser.add_argument('--vulndb', help='Path of the offline vulnerability index (default: in the cache dir)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Print newline-delimited JSON events as results arrive instead of one final report')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and rescan changed files as they are saved (prints events like --stream)')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help='Seconds of quiet that end a burst of file changes in watch mode')
+    parser.add_argument('--serve', action='store_true', help='Stay resident and take JSON-RPC scan requests on stdin')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Add per-stage timings and counters to the result under "metrics"')
+    parser.add_argument('--trace-file', help='Write the stage spans to this file in Chrome trace format (implies --metrics)')
+    parser.add_argument('--walk-only', action='store_true', help='Only enumerate files and print walk timing statistics')
 
     args = parser.parse_args()
 
+    if args.update_vulndb:
+        print(json.dumps(update_vulndb(args.update_vulndb, args.vulndb)))
+        return 0
+
     api_key = args.api_key or os.getenv('GEMINI_API_KEY')
+    limits = IngestLimits(max_file_bytes=args.max_file_bytes, max_total_bytes=args.max_total_bytes)
+    llm_cache = None
+    if not args.no_llm_cache:
+        llm_cache = LLMCache(ttl=args.llm_cache_ttl, max_bytes=int(args.llm_cache_max_mb * 1024 * 1024))
+    findings_store = None if args.no_findings_store else FindingsStore()
+    dependency_cache = DependencyCache(max_age=args.deps_cache_ttl) if args.deps_cache_ttl > 0 else None
+    dependency_checker = DependencyChecker(cache=dependency_cache, stage_timeout=args.deps_timeout,
+                                           vulndb=VulnDB.open_existing(args.vulndb))
+    if args.no_compaction:
+        compaction = CompactionOptions(strip_licence_headers=False, collapse_blank_lines=False,
+                                       truncate_generated=False, dedupe=False)
+    else:
+        compaction = CompactionOptions()
+
+    retry_policy = RetryPolicy(request_timeout=args.llm_request_timeout, max_retries=args.llm_retries,
+                               hedge=args.llm_hedge)
+
+    if args.serve:
+        # Resident and watch mode are imported on demand, to keep one-shot scans quick to start
+        from server import ScanServer
+        # The API key may also be passed with each scan request
+        server = ScanServer(
+            lambda key: Sanches(key, concurrency=args.concurrency, batch_tokens=args.batch_tokens,
+                                ingest_limits=limits, llm_cache=llm_cache,
+                                dependency_checker=dependency_checker,
+                                llm_timeout=args.llm_timeout, deps_timeout=args.deps_timeout,
+                                compaction=compaction, llm_min_risk=args.llm_min_risk,
+                                retry_policy=retry_policy, findings_store=findings_store,
+                                context_cache_ttl=args.llm_context_cache_ttl, read_workers=args.read_workers),
+            default_api_key=api_key,
+            debounce=args.debounce,
+            findings_store=findings_store,
+        )
+        server.serve_forever()
+        return 0
+
+    directories = list(args.dir or [])
+    if args.projects:
+        directories.extend(read_project_list(args.projects))
+    if not directories:
+        parser.error('--dir or --projects is required unless --serve is used')
+    # A single --dir keeps the single-report output; anything else is keyed by directory
+    several = len(directories) > 1 or bool(args.projects)
+    if several and args.watch:
+        parser.error('--watch takes a single --dir')
+
+    if args.walk_only:
+        # No Gemini call: shows how much of the tree the walker prunes and how long it takes
+        walked = {}
+        for directory in directories:
+            stats = WalkStats()
+            for _ in walk(directory, stats=stats):
+                pass
+            walked[directory] = {'directory': directory, **asdict(stats)}
+        print(json.dumps({'projects': walked} if several else walked[directories[0]]))
+        return 0
+
     if not api_key:
         print("Error: Please provide API key via --api-key or GEMINI_API_KEY environment variable")
         return 1
 
     try:
-        sanches = Sanches(api_key)
-        result = sanches.process(args.dir)
-        print(result)
+        sanches = Sanches(api_key, concurrency=args.concurrency, batch_tokens=args.batch_tokens,
+                          ingest_limits=limits, llm_cache=llm_cache,
+                          dependency_checker=dependency_checker,
+                          llm_timeout=args.llm_timeout, deps_timeout=args.deps_timeout,
+                          compaction=compaction, llm_min_risk=args.llm_min_risk,
+                          retry_policy=retry_policy, findings_store=findings_store,
+                          context_cache_ttl=args.llm_context_cache_ttl, read_workers=args.read_workers)
+        collect_metrics = args.metrics or bool(args.trace_file)
+        if several:
+            project_metrics = None
+            if collect_metrics:
+                # One shared time origin, so the projects line up in the trace
+                origin = time.perf_counter()
+                project_metrics = {d: Metrics(origin=origin) for d in directories}
+            on_event = None
+            if args.stream:
+                write = ndjson_writer(sys.stdout)
+                lock = threading.Lock()
+
+                def on_event(event: Dict[str, Any]) -> None:
+                    with lock:
+                        write(event)
+            results = sanches.scan_many(directories, full=args.full, on_event=on_event,
+                                        metrics=project_metrics, max_projects=args.max_projects,
+                                        since=args.since)
+            if not args.stream:
+                print(json.dumps({'projects': results}))
+            if args.trace_file:
+                write_traces(args.trace_file, project_metrics)
+            return 0
+
+        directory = directories[0]
+        metrics = Metrics() if collect_metrics else None
+        if args.stream or args.watch:
+            # The final summary event of each scan carries the full report
+            write = ndjson_writer(sys.stdout)
+            lock = threading.Lock()
+
+            def on_event(event: Dict[str, Any]) -> None:
+                with lock:
+                    write(event)
+            if args.watch:
+                from watcher import ProjectWatch
+                try:
+                    ProjectWatch(sanches, directory, on_event, debounce=args.debounce).run()
+                except KeyboardInterrupt:
+                    pass
+                return 0
+            sanches.scan(directory, full=args.full, on_event=on_event, metrics=metrics, since=args.since)
+        else:
+            print(sanches.process(directory, full=args.full, metrics=metrics, since=args.since))
+        if args.trace_file:
+            metrics.write_trace(args.trace_file)
         return 0
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,210 @@
+"""
+Resident scanner mode (sanches.py --serve)
+
+Speaks newline-delimited JSON-RPC 2.0 over stdin/stdout so the Electron app can
+keep one Python process alive and reuse the Gemini client, HTTP connection pools
+and caches between scans instead of paying interpreter and import startup on
+every interval.
+
+Requests:
+    {"jsonrpc": "2.0", "id": 1, "method": "scan", "params": {"dir": "...", "api_key": "...", "full": false}}
+    {"jsonrpc": "2.0", "id": 2, "method": "ping"}
+    {"jsonrpc": "2.0", "id": 3, "method": "shutdown"}
+    {"jsonrpc": "2.0", "id": 4, "method": "watch", "params": {"dir": "...", "api_key": "..."}}
+    {"jsonrpc": "2.0", "id": 5, "method": "unwatch", "params": {"dir": "..."}}
+    {"jsonrpc": "2.0", "id": 6, "method": "findings", "params": {"dir": "...", "severity": "critical", "file": "..."}}
+
+With "stream": true in the scan params, progress events (see streaming.py) are
+sent as notifications before the final response:
+    {"jsonrpc": "2.0", "method": "scan.event", "params": {"id": 1, "event": "finding", ...}}
+With "metrics": true the result holds stage timings and counters under "metrics".
+With a findings store the result also holds "delta": the new, resolved and
+unchanged findings since the previous scan of the project.
+
+"findings" answers from the findings store without scanning: the open findings
+(all of them with "include_resolved": true), optionally only those of one
+project, severity ("critical", "warning" or "dependency") or file.
+
+A watched project is scanned once and then rescanned whenever its files
+change; its events are sent until unwatch as:
+    {"jsonrpc": "2.0", "method": "watch.event", "params": {"dir": "...", "event": "summary", ...}}
+"""
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TextIO
+
+from findings_store import FindingsStore
+from metrics import Metrics
+from watcher import DEFAULT_DEBOUNCE, ProjectWatch
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SCAN_ERROR = -32000
+
+
+class ScanServer:
+    def __init__(self, make_scanner: Callable[[str], Any], default_api_key: Optional[str] = None,
+                 max_workers: int = 4, output: TextIO = sys.stdout, debounce: float = DEFAULT_DEBOUNCE,
+                 findings_store: Optional[FindingsStore] = None):
+        self.make_scanner = make_scanner
+        self.findings_store = findings_store
+        self.default_api_key = default_api_key
+        self.output = output
+        self.debounce = debounce
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._scanners: Dict[str, Any] = {}
+        self._scanners_lock = threading.Lock()
+        self._dir_locks: Dict[str, threading.Lock] = {}
+        self._write_lock = threading.Lock()
+        self._watches: Dict[str, ProjectWatch] = {}
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        with self._write_lock:
+            self.output.write(json.dumps(message) + '\n')
+            self.output.flush()
+
+    def _reply(self, request_id: Any, result: Any = None, error: Optional[Dict[str, Any]] = None) -> None:
+        message: Dict[str, Any] = {'jsonrpc': '2.0', 'id': request_id}
+        if error is not None:
+            message['error'] = error
+        else:
+            message['result'] = result
+        self._send(message)
+
+    def _scanner_for(self, api_key: str) -> Any:
+        """One warm scanner (client, pools, caches) per API key"""
+        with self._scanners_lock:
+            scanner = self._scanners.get(api_key)
+            if scanner is None:
+                scanner = self.make_scanner(api_key)
+                self._scanners[api_key] = scanner
+            return scanner
+
+    @staticmethod
+    def _project_key(directory: str) -> str:
+        # 'app', './app/' and a symlink to it are the same project
+        return os.path.realpath(directory)
+
+    def _dir_lock(self, directory: str) -> threading.Lock:
+        # Scans of the same project share a manifest, so they must not overlap
+        with self._scanners_lock:
+            return self._dir_locks.setdefault(self._project_key(directory), threading.Lock())
+
+    def _scan(self, request_id: Any, params: Dict[str, Any]) -> None:
+        try:
+            scanner = self._scanner_for(params.get('api_key') or self.default_api_key)
+            on_event = None
+            if params.get('stream'):
+                def on_event(event: Dict[str, Any]) -> None:
+                    self._send({'jsonrpc': '2.0', 'method': 'scan.event', 'params': {'id': request_id, **event}})
+            metrics = Metrics() if params.get('metrics') else None
+            with self._dir_lock(params['dir']):
+                result = scanner.scan(params['dir'], full=bool(params.get('full', False)), on_event=on_event,
+                                      metrics=metrics)
+            self._reply(request_id, result)
+        except Exception as e:
+            self._reply(request_id, error={'code': SCAN_ERROR, 'message': str(e)})
+
+    def _findings(self, request_id: Any, params: Dict[str, Any]) -> None:
+        try:
+            result = self.findings_store.query(params.get('dir'), params.get('severity'), params.get('file'),
+                                               bool(params.get('include_resolved', False)))
+            self._reply(request_id, result)
+        except Exception as e:
+            self._reply(request_id, error={'code': SCAN_ERROR, 'message': str(e)})
+
+    def _watch(self, directory: str, api_key: str) -> None:
+        def on_event(event: Dict[str, Any]) -> None:
+            self._send({'jsonrpc': '2.0', 'method': 'watch.event', 'params': {'dir': directory, **event}})
+
+        key = self._project_key(directory)
+        watch = ProjectWatch(self._scanner_for(api_key), directory, on_event, debounce=self.debounce,
+                             lock=self._dir_lock(directory))
+        with self._scanners_lock:
+            if key in self._watches:
+                return
+            self._watches[key] = watch
+
+        def run() -> None:
+            try:
+                watch.run()
+            except Exception as e:
+                on_event({'event': 'error', 'message': str(e)})
+            finally:
+                with self._scanners_lock:
+                    if self._watches.get(key) is watch:
+                        del self._watches[key]
+
+        # Watches live as long as the project is watched, so they don't take a scan worker
+        threading.Thread(target=run, name=f'watch {directory}', daemon=True).start()
+
+    def _unwatch(self, directory: Optional[str] = None) -> None:
+        key = self._project_key(directory) if directory is not None else None
+        with self._scanners_lock:
+            watches = [w for d, w in self._watches.items() if key is None or d == key]
+        for watch in watches:
+            watch.stop()
+
+    def handle(self, line: str) -> bool:
+        """Handle one request line; returns False when the server should stop"""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            self._reply(None, error={'code': PARSE_ERROR, 'message': str(e)})
+            return True
+
+        if not isinstance(request, dict) or 'method' not in request:
+            self._reply(None, error={'code': INVALID_REQUEST, 'message': 'Invalid request'})
+            return True
+
+        request_id = request.get('id')
+        method = request['method']
+        params = request.get('params') or {}
+
+        if method == 'ping':
+            self._reply(request_id, 'pong')
+        elif method == 'shutdown':
+            self._unwatch()
+            self._reply(request_id, 'ok')
+            return False
+        elif method == 'scan':
+            if not params.get('dir'):
+                self._reply(request_id, error={'code': INVALID_PARAMS, 'message': "Missing 'dir'"})
+            elif not (params.get('api_key') or self.default_api_key):
+                self._reply(request_id, error={'code': INVALID_PARAMS, 'message': 'Missing API key'})
+            else:
+                self.executor.submit(self._scan, request_id, params)
+        elif method == 'watch':
+            if not params.get('dir'):
+                self._reply(request_id, error={'code': INVALID_PARAMS, 'message': "Missing 'dir'"})
+            elif not (params.get('api_key') or self.default_api_key):
+                self._reply(request_id, error={'code': INVALID_PARAMS, 'message': 'Missing API key'})
+            else:
+                self._watch(params['dir'], params.get('api_key') or self.default_api_key)
+                self._reply(request_id, 'ok')
+        elif method == 'findings':
+            if self.findings_store is None:
+                self._reply(request_id, error={'code': INVALID_REQUEST, 'message': 'The findings store is disabled'})
+            else:
+                self.executor.submit(self._findings, request_id, params)
+        elif method == 'unwatch':
+            self._unwatch(params.get('dir'))
+            self._reply(request_id, 'ok')
+        else:
+            self._reply(request_id, error={'code': METHOD_NOT_FOUND, 'message': f'Unknown method {method}'})
+        return True
+
+    def serve_forever(self, input_stream: TextIO = sys.stdin) -> None:
+        """Process requests until stdin closes or a shutdown request arrives"""
+        try:
+            for line in input_stream:
+                if line.strip() and not self.handle(line):
+                    break
+        finally:
+            self._unwatch()
+            self.executor.shutdown(wait=True)
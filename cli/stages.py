@@ -0,0 +1,33 @@
+"""
+Helper for running independent scan stages concurrently
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def run_concurrently(stages: Dict[str, Callable[[], Any]],
+                     timeout: Optional[float] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Run independent stages in parallel and wait at most timeout seconds.
+
+    Returns the results of the stages that finished, keyed by name, and the
+    names of stages that raised or did not finish in time. Stragglers are
+    abandoned rather than waited for, so the total latency is bounded by the
+    slowest stage or the timeout, whichever comes first.
+    """
+    if not stages:
+        return {}, []
+
+    executor = ThreadPoolExecutor(max_workers=len(stages))
+    futures = {name: executor.submit(fn) for name, fn in stages.items()}
+    done, _ = wait(futures.values(), timeout=timeout)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results: Dict[str, Any] = {}
+    failed: List[str] = []
+    for name, future in futures.items():
+        if future in done and future.exception() is None:
+            results[name] = future.result()
+        else:
+            failed.append(name)
+    return results, failed
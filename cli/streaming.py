@@ -0,0 +1,122 @@
+"""
+Incremental scan output (sanches.py --stream)
+
+Scan progress is reported as newline-delimited JSON events while the scan runs,
+so findings can be shown before the slowest stage finishes:
+
+    {"event": "stage", "stage": "llm", "status": "started"}
+    {"event": "finding", "severity": "critical", "finding": {...}}
+    {"event": "dependency", "dependency": {...}}
+    {"event": "stage", "stage": "llm", "status": "finished", ...}
+    {"event": "summary", "result": {...}}
+
+The summary carries the same result a non-streaming run prints.
+"""
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Severities that appear in the scan result
+REPORTED_SEVERITIES = ('critical', 'warning')
+
+
+class FindingExtractor:
+    """
+    Incremental parser for a streamed Gemini report: returns each finding
+    object as soon as its closing brace arrives, long before the whole
+    report is valid JSON
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._key: Optional[str] = None  # Last top-level key, i.e. the severity array we are in
+        self._object: Optional[List[str]] = None
+
+    def feed(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        found = []
+        for ch in text:
+            if self._object is not None:
+                self._object.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._key = ''.join(self._string)
+                elif self._depth == 1:
+                    self._string.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch in '{[':
+                self._depth += 1
+                # Findings are the objects inside the top-level arrays
+                if self._depth == 3 and ch == '{':
+                    self._object = ['{']
+            elif ch in '}]':
+                if self._depth == 3 and self._object is not None:
+                    try:
+                        finding = json.loads(''.join(self._object))
+                    except json.JSONDecodeError:
+                        finding = None
+                    if isinstance(finding, dict) and self._key:
+                        found.append((self._key, finding))
+                    self._object = None
+                self._depth -= 1
+        return found
+
+
+class EventStream:
+    """Thread-safe sink for scan events; repeated findings are dropped and nothing is sent after close()"""
+
+    def __init__(self, callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.callback = callback
+        self._seen = set()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields: Any) -> None:
+        if self.callback is None:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self.callback({'event': event, **fields})
+            except Exception:
+                # The consumer went away (e.g. closed pipe); keep scanning silently
+                self._closed = True
+
+    def stage(self, stage: str, status: str, **fields: Any) -> None:
+        self.emit('stage', stage=stage, status=status, **fields)
+
+    def finding(self, severity: str, finding: Dict[str, Any]) -> None:
+        if self.callback is None or severity not in REPORTED_SEVERITIES:
+            return
+        key = (severity, finding.get('file_path'), finding.get('description'))
+        with self._lock:
+            if key in self._seen:
+                return
+            self._seen.add(key)
+        self.emit('finding', severity=severity, finding=finding)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+
+
+def ndjson_writer(output) -> Callable[[Dict[str, Any]], None]:
+    """Callback that writes each event as one JSON line and flushes it immediately"""
+    def write(event: Dict[str, Any]) -> None:
+        output.write(json.dumps(event) + '\n')
+        output.flush()
+    return write
@@ -0,0 +1,323 @@
+"""
+Offline vulnerability index built from OSV exports and NVD JSON feeds
+
+`sanches.py --update-vulndb <dump>` imports advisories into a local SQLite
+index keyed by (ecosystem, package) with parsed version ranges, so
+DependencyChecker can match installed versions locally without any network
+traffic. Re-importing only applies records that are newer than the stored
+ones.
+
+Supported dumps: OSV JSON files, directories or zip archives (e.g. the
+per-ecosystem all.zip exports) and NVD CVE API 2.0 / legacy 1.1 JSON feeds,
+optionally gzip-compressed.
+"""
+import gzip
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+import zipfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from manifest import default_cache_dir
+
+# OSV ecosystem names and NVD CPE target_sw values mapped to Sanches package types
+OSV_ECOSYSTEMS = {'npm': 'npm', 'PyPI': 'pip'}
+CPE_TARGETS = {'node.js': 'npm', 'nodejs': 'npm', 'python': 'pip'}
+
+_VERSION_RE = re.compile(r'^[vV=]?(\d+(?:\.\d+)*)(.*)$')
+_TOKEN_RE = re.compile(r'\d+|[a-zA-Z]+')
+
+
+def default_vulndb_path() -> pathlib.Path:
+    return default_cache_dir() / 'vulndb.sqlite3'
+
+
+def normalize_package(ecosystem: str, name: str) -> str:
+    """Canonical package name, so lookups collapse spelling variants"""
+    if ecosystem == 'pip':
+        # PEP 503 normalisation
+        return re.sub(r'[-_.]+', '-', name).lower()
+    return name.strip().lower()
+
+
+def version_key(version: str) -> Optional[Tuple]:
+    """
+    Sortable key for semver/PEP 440-ish versions: numeric release parts with
+    trailing zeros dropped, pre-releases before the release, post-releases after
+    """
+    match = _VERSION_RE.match(version.strip())
+    if not match:
+        return None
+    release = [int(part) for part in match.group(1).split('.')]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+
+    rest = match.group(2).lstrip('.-_')
+    if rest.startswith('+'):
+        rest = ''  # Build metadata does not affect ordering
+    tokens = tuple((0, int(t), '') if t.isdigit() else (1, 0, t.lower()) for t in _TOKEN_RE.findall(rest))
+    if not tokens:
+        phase = 1
+    elif tokens[0][2] in ('post', 'rev', 'r', 'p'):
+        phase = 2
+    else:
+        phase = 0
+    return (tuple(release), phase, tokens)
+
+
+def _in_range(version: Tuple, row: sqlite3.Row) -> bool:
+    if row['versions']:
+        return False  # Explicit version lists are matched separately
+    if row['lo'] is not None:
+        lo = version_key(row['lo'])
+        if lo is not None and (version < lo or (version == lo and not row['lo_incl'])):
+            return False
+    if row['hi'] is not None:
+        hi = version_key(row['hi'])
+        if hi is not None and (version > hi or (version == hi and not row['hi_incl'])):
+            return False
+    return True
+
+
+def _osv_ranges(affected: Dict[str, Any]) -> Iterator[Tuple[Optional[str], bool, Optional[str], bool]]:
+    """Turn OSV range events into (lo, lo_inclusive, hi, hi_inclusive) intervals"""
+    for version_range in affected.get('ranges', []):
+        if version_range.get('type') not in ('SEMVER', 'ECOSYSTEM'):
+            continue
+        lo = None
+        open_range = False
+        for event in version_range.get('events', []):
+            if 'introduced' in event:
+                lo = None if event['introduced'] in ('0', '') else event['introduced']
+                open_range = True
+            elif 'fixed' in event and open_range:
+                yield lo, True, event['fixed'], False
+                open_range = False
+            elif 'last_affected' in event and open_range:
+                yield lo, True, event['last_affected'], True
+                open_range = False
+        if open_range:
+            yield lo, True, None, False
+
+
+def parse_osv(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    affected_rows = []
+    for affected in record.get('affected', []):
+        package = affected.get('package', {})
+        ecosystem = OSV_ECOSYSTEMS.get(package.get('ecosystem', ''))
+        if not ecosystem or not package.get('name'):
+            continue
+        name = normalize_package(ecosystem, package['name'])
+        for lo, lo_incl, hi, hi_incl in _osv_ranges(affected):
+            affected_rows.append((ecosystem, name, lo, lo_incl, hi, hi_incl, None))
+        if affected.get('versions'):
+            affected_rows.append((ecosystem, name, None, True, None, False, json.dumps(affected['versions'])))
+    if not affected_rows:
+        return None
+
+    severity = (record.get('database_specific') or {}).get('severity', '')
+    aliases = [a for a in record.get('aliases', []) if a.startswith('CVE-')]
+    summary = record.get('summary') or record.get('details', '')
+    return {
+        'id': record['id'],
+        'display_id': aliases[0] if aliases else record['id'],
+        'modified': record.get('modified', ''),
+        'summary': summary,
+        'severity': severity.upper() if severity else '',
+        'affected': affected_rows,
+    }
+
+
+def _cpe_rows(cpe_match: Dict[str, Any]) -> Iterator[Tuple]:
+    criteria = cpe_match.get('criteria') or cpe_match.get('cpe23Uri', '')
+    parts = criteria.split(':')
+    if len(parts) < 11 or not cpe_match.get('vulnerable', True):
+        return
+    ecosystem = CPE_TARGETS.get(parts[10].lower())
+    if not ecosystem:
+        return
+    name = normalize_package(ecosystem, parts[4])
+
+    start_incl = cpe_match.get('versionStartIncluding')
+    start_excl = cpe_match.get('versionStartExcluding')
+    end_incl = cpe_match.get('versionEndIncluding')
+    end_excl = cpe_match.get('versionEndExcluding')
+    if start_incl or start_excl or end_incl or end_excl:
+        yield (ecosystem, name, start_incl or start_excl, start_excl is None,
+               end_incl or end_excl, end_incl is not None, None)
+    elif parts[5] not in ('*', '-'):
+        yield (ecosystem, name, None, True, None, False, json.dumps([parts[5]]))
+
+
+def _walk_nodes(nodes: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    for node in nodes:
+        yield from node.get('cpeMatch', node.get('cpe_match', []))
+        yield from _walk_nodes(node.get('children', []))
+
+
+def parse_nvd(cve: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Parse one CVE from an NVD 2.0 ('cve') or 1.1 ('CVE_Items' entry) feed"""
+    if 'cve' in cve and 'CVE_data_meta' in cve['cve']:
+        # Legacy 1.1 feed layout
+        cve_id = cve['cve']['CVE_data_meta']['ID']
+        descriptions = cve['cve'].get('description', {}).get('description_data', [])
+        nodes = cve.get('configurations', {}).get('nodes', [])
+        modified = cve.get('lastModifiedDate', '')
+        impact = cve.get('impact', {}).get('baseMetricV3', {}).get('cvssV3', {})
+    else:
+        cve_id = cve.get('id', '')
+        descriptions = cve.get('descriptions', [])
+        nodes = [n for config in cve.get('configurations', []) for n in config.get('nodes', [])]
+        modified = cve.get('lastModified', '')
+        impact = {}
+        for cvss_version in ('cvssMetricV31', 'cvssMetricV30', 'cvssMetricV2'):
+            if cve.get('metrics', {}).get(cvss_version):
+                impact = cve['metrics'][cvss_version][0].get('cvssData', {})
+                break
+
+    affected_rows = [row for match in _walk_nodes(nodes) for row in _cpe_rows(match)]
+    if not cve_id or not affected_rows:
+        return None
+
+    summary = next((d.get('value', '') for d in descriptions if d.get('lang') == 'en'), '')
+    severity = impact.get('baseSeverity', '')
+    if impact.get('baseScore') is not None:
+        severity = f"{impact['baseScore']} - {severity or 'UNKNOWN'}"
+    return {'id': cve_id, 'display_id': cve_id, 'modified': modified, 'summary': summary, 'severity': severity, 'affected': affected_rows}
+
+
+def _records_from_document(doc: Any) -> Iterator[Dict[str, Any]]:
+    if isinstance(doc, list):
+        for item in doc:
+            yield from _records_from_document(item)
+    elif isinstance(doc, dict):
+        if 'vulnerabilities' in doc:
+            for item in doc['vulnerabilities']:
+                parsed = parse_nvd(item.get('cve', {}))
+                if parsed:
+                    yield parsed
+        elif 'CVE_Items' in doc:
+            for item in doc['CVE_Items']:
+                parsed = parse_nvd(item)
+                if parsed:
+                    yield parsed
+        elif 'affected' in doc and 'id' in doc:
+            parsed = parse_osv(doc)
+            if parsed:
+                yield parsed
+
+
+def iter_dump(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield parsed advisories from a dump file, directory or zip archive"""
+    dump = pathlib.Path(path)
+    if dump.is_dir():
+        for child in sorted(dump.rglob('*')):
+            if child.is_file() and child.name.endswith(('.json', '.json.gz')):
+                yield from iter_dump(str(child))
+    elif zipfile.is_zipfile(dump):
+        with zipfile.ZipFile(dump) as archive:
+            for name in archive.namelist():
+                if name.endswith('.json'):
+                    with archive.open(name) as f:
+                        yield from _records_from_document(json.load(f))
+    else:
+        opener = gzip.open if dump.name.endswith('.gz') else open
+        with opener(dump, 'rt', encoding='utf-8') as f:
+            yield from _records_from_document(json.load(f))
+
+
+class VulnDB:
+    def __init__(self, path: Optional[pathlib.Path] = None):
+        self.path = pathlib.Path(path) if path else default_vulndb_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS advisories (
+                id TEXT PRIMARY KEY, display_id TEXT, modified TEXT, summary TEXT, severity TEXT);
+            CREATE TABLE IF NOT EXISTS affected (
+                advisory_id TEXT, ecosystem TEXT, package TEXT,
+                lo TEXT, lo_incl INTEGER, hi TEXT, hi_incl INTEGER, versions TEXT);
+            CREATE INDEX IF NOT EXISTS idx_affected_package ON affected(ecosystem, package);
+            CREATE INDEX IF NOT EXISTS idx_affected_advisory ON affected(advisory_id);
+        ''')
+
+    @classmethod
+    def open_existing(cls, path: Optional[pathlib.Path] = None) -> Optional['VulnDB']:
+        """Open the index if it has been built, otherwise return None"""
+        path = pathlib.Path(path) if path else default_vulndb_path()
+        return cls(path) if path.exists() else None
+
+    def import_dump(self, path: str) -> Dict[str, int]:
+        """Import a dump, applying only records newer than what is stored"""
+        stats = {'imported': 0, 'unchanged': 0}
+        with self._lock:
+            for record in iter_dump(path):
+                row = self._db.execute('SELECT modified FROM advisories WHERE id = ?', (record['id'],)).fetchone()
+                if row is not None and row['modified'] and record['modified'] <= row['modified']:
+                    stats['unchanged'] += 1
+                    continue
+
+                self._db.execute('DELETE FROM affected WHERE advisory_id = ?', (record['id'],))
+                self._db.execute(
+                    'INSERT OR REPLACE INTO advisories VALUES (?, ?, ?, ?, ?)',
+                    (record['id'], record['display_id'], record['modified'], record['summary'], record['severity']),
+                )
+                self._db.executemany(
+                    'INSERT INTO affected VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(record['id'], *affected) for affected in record['affected']],
+                )
+                stats['imported'] += 1
+            self._db.commit()
+        return stats
+
+    def lookup(self, ecosystem: str, package: str, version: str) -> List[Dict[str, Any]]:
+        """
+        Advisories affecting package@version. An empty or unparseable version
+        matches every advisory for the package.
+        """
+        name = normalize_package(ecosystem, package)
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT a.*, ad.display_id, ad.summary, ad.severity FROM affected a '
+                'JOIN advisories ad ON ad.id = a.advisory_id '
+                'WHERE a.ecosystem = ? AND a.package = ?',
+                (ecosystem, name),
+            ).fetchall()
+
+        key = version_key(version) if version else None
+        matches: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            if key is not None:
+                if row['versions']:
+                    listed = {version_key(v) for v in json.loads(row['versions'])}
+                    if key not in listed:
+                        continue
+                elif not _in_range(key, row):
+                    continue
+            # The same CVE may come from several sources (GHSA, PYSEC, NVD); report it once
+            matches.setdefault(row['display_id'], {
+                'id': row['display_id'],
+                'summary': row['summary'],
+                'severity': row['severity'],
+            })
+        return list(matches.values())
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def update_vulndb(dumps: List[str], path: Optional[pathlib.Path] = None) -> Dict[str, int]:
+    db = VulnDB(path)
+    totals = {'imported': 0, 'unchanged': 0}
+    try:
+        for dump in dumps:
+            for key, value in db.import_dump(os.path.expanduser(dump)).items():
+                totals[key] += value
+    finally:
+        db.close()
+    return totals
@@ -0,0 +1,213 @@
+"""
+Pruning directory walker
+
+Walks a project with os.scandir and never descends into directories that are
+ignored (dependency folders, VCS metadata, .gitignore'd paths). Ignore rules
+from .git/info/exclude and every .gitignore found on the way are rebased onto
+the project root and compiled into a single matcher.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Set
+
+if TYPE_CHECKING:
+    import pathspec
+
+# Common package dependency directories to ignore
+DEPENDENCY_DIRS = {
+    'node_modules', '.venv', 'venv', 'env', '.env',
+    '__pycache__', '.pytest_cache', '.mypy_cache',
+    'dist', 'build', '.egg-info', '.eggs',
+    '.tox', 'htmlcov', '.coverage',
+    '.next', '.nuxt', 'out', '.vercel',
+    'vendor', '.bundle', 'Pods', '.cocoapods',
+    'target', 'bin', 'obj',
+}
+
+# Version control metadata is never part of the analysed code
+VCS_DIRS = {'.git', '.hg', '.svn'}
+
+# Dependency files to ignore (handled by NVD API separately)
+DEPENDENCY_FILES = {
+    'package.json', 'package-lock.json', 'yarn.lock',
+    'requirements.txt', 'Pipfile', 'Pipfile.lock',
+    'poetry.lock', 'composer.json', 'composer.lock',
+    'Gemfile', 'Gemfile.lock', 'go.mod', 'go.sum',
+    'pom.xml', 'build.gradle', 'build.gradle.kts'
+}
+
+
+def is_pruned_dir(name: str) -> bool:
+    """True for directories that are skipped regardless of ignore files"""
+    return name in DEPENDENCY_DIRS or name in VCS_DIRS or name.endswith('.egg-info')
+
+
+def rebase_pattern(pattern: str, rel_dir: str) -> Optional[str]:
+    """
+    Rewrite a .gitignore pattern found in rel_dir so it can be matched against
+    paths relative to the project root. Returns None for blanks and comments.
+    """
+    line = pattern.rstrip()
+    if not line or line.startswith('#'):
+        return None
+    if not rel_dir:
+        return line
+
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+
+    # A slash at the start or in the middle anchors the pattern to its directory
+    if line.startswith('/'):
+        rebased = rel_dir + line
+    elif '/' in line.rstrip('/'):
+        rebased = f'{rel_dir}/{line}'
+    else:
+        rebased = f'{rel_dir}/**/{line}'
+    return ('!' if negate else '') + rebased
+
+
+class IgnoreMatcher:
+    """All ignore rules of a project compiled into one gitwildmatch spec"""
+
+    def __init__(self):
+        self._patterns: List[str] = []
+        self._spec: Optional['pathspec.PathSpec'] = None
+
+    def add_lines(self, lines: Iterable[str], rel_dir: str = '') -> None:
+        for line in lines:
+            rebased = rebase_pattern(line, rel_dir)
+            if rebased is not None:
+                self._patterns.append(rebased)
+                self._spec = None
+
+    def add_file(self, ignore_file: str, rel_dir: str = '') -> None:
+        try:
+            with open(ignore_file, 'r', encoding='utf-8') as f:
+                self.add_lines(f.read().splitlines(), rel_dir)
+        except (OSError, UnicodeDecodeError):
+            pass
+
+    def match(self, rel_path: str, is_dir: bool = False) -> bool:
+        if not self._patterns:
+            return False
+        if self._spec is None:
+            # Imported on first use: projects without ignore rules never need it
+            import pathspec
+            self._spec = pathspec.PathSpec.from_lines('gitwildmatch', self._patterns)
+        return self._spec.match_file(rel_path + '/' if is_dir else rel_path)
+
+
+@dataclass
+class WalkStats:
+    files: int = 0
+    entries_visited: int = 0
+    dirs_pruned: int = 0
+    ignore_files: int = 0
+    elapsed_ms: float = 0.0
+
+
+def root_matcher(root: str) -> IgnoreMatcher:
+    """Matcher preloaded with the project-wide rules (.git/info/exclude, then .gitignore)"""
+    matcher = IgnoreMatcher()
+    matcher.add_file(os.path.join(root, '.git', 'info', 'exclude'))
+    return matcher
+
+
+def is_ignored(root: str, path: str, skip_files: Set[str] = DEPENDENCY_FILES, is_dir: bool = False) -> bool:
+    """
+    True if walk(root) would not yield path (or, with is_dir, not enter it).
+    Only the ignore files on the way from root to the path are read, so single
+    paths (e.g. reported by a file watcher) can be checked without walking the tree.
+    """
+    rel_path = os.path.relpath(path, root)
+    if rel_path.startswith('..'):
+        return True
+    if rel_path == '.':
+        return not is_dir
+
+    parts = rel_path.split(os.sep)
+    if not is_dir and parts[-1] in skip_files:
+        return True
+    matcher = root_matcher(root)
+    abs_dir, rel_dir = root, ''
+    for part in (parts if is_dir else parts[:-1]):
+        matcher.add_file(os.path.join(abs_dir, '.gitignore'), rel_dir)
+        rel_dir = f'{rel_dir}/{part}' if rel_dir else part
+        abs_dir = os.path.join(abs_dir, part)
+        if is_pruned_dir(part) or matcher.match(rel_dir, is_dir=True):
+            return True
+    if is_dir:
+        return False
+    matcher.add_file(os.path.join(abs_dir, '.gitignore'), rel_dir)
+    return matcher.match('/'.join(parts))
+
+
+def walk(root: str, skip_files: Set[str] = DEPENDENCY_FILES,
+         stats: Optional[WalkStats] = None,
+         on_dir: Optional[Callable[[str], None]] = None,
+         tracked: Optional[Set[str]] = None) -> Iterator[str]:
+    """
+    Yield paths of all non-ignored files under root.
+
+    Ignored directories are pruned before they are opened, so nothing below
+    node_modules, .venv, target etc. is ever stat-ed. on_dir, if given, is
+    called with every directory that is entered (root included). Files in
+    tracked (paths relative to root, e.g. from the git index) are yielded
+    without matching them against the ignore rules, as git does, and ignored
+    directories holding any of them are still entered.
+    """
+    stats = stats if stats is not None else WalkStats()
+    started = time.perf_counter()
+    matcher = root_matcher(root)
+    stack = [(root, '')]
+
+    tracked_dirs = set()
+    for rel_path in tracked or ():
+        parent = rel_path.rpartition('/')[0]
+        while parent and parent not in tracked_dirs:
+            tracked_dirs.add(parent)
+            parent = parent.rpartition('/')[0]
+
+    while stack:
+        abs_dir, rel_dir = stack.pop()
+        try:
+            with os.scandir(abs_dir) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        if on_dir is not None:
+            on_dir(abs_dir)
+
+        # Rules of this directory's .gitignore apply to everything below it
+        for entry in entries:
+            if entry.name == '.gitignore' and entry.is_file():
+                matcher.add_file(entry.path, rel_dir)
+                stats.ignore_files += 1
+                break
+
+        subdirs = []
+        for entry in entries:
+            stats.entries_visited += 1
+            rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if is_pruned_dir(entry.name) or (
+                            rel_path not in tracked_dirs and matcher.match(rel_path, is_dir=True)):
+                        stats.dirs_pruned += 1
+                    else:
+                        subdirs.append((entry.path, rel_path))
+                elif entry.is_file():
+                    if entry.name in skip_files:
+                        continue
+                    if (tracked is not None and rel_path in tracked) or not matcher.match(rel_path):
+                        stats.files += 1
+                        yield entry.path
+            except OSError:
+                continue
+
+        # Reverse so directories are visited in sorted order
+        stack.extend(reversed(subdirs))
+
+    stats.elapsed_ms = (time.perf_counter() - started) * 1000
@@ -0,0 +1,279 @@
+"""
+Filesystem watch mode (sanches.py --watch)
+
+Subscribes to inotify on Linux (through ctypes, no extra dependency) and falls
+back to polling file stats elsewhere or when inotify is unavailable. Only
+directories the walker would enter are watched, so node_modules, .venv and
+.gitignore'd trees cost nothing. Bursts of saves are coalesced with a debounce
+window and only the dirty files are re-analysed; a quiet project costs no
+CPU and makes no API calls.
+"""
+import os
+import select
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+from dependency_cache import ECOSYSTEM_INPUTS
+from walker import is_ignored, is_pruned_dir, walk
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+DEFAULT_DEBOUNCE = 0.3
+DEFAULT_MAX_DELAY = 5.0
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Changes to these files invalidate the dependency audit
+DEPENDENCY_INPUTS = frozenset(name for names in ECOSYSTEM_INPUTS.values() for name in names)
+
+
+class InotifyWatcher:
+    """Watches every non-ignored directory under root with one inotify descriptor"""
+
+    backend = 'inotify'
+
+    def __init__(self, root: str):
+        # Imported here, so one-shot scans that never watch don't pay for it
+        import ctypes.util
+        self.root = root
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name or not hasattr(os, 'O_NONBLOCK'):
+            raise OSError('inotify is not available')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._get_errno = ctypes.get_errno
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError('inotify is not available')
+
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(self._get_errno(), 'inotify_init1 failed')
+        self._dirs: Dict[int, str] = {}
+        try:
+            for _ in walk(root, skip_files=frozenset(), on_dir=self._add_watch):
+                pass
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = self._get_errno()
+            # ENOENT: the directory vanished in the meantime, nothing to watch
+            if errno != 2:
+                raise OSError(errno, f'inotify_add_watch failed for {directory}')
+            return
+        self._dirs[wd] = directory
+
+    def _add_tree(self, directory: str, changed: Set[str]) -> None:
+        """Watch a directory created after startup and report the files already in it"""
+        if is_ignored(self.root, directory, is_dir=True):
+            return
+        try:
+            for path in walk(directory, skip_files=frozenset(), on_dir=self._add_watch):
+                changed.add(path)
+        except OSError:
+            pass
+
+    def read(self, timeout: Optional[float]) -> Optional[Set[str]]:
+        """
+        Wait up to timeout seconds for changes. Returns the changed paths
+        (empty on timeout), or None when events were lost and everything
+        must be rescanned.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed: Set[str] = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                directory = self._dirs.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self._dirs[wd]
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    changed.add(directory)
+                    continue
+
+                path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    if is_pruned_dir(name):
+                        continue
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._add_tree(path, changed)
+                    else:
+                        # A directory moved or deleted away takes its files with it
+                        changed.add(path)
+                else:
+                    changed.add(path)
+        return None if overflow else changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """Fallback that compares file stats every interval seconds"""
+
+    backend = 'polling'
+
+    def __init__(self, root: str, interval: float = DEFAULT_POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self._stats = self._snapshot()
+        self._next_poll = time.monotonic() + interval
+
+    def _snapshot(self) -> Dict[str, tuple]:
+        snapshot = {}
+        for path in walk(self.root, skip_files=frozenset()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def read(self, timeout: Optional[float]) -> Optional[Set[str]]:
+        wait = self._next_poll - time.monotonic()
+        if timeout is not None and wait > timeout:
+            time.sleep(max(timeout, 0))
+            return set()
+        time.sleep(max(wait, 0))
+        self._next_poll = time.monotonic() + self.interval
+
+        current = self._snapshot()
+        changed = {p for p, st in current.items() if self._stats.get(p) != st}
+        changed.update(p for p in self._stats if p not in current)
+        self._stats = current
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(root: str, poll_interval: float = DEFAULT_POLL_INTERVAL):
+    """inotify where the platform offers it, stat polling otherwise"""
+    try:
+        return InotifyWatcher(root)
+    except (OSError, AttributeError):
+        return PollingWatcher(root, poll_interval)
+
+
+class ProjectWatch:
+    """
+    Keeps one project's report up to date: a full scan first, then a rescan
+    of only the dirty files after each debounced burst of changes. Every scan
+    reports its progress through on_event, ending with a summary.
+    """
+
+    def __init__(self, scanner: Any, root: str, on_event: Callable[[Dict[str, Any]], None],
+                 debounce: float = DEFAULT_DEBOUNCE, max_delay: float = DEFAULT_MAX_DELAY,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, lock: Optional[threading.Lock] = None):
+        self.scanner = scanner
+        self.root = root
+        self.on_event = on_event
+        self.debounce = debounce  # Quiet period that ends a burst of changes
+        self.max_delay = max_delay  # Rescan at the latest this long after the first change of a burst
+        self.poll_interval = poll_interval
+        self.lock = lock or threading.Lock()  # Held during each scan; shared with other scans of the project
+        self.stop_event = threading.Event()
+
+    def _collect(self, watcher) -> Optional[Set[str]]:
+        """Block until a burst of changes is over; None means rescan everything"""
+        changed: Optional[Set[str]] = set()
+        while not changed and not self.stop_event.is_set():
+            # Wake up regularly so stop() is noticed
+            changed = watcher.read(1.0)
+        if self.stop_event.is_set():
+            return set()
+
+        deadline = time.monotonic() + self.max_delay
+        while changed is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            more = watcher.read(min(self.debounce, remaining))
+            if more is None:
+                return None
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def run(self) -> None:
+        # Subscribe before the first scan so no change made during it is lost
+        watcher = open_watcher(self.root, self.poll_interval)
+        try:
+            self.on_event({'event': 'watch', 'status': 'started', 'backend': watcher.backend})
+            with self.lock:
+                result = self.scanner.scan(self.root, on_event=self.on_event)
+
+            while not self.stop_event.is_set():
+                changed = self._collect(watcher)
+                if self.stop_event.is_set():
+                    break
+
+                if changed is not None:
+                    changed = {p for p in changed
+                               if os.path.basename(p) in DEPENDENCY_INPUTS
+                               or os.path.basename(p) == '.gitignore'
+                               or not is_ignored(self.root, p)}
+                    if not changed:
+                        continue
+
+                self.on_event({'event': 'changes', 'files': sorted(changed) if changed is not None else None})
+                names = {os.path.basename(p) for p in changed} if changed is not None else None
+                # Ignore rules changed or events were lost: fall back to a full walk
+                full_walk = names is None or '.gitignore' in names
+                audit_dependencies = names is None or bool(names & DEPENDENCY_INPUTS)
+                with self.lock:
+                    result = self.scanner.scan(
+                        self.root,
+                        on_event=self.on_event,
+                        changed=None if full_walk else changed,
+                        dependencies=None if audit_dependencies else result.get('dependencies', []),
+                    )
+        finally:
+            watcher.close()
+            self.on_event({'event': 'watch', 'status': 'stopped'})
+
+    def stop(self) -> None:
+        self.stop_event.set()
@@ -2,10 +2,8 @@ import * as path from 'node:path';
 import { app, BrowserWindow, ipcMain, Menu, Notification, nativeImage, Tray } from 'electron';
 import Store from 'electron-store';
 import { type WebSocket, WebSocketServer } from 'ws';
-import { exec } from 'node:child_process';
-import { promisify } from 'node:util';
-
-const execAsync = promisify(exec);
+import { type ChildProcessWithoutNullStreams, spawn } from 'node:child_process';
+import * as readline from 'node:readline';
 
 // Define store type
 interface Project {
@@ -37,6 +35,27 @@ let wss: WebSocketServer | null = null;
 let isQuitting = false;
 let scanInterval: NodeJS.Timeout | null = null;
 
+// Resident Sanches scanner (sanches.py --serve) and its in-flight JSON-RPC requests
+interface PendingRequest {
+	resolve: (value: any) => void;
+	reject: (reason: Error) => void;
+	onEvent?: (event: any) => void;
+}
+
+let scannerDaemon: ChildProcessWithoutNullStreams | null = null;
+let scannerRequestId = 0;
+const pendingScannerRequests = new Map<number, PendingRequest>();
+
+// Partial results of the running scan are pushed to the UI at most this often
+const PARTIAL_RESULT_INTERVAL = 250;
+// One pending push per source, so a watch rescan and a requested scan don't swallow each other's updates
+type PartialResultSource = 'scan' | 'watch';
+const partialResultTimers = new Map<PartialResultSource, NodeJS.Timeout>();
+
+// Project the resident scanner is watching (it rescans changed files and pushes results)
+let watchedProjectPath: string | null = null;
+let watchPartialResult: any = null;
+
 // Create the main application window
 function createWindow(): void {
 	// Set app icon
@@ -376,16 +395,19 @@ ipcMain.handle('delete-project', async (_event, projectId: string) => {
 	
 	if (wasActiveProject) {
 		if (filtered.length > 0) {
-			// Set first project as active and run a scan for it
+			// Set first project as active; watching it scans it, otherwise scan it once
 			(store as any).set('activeProjectId', filtered[0].id);
-			const result = await runSanchesScan();
-			if (result) {
-				mainWindow?.webContents.send('scan-result', result);
+			if (!(await watchActiveProject())) {
+				const result = await runSanchesScan();
+				if (result) {
+					mainWindow?.webContents.send('scan-result', result);
+				}
 			}
 		} else {
 			// No projects left, clear active project and send empty scan result
 			(store as any).delete('activeProjectId');
 			mainWindow?.webContents.send('scan-result', null);
+			await watchActiveProject();
 		}
 	}
 	
@@ -395,10 +417,12 @@ ipcMain.handle('delete-project', async (_event, projectId: string) => {
 ipcMain.handle('set-active-project', async (_event, projectId: string) => {
 	(store as any).set('activeProjectId', projectId);
 	
-	// Run a scan immediately after switching projects
-	const result = await runSanchesScan();
-	if (result) {
-		mainWindow?.webContents.send('scan-result', result);
+	// Starting the watch scans the new project right away; without a watch, scan it once
+	if (!(await watchActiveProject())) {
+		const result = await runSanchesScan();
+		if (result) {
+			mainWindow?.webContents.send('scan-result', result);
+		}
 	}
 	
 	return { success: true };
@@ -418,6 +442,7 @@ ipcMain.handle('set-global-watch', async (_event, enabled: boolean) => {
 			clearInterval(scanInterval);
 			scanInterval = null;
 		}
+		await watchActiveProject();
 	}
 	
 	return { success: true };
@@ -430,6 +455,7 @@ ipcMain.handle('toggle-project-watch', async (_event, projectId: string, enabled
 	if (project) {
 		project.watchEnabled = enabled;
 		(store as any).set('projects', projects);
+		await watchActiveProject();
 	}
 	
 	return { success: true };
@@ -467,6 +493,7 @@ ipcMain.handle('delete-api-key', async () => {
 		clearInterval(scanInterval);
 		scanInterval = null;
 	}
+	await watchActiveProject();
 	
 	// Clear scan results in UI
 	mainWindow?.webContents.send('scan-result', null);
@@ -494,6 +521,127 @@ function getPythonPaths(): { pythonExecutable: string; sanchesScript: string } {
 	};
 }
 
+// Start the resident scanner if it isn't running yet
+function getScannerDaemon(): ChildProcessWithoutNullStreams {
+	if (scannerDaemon) {
+		return scannerDaemon;
+	}
+
+	const { pythonExecutable, sanchesScript } = getPythonPaths();
+	console.log('Starting Sanches scanner daemon:', sanchesScript);
+	const daemon = spawn(pythonExecutable, [sanchesScript, '--serve']);
+	scannerDaemon = daemon;
+
+	// Each stdout line is one JSON-RPC response or a scan progress notification
+	const lines = readline.createInterface({ input: daemon.stdout });
+	lines.on('line', (line) => {
+		let message: any;
+		try {
+			message = JSON.parse(line);
+		} catch (error) {
+			console.error('Invalid response from Sanches daemon:', line);
+			return;
+		}
+
+		if (message.method === 'scan.event') {
+			pendingScannerRequests.get(message.params?.id)?.onEvent?.(message.params);
+			return;
+		}
+		if (message.method === 'watch.event') {
+			handleWatchEvent(message.params);
+			return;
+		}
+
+		const pending = pendingScannerRequests.get(message.id);
+		if (!pending) {
+			return;
+		}
+		pendingScannerRequests.delete(message.id);
+
+		if (message.error) {
+			pending.reject(new Error(message.error.message));
+		} else {
+			pending.resolve(message.result);
+		}
+	});
+
+	daemon.stderr.on('data', (data: Buffer) => {
+		console.error('Sanches daemon:', data.toString());
+	});
+
+	// Fail everything in flight if the daemon goes away; the next scan restarts it
+	const handleDaemonGone = (reason: string) => {
+		if (scannerDaemon === daemon) {
+			scannerDaemon = null;
+			watchedProjectPath = null;
+		}
+		for (const pending of pendingScannerRequests.values()) {
+			pending.reject(new Error(reason));
+		}
+		pendingScannerRequests.clear();
+	};
+
+	daemon.on('exit', (code) => {
+		console.log(`Sanches scanner daemon exited with code ${code}`);
+		handleDaemonGone('Sanches scanner daemon exited');
+	});
+
+	daemon.on('error', (error) => {
+		console.error('Failed to start Sanches scanner daemon:', error);
+		handleDaemonGone(error.message);
+	});
+
+	daemon.stdin.on('error', (error) => {
+		console.error('Sanches daemon stdin error:', error);
+	});
+
+	return daemon;
+}
+
+// Send a JSON-RPC request to the resident scanner
+function callScannerDaemon(
+	method: string,
+	params: Record<string, unknown>,
+	onEvent?: (event: any) => void,
+): Promise<any> {
+	const daemon = getScannerDaemon();
+	const id = ++scannerRequestId;
+
+	return new Promise((resolve, reject) => {
+		pendingScannerRequests.set(id, { resolve, reject, onEvent });
+		daemon.stdin.write(`${JSON.stringify({ jsonrpc: '2.0', id, method, params })}\n`);
+	});
+}
+
+// Stop the resident scanner
+function stopScannerDaemon(): void {
+	if (!scannerDaemon) {
+		return;
+	}
+	scannerDaemon.stdin.write(`${JSON.stringify({ jsonrpc: '2.0', id: ++scannerRequestId, method: 'shutdown' })}\n`);
+	scannerDaemon.stdin.end();
+	scannerDaemon = null;
+}
+
+// Push the findings gathered so far to the UI, coalescing bursts of events
+function publishPartialResult(source: PartialResultSource, partial: any): void {
+	if (partialResultTimers.has(source)) {
+		return;
+	}
+	partialResultTimers.set(source, setTimeout(() => {
+		partialResultTimers.delete(source);
+		mainWindow?.webContents.send('scan-result', { ...partial });
+	}, PARTIAL_RESULT_INTERVAL));
+}
+
+function cancelPartialResult(source: PartialResultSource): void {
+	const timer = partialResultTimers.get(source);
+	if (timer) {
+		clearTimeout(timer);
+		partialResultTimers.delete(source);
+	}
+}
+
 // Run Sanches CLI and get security scan results
 async function runSanchesScan(): Promise<any> {
 	try {
@@ -518,27 +666,144 @@ async function runSanchesScan(): Promise<any> {
 			return null;
 		}
 		
-		const { pythonExecutable, sanchesScript } = getPythonPaths();
 		const projectPath = activeProject?.path || process.cwd();
 		
-		// Execute Sanches CLI with --dir and --api flags using venv Python
-		const command = `"${pythonExecutable}" "${sanchesScript}" --dir "${projectPath}" --api-key "${apiKey}"`;
-		
-		console.log('Running command:', command);
-		const { stdout, stderr } = await execAsync(command);
-		
-		if (stderr) {
-			console.error('Sanches CLI error:', stderr);
-		}
-		
-		const result = JSON.parse(stdout);
+		// Findings and vulnerable dependencies are shown as they arrive, before the scan completes
+		const partial = { directory: projectPath, critical: [] as any[], warning: [] as any[], dependencies: [] as any[], inProgress: true };
+		const onEvent = (event: any) => {
+			if (event.event === 'finding' && (event.severity === 'critical' || event.severity === 'warning')) {
+				partial[event.severity as 'critical' | 'warning'].push(event.finding);
+				if (event.severity === 'critical' && partial.critical.length === 1) {
+					updateTrayIcon(true);
+				}
+			} else if (event.event === 'dependency') {
+				partial.dependencies.push(event.dependency);
+			} else {
+				return;
+			}
+			publishPartialResult('scan', partial);
+		};
+
+		// Ask the resident scanner to scan the project (API key travels over stdin, not argv)
+		console.log('Requesting scan for:', projectPath);
+		const result = await callScannerDaemon('scan', { dir: projectPath, api_key: apiKey, stream: true }, onEvent);
+		cancelPartialResult('scan');
 		return result;
 	} catch (error) {
+		cancelPartialResult('scan');
 		console.error('Failed to run Sanches scan:', error);
 		return null;
 	}
 }
 
+// Update the window, tray icon and notifications with a finished scan
+function applyScanResult(result: any): void {
+	mainWindow?.webContents.send('scan-result', result);
+
+	const criticalCount = result.critical?.length || 0;
+	const highCount = result.high?.length || 0;
+	const mediumCount = result.medium?.length || 0;
+	const hasIssues = criticalCount > 0 || highCount > 0 || mediumCount > 0;
+
+	// Update tray icon to show notification state
+	updateTrayIcon(hasIssues);
+
+	// With the findings store the scan reports what changed since the last one: only new issues notify
+	if (result.delta) {
+		const newCritical = result.delta.new.filter((entry: any) => entry.severity === 'critical').length;
+		if (newCritical > 0) {
+			sendNotification(
+				'🚨 New Critical Security Issues Detected',
+				`Found ${newCritical} new critical security ${newCritical === 1 ? 'issue' : 'issues'} in your files!`,
+			);
+		}
+		return;
+	}
+
+	// Send notification if critical issues found
+	if (criticalCount > 0) {
+		sendNotification(
+			'🚨 Critical Security Issues Detected',
+			`Found ${criticalCount} critical security ${criticalCount === 1 ? 'issue' : 'issues'} in your files!`,
+		);
+	}
+}
+
+// Events of the watched project: each rescan streams its findings, then a summary
+function handleWatchEvent(event: any): void {
+	if (!event || event.dir !== watchedProjectPath) {
+		return;
+	}
+
+	switch (event.event) {
+		case 'watch':
+			if (event.status === 'stopped') {
+				watchedProjectPath = null;
+				return;
+			}
+			watchPartialResult = { directory: event.dir, critical: [], warning: [], dependencies: [], inProgress: true };
+			return;
+		case 'changes':
+			// A rescan starts: findings of unchanged files are re-sent right away
+			watchPartialResult = { directory: event.dir, critical: [], warning: [], dependencies: [], inProgress: true };
+			return;
+		case 'finding':
+			if (watchPartialResult && (event.severity === 'critical' || event.severity === 'warning')) {
+				watchPartialResult[event.severity].push(event.finding);
+				publishPartialResult('watch', watchPartialResult);
+			}
+			return;
+		case 'dependency':
+			if (watchPartialResult) {
+				watchPartialResult.dependencies.push(event.dependency);
+				publishPartialResult('watch', watchPartialResult);
+			}
+			return;
+		case 'summary':
+			cancelPartialResult('watch');
+			watchPartialResult = null;
+			applyScanResult(event.result);
+			return;
+		case 'error':
+			console.error('Sanches watch error:', event.message);
+			return;
+	}
+}
+
+// Point the resident scanner's file watcher at the active project (or stop watching).
+// Resolves to whether the active project is watched: a watch scans the project
+// when it starts and reports through watch events, so no separate scan is needed.
+async function watchActiveProject(): Promise<boolean> {
+	const apiKey = (store as any).get('geminiApiKey') as string | undefined;
+	const globalWatchEnabled = (store as any).get('globalWatchEnabled', true) as boolean;
+	const activeProjectId = (store as any).get('activeProjectId') as string;
+	const projects = ((store as any).get('projects', []) as Project[]);
+	const activeProject = projects.find(p => p.id === activeProjectId);
+
+	const target = apiKey && globalWatchEnabled && activeProject?.watchEnabled ? activeProject.path : null;
+	if (target === watchedProjectPath) {
+		return target !== null;
+	}
+
+	try {
+		if (watchedProjectPath) {
+			const previous = watchedProjectPath;
+			watchedProjectPath = null;
+			await callScannerDaemon('unwatch', { dir: previous });
+		}
+		if (target) {
+			watchedProjectPath = target;
+			console.log('Watching project:', target);
+			await callScannerDaemon('watch', { dir: target, api_key: apiKey });
+		}
+		return target !== null;
+	} catch (error) {
+		console.error('Failed to update Sanches watch:', error);
+		watchedProjectPath = null;
+		return false;
+	}
+}
+
 // Start periodic security scans
 function startSecurityScans(): void {
 	// Clear existing interval if any
@@ -552,44 +817,15 @@ function startSecurityScans(): void {
 		return;
 	}
 	
-	// Run initial scan
-	runSanchesScan().then((result) => {
-		if (result) {
-			mainWindow?.webContents.send('scan-result', result);
-			
-			// Update tray icon based on initial scan results
-			const criticalCount = result.critical?.length || 0;
-			const highCount = result.high?.length || 0;
-			const mediumCount = result.medium?.length || 0;
-			const hasIssues = criticalCount > 0 || highCount > 0 || mediumCount > 0;
-			updateTrayIcon(hasIssues);
-		}
-	});
+	// The watch runs an initial scan, then rescans only files that change
+	watchActiveProject();
 
-	// Run scan every 1 minute
-	scanInterval = setInterval(async () => {
-		const result = await runSanchesScan();
-		if (result) {
-			mainWindow?.webContents.send('scan-result', result);
-			
-			// Check if there are any issues
-			const criticalCount = result.critical?.length || 0;
-			const highCount = result.high?.length || 0;
-			const mediumCount = result.medium?.length || 0;
-			const hasIssues = criticalCount > 0 || highCount > 0 || mediumCount > 0;
-			
-			// Update tray icon to show notification state
-			updateTrayIcon(hasIssues);
-			
-			// Send notification if critical issues found
-			if (criticalCount > 0) {
-				sendNotification(
-					'🚨 Critical Security Issues Detected',
-					`Found ${criticalCount} critical security ${criticalCount === 1 ? 'issue' : 'issues'} in your files!`,
-				);
-			}
+	// No more periodic rescans: just re-subscribe if the watch (or the daemon) went away
+	scanInterval = setInterval(() => {
+		if (!watchedProjectPath) {
+			watchActiveProject();
 		}
-	}, 120000); // 60000ms = 1 minute
+	}, 120000);
 }
 
 // Schedule periodic notifications (demo)
@@ -658,6 +894,7 @@ app.on('before-quit', () => {
 	if (scanInterval) {
 		clearInterval(scanInterval);
 	}
+	stopScannerDaemon();
 });
 
 // Handle uncaught exceptions
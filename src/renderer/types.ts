@@ -10,6 +10,7 @@ export interface ScanResult {
 	critical: SecurityIssue[];
 	warning: SecurityIssue[];
 	dependencies: DependencyIssue[];
+	inProgress?: boolean; // Partial result pushed while the scan is still running
 }
 
 export interface SecurityIssue {
@@ -22,6 +23,7 @@ export interface DependencyIssue {
 	package_type: string;
 	package: string;
 	description: string;
+	manifests?: string[];
 }
 
 export type IssueType = 'critical' | 'warning' | 'dependencies';
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The CLI modules import each other as top-level modules, as when run from cli/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('cli', 'benchmarks'):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
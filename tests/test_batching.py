@@ -0,0 +1,25 @@
+from batching import merge_reports
+
+
+def finding(description, line=None, file_path='/proj/app.py'):
+    found = {'file_name': 'app.py', 'file_path': file_path, 'description': description}
+    if line is not None:
+        found['line'] = line
+    return found
+
+
+def test_merge_reports_drops_duplicates_but_keeps_findings_on_other_lines():
+    merged = merge_reports([
+        {'directory': '/proj', 'critical': [finding('Hardcoded AWS access key ID', 3)], 'warning': []},
+        {'directory': '/other', 'critical': [
+            finding('Hardcoded  AWS access key id', 3),  # the same finding, spelled differently
+            finding('Hardcoded AWS access key ID', 9),
+            finding('Hardcoded AWS access key ID', 3, file_path='/proj/config.py'),
+        ], 'warning': [finding('SQL injection'), finding('sql injection')]},
+    ])
+
+    assert merged['directory'] == '/proj'
+    assert [(f['file_path'], f['line']) for f in merged['critical']] == [
+        ('/proj/app.py', 3), ('/proj/app.py', 9), ('/proj/config.py', 3)]
+    assert merged['warning'] == [finding('SQL injection')]
+    assert merged['suggestion'] == []
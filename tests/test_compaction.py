@@ -0,0 +1,28 @@
+from batching import estimate_tokens
+from compaction import MAX_DATA_LINES, CompactionOptions, compact, compact_text
+
+
+def numbered(count):
+    return '\n'.join(f'"key{i}": {i},' for i in range(count))
+
+
+def test_hand_written_data_is_sent_whole():
+    text = numbered(MAX_DATA_LINES * 2)
+    assert compact_text('config/settings.json', text, CompactionOptions()) == text
+
+
+def test_generated_data_is_truncated():
+    text = numbered(MAX_DATA_LINES * 2)
+    for path in ('package-lock.json', 'tests/fixtures/users.json', 'web/pnpm-lock.yaml'):
+        compacted = compact_text(path, text, CompactionOptions())
+        assert compacted.endswith(f'[... {MAX_DATA_LINES} more lines of data truncated ...]'), path
+    marked = '// @generated by protoc\n' + text
+    assert 'truncated' in compact_text('api/schema.json', marked, CompactionOptions())
+
+
+def test_token_counts_are_summed_per_file():
+    files = {'a.py': 'print(1)\n' * 10, 'b.py': 'print(1)\n' * 10, 'c.py': 'x = 2\n'}
+    compacted = compact(files)
+    assert compacted.aliases == {'b.py': 'a.py'}
+    assert compacted.tokens_before == sum(estimate_tokens(p) + estimate_tokens(t) for p, t in files.items())
+    assert 0 < compacted.tokens_after < compacted.tokens_before
@@ -0,0 +1,74 @@
+from fakes import FakeCaches, FakeGeminiClient
+from context_cache import FAILURE_PAUSE, ContextCache, GenaiContextBackend
+from sanches import ANALYSIS_INSTRUCTIONS, MODEL, Sanches
+
+FILES = {'app.py': 'import os\npassword = os.environ["PASSWORD"]\n'}
+
+
+class CountingBackend(GenaiContextBackend):
+    def __init__(self, get_caches):
+        super().__init__(get_caches)
+        self.creates = 0
+
+    def create(self, model, instructions, ttl):
+        self.creates += 1
+        return super().create(model, instructions, ttl)
+
+
+def make_scanner(tmp_path, monkeypatch):
+    monkeypatch.setenv('SANCHES_CACHE_DIR', str(tmp_path))
+    fake = FakeGeminiClient()
+    backend = CountingBackend(lambda: fake.caches)
+    scanner = Sanches(api_key='x', context_cache_ttl=3600, context_backend=backend)
+    scanner.client = fake
+    return scanner, fake, backend
+
+
+def test_cached_instructions_are_used(tmp_path, monkeypatch):
+    scanner, fake, backend = make_scanner(tmp_path, monkeypatch)
+    scanner._generate(FILES)
+    scanner._generate(FILES)
+    assert backend.creates == 1
+    assert fake.stats['requests'] == 2
+    assert fake.stats['cached_tokens'] > 0
+
+
+def test_stale_entry_falls_back_once_and_pauses_creation(tmp_path, monkeypatch):
+    scanner, fake, backend = make_scanner(tmp_path, monkeypatch)
+    scanner._generate(FILES)
+    name = scanner.context_cache.get(MODEL, ANALYSIS_INSTRUCTIONS)
+    # The API dropped the entry before its expiry
+    with FakeCaches._lock:
+        del FakeCaches._entries[name]
+
+    text = scanner._generate(FILES)
+
+    assert text
+    # One request with the gone entry (a 404, not retried), then one uncached
+    assert fake.stats['requests'] == 3
+    assert scanner.gemini.stats['retries'] == 0
+    assert scanner.context_cache.stats['invalidated'] == 1
+    key = scanner.context_cache._key(MODEL, ANALYSIS_INSTRUCTIONS)
+    assert key not in scanner.context_cache._load()
+    assert key not in ContextCache(backend, path=scanner.context_cache.path)._load()
+
+    # Within the pause, later batches go uncached without trying to create another entry
+    cached_before = fake.stats['cached_tokens']
+    scanner._generate(FILES)
+    assert backend.creates == 1
+    assert fake.stats['requests'] == 4
+    assert fake.stats['cached_tokens'] == cached_before
+    assert scanner.context_cache._failed_until[key] > 0
+
+
+def test_creation_resumes_after_the_pause(tmp_path, monkeypatch):
+    scanner, fake, backend = make_scanner(tmp_path, monkeypatch)
+    cache = scanner.context_cache
+    name = cache.get(MODEL, ANALYSIS_INSTRUCTIONS)
+    cache.invalidate(name)
+    assert cache.get(MODEL, ANALYSIS_INSTRUCTIONS) is None
+
+    key = cache._key(MODEL, ANALYSIS_INSTRUCTIONS)
+    cache._failed_until[key] -= FAILURE_PAUSE
+    assert cache.get(MODEL, ANALYSIS_INSTRUCTIONS) is not None
+    assert backend.creates == 2
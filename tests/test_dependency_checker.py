@@ -0,0 +1,106 @@
+from dependency_cache import DependencyCache
+from dependency_checker import MAX_LIVE_LOCKFILE_PACKAGES, DependencyChecker
+from metrics import Metrics
+
+
+def cve(cve_id, description):
+    return {'vulnerabilities': [{'cve': {
+        'id': cve_id,
+        'descriptions': [{'lang': 'en', 'value': description}],
+        'configurations': [],
+    }}]}
+
+
+class FlakyNVD:
+    """search_many stand-in: keywords in failing get None, as NVDClient returns after its retries"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'shared': 0}
+        self.searched = []
+
+    def search_many(self, keywords):
+        keywords = list(keywords)
+        self.searched.extend(keywords)
+        return {k: None if k in self.failing else cve('CVE-2024-0001', f'{k} is vulnerable') for k in keywords}
+
+
+def make_project(tmp_path):
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'requirements.txt').write_text('requests==2.0.0\nflask==1.0\n')
+    return project
+
+
+def test_failed_lookup_marks_audit_incomplete_and_is_not_cached(tmp_path):
+    project = make_project(tmp_path)
+    nvd = FlakyNVD(failing={'python flask'})
+    checker = DependencyChecker(cache=DependencyCache(tmp_path / 'cache'), nvd=nvd, audit_tools=False)
+    metrics = Metrics()
+
+    vulnerabilities = checker.scan_directory(str(project), metrics=metrics)
+
+    # What could be looked up is still reported
+    assert {v['package'] for v in vulnerabilities} == {'requests'}
+    assert metrics.counters['dependencies.incomplete'] == 1
+    assert metrics.counters['errors'] == 1
+
+    # Nothing was cached, so the next scan asks NVD again
+    nvd.failing.clear()
+    nvd.searched.clear()
+    metrics = Metrics()
+    vulnerabilities = checker.scan_directory(str(project), metrics=metrics)
+    assert sorted(nvd.searched) == ['python flask', 'python requests']
+    assert {v['package'] for v in vulnerabilities} == {'requests', 'flask'}
+    assert 'dependencies.incomplete' not in metrics.counters
+
+
+def test_complete_audit_is_cached(tmp_path):
+    project = make_project(tmp_path)
+    nvd = FlakyNVD()
+    checker = DependencyChecker(cache=DependencyCache(tmp_path / 'cache'), nvd=nvd, audit_tools=False)
+    checker.scan_directory(str(project))
+    nvd.searched.clear()
+
+    metrics = Metrics()
+    assert len(checker.scan_directory(str(project), metrics=metrics)) == 2
+    assert nvd.searched == []
+    assert 'dependencies.incomplete' not in metrics.counters
+
+
+def test_lockfile_without_direct_dependencies_is_not_looked_up_whole(tmp_path):
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'requirements.txt').write_text('flask>=1.0\n')
+    packages = [('flask', '2.0.1')] + [(f'transitive-{i}', '1.0.0') for i in range(MAX_LIVE_LOCKFILE_PACKAGES + 10)]
+    (project / 'poetry.lock').write_text(''.join(
+        f'[[package]]\nname = "{name}"\nversion = "{version}"\n\n' for name, version in packages))
+    checker = DependencyChecker(nvd=FlakyNVD(), audit_tools=False)
+    graphs = {}
+    metrics = Metrics()
+
+    # The requirements file is pinned to the lockfile instead of pulling in everything it resolved
+    assert checker._manifest_packages(project, project / 'requirements.txt', 'pip', graphs, metrics) == (
+        [('flask', '2.0.1')], [])
+    # The bare lockfile is looked up only up to the cap; the rest is reported as unaudited
+    looked_up, left_out = checker._manifest_packages(project, project / 'poetry.lock', 'pip', graphs, metrics)
+    assert len(looked_up) == MAX_LIVE_LOCKFILE_PACKAGES
+    assert len(left_out) == 11
+    assert metrics.counters['dependencies.pip.unaudited'] == 11
+
+
+def test_truncated_lockfile_audit_is_incomplete_and_not_cached(tmp_path):
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'poetry.lock').write_text(''.join(
+        f'[[package]]\nname = "package-{i}"\nversion = "1.0.0"\n\n' for i in range(MAX_LIVE_LOCKFILE_PACKAGES + 1)))
+    nvd = FlakyNVD()
+    checker = DependencyChecker(cache=DependencyCache(tmp_path / 'cache'), nvd=nvd, audit_tools=False)
+
+    metrics = Metrics()
+    checker.scan_directory(str(project), metrics=metrics)
+    assert metrics.counters['dependencies.incomplete'] == 1
+
+    nvd.searched.clear()
+    checker.scan_directory(str(project))
+    assert len(nvd.searched) == MAX_LIVE_LOCKFILE_PACKAGES
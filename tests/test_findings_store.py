@@ -0,0 +1,95 @@
+import pytest
+
+from findings_store import FindingsStore
+
+
+def finding(description, file_path='app.py'):
+    return {'file_name': file_path.rsplit('/', 1)[-1], 'file_path': file_path, 'description': description}
+
+
+def result(critical=(), warning=(), dependencies=()):
+    return {'critical': list(critical), 'warning': list(warning), 'dependencies': list(dependencies)}
+
+
+def descriptions(entries):
+    return sorted(entry['finding']['description'] for entry in entries)
+
+
+@pytest.fixture
+def store(tmp_path):
+    findings = FindingsStore(tmp_path / 'findings.sqlite3')
+    yield findings
+    findings.close()
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / 'project'
+    root.mkdir()
+    return str(root)
+
+
+def test_first_scan_reports_everything_as_new(store, project):
+    delta = store.record(project, result(critical=[finding('SQL injection on line 3')]))
+    assert descriptions(delta['new']) == ['SQL injection on line 3']
+    assert delta['resolved'] == [] and delta['unchanged'] == []
+
+
+def test_moved_finding_is_unchanged(store, project):
+    first = store.record(project, result(critical=[finding('SQL injection on line 3')]))
+    delta = store.record(project, result(critical=[finding('SQL injection on line 7')]))
+    assert delta['new'] == [] and delta['resolved'] == []
+    assert descriptions(delta['unchanged']) == ['SQL injection on line 7']
+    assert delta['unchanged'][0]['first_seen'] == first['new'][0]['first_seen']
+
+
+def test_removed_finding_is_resolved_and_new_when_it_returns(store, project):
+    store.record(project, result(warning=[finding('Debug mode on line 2')]))
+    delta = store.record(project, result())
+    assert descriptions(delta['resolved']) == ['Debug mode on line 2']
+    assert store.query(project) == []
+
+    delta = store.record(project, result(warning=[finding('Debug mode on line 2')]))
+    assert descriptions(delta['new']) == ['Debug mode on line 2']
+    assert len(store.query(project)) == 1
+
+
+def test_findings_differing_only_in_digits_are_kept_apart(store, project):
+    both = [finding('SQL injection on line 3'), finding('SQL injection on line 12')]
+    delta = store.record(project, result(critical=both))
+    assert len(delta['new']) == 2
+    assert len(store.query(project, severity='critical')) == 2
+
+    # Both move down; still the same two findings
+    moved = [finding('SQL injection on line 5'), finding('SQL injection on line 14')]
+    delta = store.record(project, result(critical=moved))
+    assert delta['new'] == [] and delta['resolved'] == []
+    assert len(delta['unchanged']) == 2
+
+    # One of them is fixed
+    delta = store.record(project, result(critical=moved[:1]))
+    assert len(delta['resolved']) == 1
+    assert len(delta['unchanged']) == 1
+
+
+def test_findings_of_unresolved_files_stay_open(store, project):
+    store.record(project, result(critical=[finding('Hardcoded key on line 1', 'src/keys.py'),
+                                           finding('Eval of input on line 4', 'src/run.py')]))
+    # The analysis of keys.py failed: its finding is not reported, but it isn't fixed either
+    delta = store.record(project, result(), unresolved_files=['src/keys.py'])
+    assert descriptions(delta['unchanged']) == ['Hardcoded key on line 1']
+    assert descriptions(delta['resolved']) == ['Eval of input on line 4']
+    assert descriptions(store.query(project)) == ['Hardcoded key on line 1']
+
+
+def test_dependency_findings_stay_open_when_the_audit_was_incomplete(store, project):
+    vulnerable = {'package_type': 'pip', 'package': 'flask', 'version': '1.0',
+                  'description': 'CVE-2023-30861: session cookie disclosure', 'manifests': ['requirements.txt']}
+    store.record(project, result(dependencies=[vulnerable]))
+
+    delta = store.record(project, result(), dependencies_complete=False)
+    assert delta['resolved'] == []
+    assert [entry['severity'] for entry in delta['unchanged']] == ['dependency']
+
+    delta = store.record(project, result())
+    assert [entry['finding']['package'] for entry in delta['resolved']] == ['flask']
@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from fakes import FakeAPIError, FakeGeminiClient
+from gemini_client import GeminiClient, RequestTimeout, RetryPolicy
+from sanches import Sanches
+
+REQUEST = {'model': 'test', 'contents': '=== FILE: app.py ===\nprint(1)\n'}
+
+
+class CountingModels:
+    """Wraps a fake's models and remembers the most calls that were ever running at once"""
+
+    def __init__(self, models):
+        self.models = models
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def _exit(self):
+        with self._lock:
+            self.active -= 1
+
+    def generate_content(self, **request):
+        self._enter()
+        try:
+            return self.models.generate_content(**request)
+        finally:
+            self._exit()
+
+    def generate_content_stream(self, **request):
+        self._enter()
+        try:
+            yield from self.models.generate_content_stream(**request)
+        finally:
+            self._exit()
+
+
+def policy(**overrides):
+    # No backoff sleeps: the fake's errors carry no Retry-After
+    return RetryPolicy(**{'request_timeout': 5.0, 'max_retries': 3, 'backoff_base': 0.0, **overrides})
+
+
+@pytest.mark.parametrize('failure, status', [('throttle_rate', 429), ('error_rate', 503)])
+def test_failures_are_retried_then_raised(failure, status):
+    fake = FakeGeminiClient(**{failure: 1.0})
+    client = GeminiClient(lambda: fake.models, concurrency=2, policy=policy())
+
+    with pytest.raises(FakeAPIError) as raised:
+        client.generate(REQUEST)
+
+    assert raised.value.code == status
+    assert fake.stats['requests'] == 4
+    assert client.stats['retries'] == 3
+    assert client.stats['failures'] == 1
+
+
+def test_throttling_halves_the_limit():
+    fake = FakeGeminiClient(throttle_rate=1.0)
+    client = GeminiClient(lambda: fake.models, concurrency=4, policy=policy(max_retries=0))
+    with pytest.raises(FakeAPIError):
+        client.generate(REQUEST)
+    assert client.snapshot()['concurrency_limit'] == 2
+
+
+def test_abandoned_attempt_keeps_its_slot_until_it_returns():
+    fake = FakeGeminiClient(stall_rate=1.0, stall=0.3)
+    models = CountingModels(fake.models)
+    client = GeminiClient(lambda: models, concurrency=1, policy=policy(request_timeout=0.1, max_retries=2))
+
+    with pytest.raises(RequestTimeout):
+        client.generate(REQUEST)
+
+    assert fake.stats['requests'] == 3
+    assert client.stats['timeouts'] == 3
+    # Each retry waited for the stalled call before it, rather than running next to it
+    assert models.peak == 1
+    time.sleep(0.5)
+    assert client.limit.in_flight == 0
+
+
+def test_concurrency_never_exceeds_the_limit_under_failures():
+    fake = FakeGeminiClient(latency=0.01, throttle_rate=0.2, error_rate=0.1, stall_rate=0.1, stall=0.2, seed=3)
+    models = CountingModels(fake.models)
+    client = GeminiClient(lambda: models, concurrency=3,
+                          policy=policy(request_timeout=0.1, max_retries=6, hedge=True, hedge_after=0.05))
+    errors = []
+
+    def run():
+        try:
+            client.generate(REQUEST, on_stream=lambda: (lambda text: None))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fake.stats['throttled'] and fake.stats['errors'] and fake.stats['stalled']
+    assert client.stats['retries'] > 0
+    assert models.peak <= 3
+    time.sleep(0.3)
+    assert client.limit.in_flight == 0
+
+
+class StallingStream:
+    """First stream reports one finding, then hangs past the deadline; later streams answer in full"""
+
+    def __init__(self, stall: float):
+        self.stall = stall
+        self.calls = 0
+        self.report = {'directory': '', 'critical': [
+            {'file_name': 'app.py', 'file_path': 'app.py', 'description': 'SQL injection on line 3'},
+            {'file_name': 'app.py', 'file_path': 'app.py', 'description': 'Hardcoded password on line 9'},
+            {'file_name': 'app.py', 'file_path': 'app.py', 'description': 'SQL injection on line 12'},
+        ], 'warning': [], 'suggestion': []}
+
+    def generate_content_stream(self, model, contents, config=None):
+        self.calls += 1
+        text = json.dumps(self.report)
+        if self.calls == 1:
+            # Cut right after the first finding, which the extractor reports on its own
+            cut = text.index('}') + 1
+            yield SimpleNamespace(text=text[:cut], usage_metadata=None)
+            time.sleep(self.stall)
+            return
+        yield SimpleNamespace(text=text, usage_metadata=None)
+
+
+def test_retry_after_partial_stream_reports_no_finding_twice():
+    models = StallingStream(stall=0.5)
+    scanner = Sanches(api_key='x', concurrency=1, retry_policy=policy(request_timeout=0.2, max_retries=1))
+    scanner.client = SimpleNamespace(models=models)
+    found = []
+
+    text = scanner._generate({'app.py': 'print(1)\n'}, lambda severity, finding: found.append((severity, finding)))
+
+    assert models.calls == 2
+    assert json.loads(text) == models.report
+    descriptions = [finding['description'] for _, finding in found]
+    # Each finding once, including the two that differ only in their line number
+    assert sorted(descriptions) == ['Hardcoded password on line 9', 'SQL injection on line 12',
+                                    'SQL injection on line 3']
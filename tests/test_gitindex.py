@@ -0,0 +1,116 @@
+import os
+import subprocess
+
+import pytest
+
+import sanches
+from gitindex import GitIndex, blob_hash, changed_since
+from sanches import Sanches
+
+FILES = {
+    'README.md': '# project\n',
+    'src/app.py': 'print("hello")\n',
+    'src/lib/util.py': 'def util():\n    return 1\n',
+    'node_modules/left-pad/index.js': 'module.exports = 1\n',
+    'package.json': '{}\n',
+}
+
+
+def git(root, *args):
+    return subprocess.run(['git', '-C', str(root), *args], capture_output=True, check=True, text=True).stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / 'repo'
+    root.mkdir()
+    git(root, 'init', '-q')
+    git(root, 'config', 'user.email', 'test@example.com')
+    git(root, 'config', 'user.name', 'Test')
+    for name, content in FILES.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        # Well before the index is written, so no entry is racily clean
+        os.utime(path, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+    (root / '.gitignore').write_text('*.log\n')
+    git(root, 'add', '-A')
+    git(root, 'commit', '-q', '-m', 'initial')
+    return root
+
+
+def test_index_entries_match_git_ls_files(repo):
+    index = GitIndex.open(str(repo / 'src'))
+    assert index is not None and index.work_tree == str(repo)
+
+    staged = {}
+    for line in git(repo, 'ls-files', '-s').splitlines():
+        info, path = line.split('\t')
+        mode, blob, _ = info.split()
+        staged[path] = (int(mode, 8), blob)
+    assert {path: (entry.mode, entry.blob) for path, entry in index.entries.items()} == staged
+
+    for name, content in FILES.items():
+        assert index.entries[name].blob == blob_hash(content.encode())
+        assert index.clean_blob(str(repo / name)) == blob_hash(content.encode())
+
+
+def test_tracked_leaves_out_what_the_walker_skips(repo):
+    index = GitIndex.open(str(repo))
+    assert index.tracked(str(repo)) == {'README.md', 'src/app.py', 'src/lib/util.py', '.gitignore'}
+    assert index.tracked(str(repo / 'src')) == {'app.py', 'lib/util.py'}
+
+
+def test_modified_file_is_not_trusted_from_the_index(repo):
+    index = GitIndex.open(str(repo))
+    app = repo / 'src' / 'app.py'
+    util = repo / 'src' / 'lib' / 'util.py'
+
+    app.write_text('print("HELLO")\n')  # same size, new mtime
+    util.write_text('def util():\n    return 2  # changed\n')
+    os.utime(util, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))  # new size, old mtime
+
+    assert index.clean_blob(str(app)) is None
+    assert index.clean_blob(str(util)) is None
+    assert index.clean_blob(str(repo / 'README.md')) == blob_hash(FILES['README.md'].encode())
+    assert index.clean_blob(str(repo / 'untracked.py')) is None
+
+
+def test_changed_since_lists_changes_and_untracked_files(repo):
+    (repo / 'src' / 'app.py').write_text('print("changed")\n')
+    (repo / 'README.md').unlink()
+    (repo / 'src' / 'new.py').write_text('x = 1\n')
+    (repo / 'debug.log').write_text('ignored\n')
+
+    assert changed_since(str(repo), 'HEAD') == sorted(
+        str(repo / name) for name in ('README.md', 'src/app.py', 'src/new.py'))
+    # Paths are relative to the directory scanned, not the work tree
+    assert changed_since(str(repo / 'src'), 'HEAD') == [str(repo / 'src' / 'app.py'), str(repo / 'src' / 'new.py')]
+
+    with pytest.raises(RuntimeError, match='git diff failed'):
+        changed_since(str(repo), 'no-such-revision')
+
+
+def test_since_scans_only_what_changed_since(repo, tmp_path, monkeypatch):
+    monkeypatch.setenv('SANCHES_CACHE_DIR', str(tmp_path / 'cache'))
+    (repo / 'src' / 'app.py').write_text('print("changed")\n')
+    calls = []
+
+    def record(root, revision):
+        calls.append((root, revision))
+        return changed_since(root, revision)
+    monkeypatch.setattr(sanches, 'changed_since', record)
+
+    class Stop(Exception):
+        pass
+
+    def read_changed(path, changed, manifest, ingestor=None):
+        calls.append(sorted(changed))
+        raise Stop
+    scanner = Sanches(api_key='x')
+    monkeypatch.setattr(scanner, 'read_changed', read_changed)
+    monkeypatch.setattr(scanner, 'check_dependencies', lambda *args: [])
+
+    with pytest.raises(Stop):
+        scanner.scan(str(repo), since='HEAD')
+    assert calls == [(str(repo), 'HEAD'), [str(repo / 'src' / 'app.py')]]
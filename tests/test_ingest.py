@@ -0,0 +1,87 @@
+from gitindex import blob_hash
+from ingest import MMAP_THRESHOLD, IngestedFile, IngestLimits, Ingestor, sniff
+
+CODE = b'def handler(request):\n    return request.args.get("q")\n' * 100
+MINIFIED = b'var a=function(b){return b+1};' * 200
+
+
+def test_sniff_categories():
+    assert sniff(CODE) is None
+    assert sniff(b'') is None
+    assert sniff(b'\x89PNG\r\n\x1a\n' + CODE) == 'binary'
+    assert sniff(CODE[:100] + b'\x00' + CODE) == 'binary'
+    assert sniff(MINIFIED) == 'minified'
+    assert sniff(b'/*! @generated by webpack */' + MINIFIED) == 'generated'
+    # Short files are never taken for minified, whatever their line length
+    assert sniff(MINIFIED[:1000]) is None
+
+
+def test_generated_code_that_reads_like_code_is_kept():
+    assert sniff(b'# Code generated by protoc-gen-go. DO NOT EDIT.\n' + CODE) is None
+
+
+def test_load_reads_small_files_and_uses_a_known_digest(tmp_path):
+    path = tmp_path / 'app.py'
+    path.write_bytes(CODE)
+    ingestor = Ingestor()
+
+    assert ingestor.load(str(path)) == IngestedFile(CODE.decode(), blob_hash(CODE), len(CODE))
+    assert ingestor.load(str(path), digest='0' * 40).digest == '0' * 40
+
+
+def test_large_files_are_read_through_mmap(tmp_path):
+    data = CODE * (MMAP_THRESHOLD // len(CODE) + 1)
+    assert len(data) > MMAP_THRESHOLD
+    path = tmp_path / 'big.py'
+    path.write_bytes(data)
+
+    loaded = Ingestor().load(str(path))
+    assert loaded == IngestedFile(data.decode(), blob_hash(data), len(data))
+
+
+def test_skip_reasons(tmp_path):
+    files = {
+        'logo.png': CODE,
+        'vendor.min.js': CODE,
+        'bundle.js': MINIFIED,
+        'latin1.py': CODE + 'café'.encode('latin-1'),
+    }
+    for name, data in files.items():
+        (tmp_path / name).write_bytes(data)
+    ingestor = Ingestor()
+
+    assert {name: ingestor.load(str(tmp_path / name)) for name in files} == {
+        'logo.png': 'binary',
+        'vendor.min.js': 'minified',
+        'bundle.js': 'minified',
+        'latin1.py': 'binary',
+    }
+    assert ingestor.load(str(tmp_path / 'missing.py')) == 'unreadable'
+
+
+def test_per_file_cap(tmp_path):
+    path = tmp_path / 'app.py'
+    path.write_bytes(CODE)
+
+    assert Ingestor(IngestLimits(max_file_bytes=len(CODE) - 1)).load(str(path)) == 'too_large'
+    assert isinstance(Ingestor(IngestLimits(max_file_bytes=len(CODE))).load(str(path)), IngestedFile)
+
+
+def test_total_cap_is_applied_on_accept(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'file{i}.py'
+        path.write_bytes(CODE)
+        paths.append(str(path))
+    ingestor = Ingestor(IngestLimits(max_total_bytes=2 * len(CODE)))
+
+    # Loads may run concurrently, so the budget is only taken when a file is accepted
+    loaded = [ingestor.load(path) for path in paths]
+    assert all(isinstance(file, IngestedFile) for file in loaded)
+    accepted = [ingestor.accept(path, file) for path, file in zip(paths, loaded)]
+
+    assert [file is not None for file in accepted] == [True, True, False]
+    assert ingestor.total_bytes == 2 * len(CODE)
+    assert ingestor.skipped == [{'file_path': paths[2], 'reason': 'total_size_limit'}]
+    # Once the budget is spent, later files are not even read
+    assert ingestor.load(paths[0]) == 'total_size_limit'
@@ -0,0 +1,92 @@
+import os
+
+import llm_cache
+from llm_cache import LLMCache
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def batch(root, *names):
+    return {os.path.join(root, name): f'// {name}\n' for name in names}
+
+
+def report(*paths):
+    return {'directory': '/somewhere', 'suggestion': [], 'warning': [],
+            'critical': [{'file_name': os.path.basename(p), 'file_path': p, 'description': f'Issue in {p}'}
+                         for p in paths]}
+
+
+def test_hit_and_miss(tmp_path):
+    cache = LLMCache(tmp_path / 'cache.sqlite3')
+    files = batch('/proj', 'src/app.js', 'src/db.js')
+
+    assert cache.get(files, 'v1', 'model') is None
+    cache.put(files, 'v1', 'model', report('/proj/src/app.js'))
+
+    assert cache.get(files, 'v1', 'model')['critical'][0]['file_path'] == '/proj/src/app.js'
+    # Another prompt version, model or file content is another entry
+    assert cache.get(files, 'v2', 'model') is None
+    assert cache.get(files, 'v1', 'other') is None
+    assert cache.get({**files, '/proj/src/app.js': 'changed'}, 'v1', 'model') is None
+    assert cache.snapshot() == {'hits': 1, 'misses': 4, 'evictions': 0}
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, 'time', clock.time)
+    cache = LLMCache(tmp_path / 'cache.sqlite3', ttl=60)
+    files = batch('/proj', 'app.js')
+    cache.put(files, 'v1', 'model', report())
+
+    clock.now += 59
+    assert cache.get(files, 'v1', 'model') is not None
+    clock.now += 2
+    assert cache.get(files, 'v1', 'model') is None
+    # The expired entry is gone, not just skipped
+    clock.now -= 2
+    assert cache.get(files, 'v1', 'model') is None
+
+
+def test_least_recently_used_entries_are_evicted_under_max_bytes(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, 'time', clock.time)
+    batches = [batch('/proj', f'file{i}.js') for i in range(3)]
+    cache = LLMCache(tmp_path / 'cache.sqlite3')
+
+    cache.put(batches[0], 'v1', 'model', report('/proj/file0.js'))
+    entry_size = cache._db.execute('SELECT size FROM llm_results').fetchone()[0]
+    cache.max_bytes = 2 * entry_size + 1
+
+    clock.now += 1
+    cache.put(batches[1], 'v1', 'model', report('/proj/file1.js'))
+    clock.now += 1
+    assert cache.get(batches[0], 'v1', 'model') is not None  # batch 1 is now the least recently used
+    clock.now += 1
+    cache.put(batches[2], 'v1', 'model', report('/proj/file2.js'))
+
+    assert cache.get(batches[1], 'v1', 'model') is None
+    assert cache.get(batches[0], 'v1', 'model') is not None
+    assert cache.get(batches[2], 'v1', 'model') is not None
+    assert cache.snapshot()['evictions'] == 1
+
+
+def test_paths_round_trip_across_checkouts(tmp_path):
+    cache = LLMCache(tmp_path / 'cache.sqlite3')
+    first = batch('/home/a/proj/src', 'app.js', 'lib/util.js')
+    second = batch('/srv/b/proj/src', 'app.js', 'lib/util.js')
+
+    cache.put(first, 'v1', 'model', report(
+        '/home/a/proj/src/lib/util.js',
+        'src/app.js',  # relative to the project, as the model sometimes reports it
+        '/etc/passwd',  # outside the batch
+    ))
+    cached = cache.get(second, 'v1', 'model')
+
+    assert [f['file_path'] for f in cached['critical']] == ['/srv/b/proj/src/lib/util.js', 'src/app.js', '/etc/passwd']
+    assert 'directory' not in cached
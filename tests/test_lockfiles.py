@@ -0,0 +1,235 @@
+import json
+
+from lockfiles import (find_lockfile, parse_lockfile, parse_package_lock, parse_pipfile_lock, parse_poetry_lock,
+                       parse_yarn_lock)
+
+
+def packages(graph):
+    """{(name, version): direct} of a parsed graph"""
+    return {(p.name, p.version): p.direct for p in graph}
+
+
+V3_LOCK = {
+    'name': 'app',
+    'lockfileVersion': 3,
+    'requires': True,
+    'packages': {
+        '': {'name': 'app', 'dependencies': {'a': '^1.0.0', '@S/B': '^2.0.0'}, 'devDependencies': {'jest': '^29'},
+             'peerDependencies': {'react': '*'}},
+        'node_modules/a': {'version': '1.2.0', 'dependencies': {'@s/b': '^1.0.0'}},
+        'node_modules/a/node_modules/@s/b': {'version': '1.5.0'},
+        'node_modules/@s/b': {'version': '2.1.0'},
+        'node_modules/jest': {'version': '29.7.0', 'dev': True},
+        'node_modules/react': {'version': '18.2.0', 'peer': True},
+        'node_modules/local': {'resolved': 'packages/local', 'link': True},
+    },
+}
+
+
+def test_package_lock_v3_line_scan(tmp_path):
+    path = tmp_path / 'package-lock.json'
+    path.write_text(json.dumps(V3_LOCK, indent=2) + '\n')
+
+    graph = parse_package_lock(path)
+
+    assert packages(graph) == {
+        ('a', '1.2.0'): True,
+        # Nested copy: found under its own name, never direct even though the root declares @s/b
+        ('@s/b', '1.5.0'): False,
+        ('@s/b', '2.1.0'): True,
+        ('jest', '29.7.0'): True,
+        # Peer dependencies of the root are not its own dependencies
+        ('react', '18.2.0'): False,
+    }
+    assert graph.packages[('a', '1.2.0')].requires == ('@s/b',)
+    # The hoisted copy wins when a name resolves to several versions
+    assert graph.versions()['@s/b'] == '2.1.0'
+
+
+def test_package_lock_minified_matches_line_scan(tmp_path):
+    pretty = tmp_path / 'pretty' / 'package-lock.json'
+    minified = tmp_path / 'minified' / 'package-lock.json'
+    pretty.parent.mkdir()
+    minified.parent.mkdir()
+    pretty.write_text(json.dumps(V3_LOCK, indent=2) + '\n')
+    minified.write_text(json.dumps(V3_LOCK))
+    assert packages(parse_package_lock(minified)) == packages(parse_package_lock(pretty))
+
+
+def test_package_lock_v1_dependency_tree(tmp_path):
+    (tmp_path / 'package.json').write_text(json.dumps({'dependencies': {'Express': '^4.0.0'}}))
+    path = tmp_path / 'package-lock.json'
+    path.write_text(json.dumps({
+        'name': 'app',
+        'lockfileVersion': 1,
+        'dependencies': {
+            'express': {'version': '4.18.2', 'requires': {'debug': '2.6.9'}, 'dependencies': {
+                'debug': {'version': '2.6.9', 'requires': {'ms': '2.0.0'}},
+            }},
+            'debug': {'version': '4.3.4'},
+            'ms': {'version': '2.0.0'},
+        },
+    }, indent=2) + '\n')
+
+    graph = parse_package_lock(path)
+
+    assert packages(graph) == {
+        ('express', '4.18.2'): True,
+        ('debug', '2.6.9'): False,
+        ('debug', '4.3.4'): False,
+        ('ms', '2.0.0'): False,
+    }
+    assert graph.packages[('express', '4.18.2')].requires == ('debug',)
+
+
+YARN_CLASSIC = '''\
+# THIS IS AN AUTOGENERATED FILE. DO NOT EDIT THIS FILE DIRECTLY.
+# yarn lockfile v1
+
+
+"@babel/core@^7.0.0", "@babel/core@^7.1.0":
+  version "7.1.2"
+  resolved "https://registry.yarnpkg.com/@babel/core/-/core-7.1.2.tgz"
+  dependencies:
+    "@babel/code-frame" "^7.0.0"
+    debug "^4.1.0"
+
+"@babel/code-frame@^7.0.0":
+  version "7.0.0"
+
+debug@^4.1.0, Debug@^4.1.1:
+  version "4.3.4"
+  optionalDependencies:
+    ms "2.1.2"
+'''
+
+YARN_BERRY = '''\
+__metadata:
+  version: 6
+  cacheKey: 8
+
+"@babel/core@npm:^7.0.0, @babel/core@npm:^7.1.0":
+  version: 7.1.2
+  resolution: "@babel/core@npm:7.1.2"
+  dependencies:
+    "@babel/code-frame": ^7.0.0
+    debug: ^4.1.0
+  languageName: node
+  linkType: hard
+
+"debug@npm:^4.1.0":
+  version: 4.3.4
+  resolution: "debug@npm:4.3.4"
+'''
+
+
+def test_yarn_lock_classic_scoped_specs(tmp_path):
+    (tmp_path / 'package.json').write_text(json.dumps({'devDependencies': {'@babel/core': '^7.1.0'}}))
+    path = tmp_path / 'yarn.lock'
+    path.write_text(YARN_CLASSIC)
+
+    graph = parse_yarn_lock(path)
+
+    assert packages(graph) == {
+        ('@babel/core', '7.1.2'): True,
+        ('@babel/code-frame', '7.0.0'): False,
+        # Spelling variants of one resolution collapse into one package
+        ('debug', '4.3.4'): False,
+    }
+    assert graph.packages[('@babel/core', '7.1.2')].requires == ('@babel/code-frame', 'debug')
+    assert graph.packages[('debug', '4.3.4')].requires == ('ms',)
+
+
+def test_yarn_lock_berry(tmp_path):
+    path = tmp_path / 'yarn.lock'
+    path.write_text(YARN_BERRY)
+
+    graph = parse_yarn_lock(path)
+
+    assert packages(graph) == {('@babel/core', '7.1.2'): False, ('debug', '4.3.4'): False}
+    assert graph.packages[('@babel/core', '7.1.2')].requires == ('@babel/code-frame', 'debug')
+
+
+POETRY_LOCK = '''\
+# This file is automatically @generated by Poetry and should not be changed by hand.
+
+[[package]]
+name = "Flask"
+version = "2.3.2"
+description = "A simple framework for building complex web applications."
+optional = false
+
+[package.dependencies]
+Werkzeug = ">=2.3.3"
+itsdangerous = ">=2.1.2"
+
+[package.extras]
+async = ["asgiref (>=3.2)"]
+
+[[package]]
+name = "werkzeug"
+version = "2.3.6"
+
+[[package]]
+name = "zope.interface"
+version = "6.0"
+
+[metadata]
+lock-version = "2.0"
+'''
+
+
+def test_poetry_lock_normalises_names_and_reads_direct_from_pyproject(tmp_path):
+    (tmp_path / 'pyproject.toml').write_text(
+        '[tool.poetry.dependencies]\npython = "^3.11"\nflask = "^2.3"\n\n'
+        '[tool.poetry.group.dev.dependencies]\nZope_Interface = "*"\n')
+    path = tmp_path / 'poetry.lock'
+    path.write_text(POETRY_LOCK)
+
+    graph = parse_poetry_lock(path)
+
+    assert packages(graph) == {
+        ('flask', '2.3.2'): True,
+        ('werkzeug', '2.3.6'): False,
+        ('zope-interface', '6.0'): True,
+    }
+    # Extras are not dependencies
+    assert graph.packages[('flask', '2.3.2')].requires == ('werkzeug', 'itsdangerous')
+
+
+def test_poetry_lock_without_pyproject_has_no_direct_packages(tmp_path):
+    path = tmp_path / 'poetry.lock'
+    path.write_text(POETRY_LOCK)
+    assert not any(p.direct for p in parse_poetry_lock(path))
+
+
+def test_pipfile_lock_collapses_duplicates(tmp_path):
+    (tmp_path / 'Pipfile').write_text('[packages]\nrequests = "*"\n\n[dev-packages]\npytest = "*"\n')
+    path = tmp_path / 'Pipfile.lock'
+    path.write_text(json.dumps({
+        '_meta': {'hash': {'sha256': 'x'}},
+        'default': {'requests': {'version': '==2.31.0'}, 'urllib3': {'version': '==2.0.4'}},
+        'develop': {'pytest': {'version': '==7.4.0'}, 'Requests': {'version': '==2.31.0'}},
+    }))
+
+    graph = parse_pipfile_lock(path)
+
+    assert packages(graph) == {
+        ('requests', '2.31.0'): True,
+        ('urllib3', '2.0.4'): False,
+        ('pytest', '7.4.0'): True,
+    }
+
+
+def test_parse_lockfile_dispatch_and_lookup(tmp_path):
+    workspace = tmp_path / 'packages' / 'web'
+    workspace.mkdir(parents=True)
+    (tmp_path / 'yarn.lock').write_text(YARN_CLASSIC)
+    (tmp_path / 'broken').mkdir()
+    (tmp_path / 'broken' / 'Pipfile.lock').write_text('{not json')
+
+    assert find_lockfile(workspace, ('package-lock.json', 'yarn.lock')) is None
+    assert find_lockfile(workspace, ('package-lock.json', 'yarn.lock'), tmp_path) == tmp_path / 'yarn.lock'
+    assert len(parse_lockfile(tmp_path / 'yarn.lock')) == 3
+    assert parse_lockfile(tmp_path / 'broken' / 'Pipfile.lock') is None
+    assert parse_lockfile(tmp_path / 'Gemfile.lock') is None
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('requests')
+
+from nvd_client import NVDClient, SlidingWindowLimiter
+
+
+class ThrottlingStub:
+    """Local NVD stand-in answering 429 with Retry-After to the first `throttle` requests"""
+
+    def __init__(self, throttle: int, retry_after: str):
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.requests = []  # (monotonic time, client port)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, so a reused session shows up as one connection
+
+            def do_GET(self):
+                stub.requests.append((time.monotonic(), self.client_address[1]))
+                if len(stub.requests) <= stub.throttle:
+                    body = b'slow down'
+                    self.send_response(429)
+                    self.send_header('Retry-After', stub.retry_after)
+                else:
+                    body = json.dumps({'vulnerabilities': []}).encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = ThrottlingStub(throttle=1, retry_after='1')
+    yield server
+    server.close()
+
+
+def test_limiter_allows_capacity_per_rolling_period():
+    limiter = SlidingWindowLimiter(3, 0.5)
+    times = []
+    for _ in range(7):
+        limiter.acquire()
+        times.append(time.monotonic())
+    # No window of one period holds more than capacity acquisitions, including the first one
+    for i in range(len(times) - 3):
+        assert times[i + 3] - times[i] >= 0.5 - 0.01
+
+
+def test_limiter_pause_delays_next_acquire():
+    limiter = SlidingWindowLimiter(10, 1.0)
+    limiter.acquire()
+    limiter.pause(0.3)
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.29
+
+
+def test_search_backs_off_on_retry_after_and_reuses_session(stub):
+    client = NVDClient(api_key='', base_url=stub.url, max_workers=1)
+    client.limiter = SlidingWindowLimiter(100, 1.0)
+
+    assert client.search('python flask') == {'vulnerabilities': []}
+    assert client.search('python django') == {'vulnerabilities': []}
+
+    assert client.stats['requests'] == 3
+    assert client.stats['retries'] == 1
+    assert client.stats['failures'] == 0
+    (throttled_at, _), (retried_at, _), _ = stub.requests
+    # Retry-After: 1 was honoured before the retry
+    assert retried_at - throttled_at >= 0.95
+    # Every request went over the same pooled connection
+    assert len({port for _, port in stub.requests}) == 1
+
+
+def test_search_gives_up_after_max_retries():
+    server = ThrottlingStub(throttle=100, retry_after='0')
+    try:
+        client = NVDClient(api_key='', base_url=server.url, max_retries=2, max_workers=1)
+        client.limiter = SlidingWindowLimiter(100, 1.0)
+        assert client.search_many(['python flask']) == {'python flask': None}
+        assert client.stats['requests'] == 3
+        assert client.stats['failures'] == 1
+    finally:
+        server.close()
@@ -0,0 +1,45 @@
+import threading
+
+import pipeline
+from ingest import Ingestor
+from pipeline import CHUNK_FILES, ingest
+
+
+class CountingIngestor(Ingestor):
+    def __init__(self):
+        super().__init__()
+        self.loaded = 0
+        self._lock = threading.Lock()
+
+    def load(self, path, digest=None):
+        with self._lock:
+            self.loaded += 1
+        return super().load(path, digest)
+
+
+def make_files(tmp_path, count, size):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f'file{i:03}.py'
+        path.write_text(f'# {i}\n' + 'x' * (size - 8) + '\n')
+        paths.append(str(path))
+    return paths
+
+
+def test_parallel_ingest_matches_serial(tmp_path):
+    paths = make_files(tmp_path, 200, 500)
+    serial = [(p, f.text if f else None) for p, f in ingest(Ingestor(), ((p, None) for p in paths), workers=1)]
+    parallel = [(p, f.text if f else None) for p, f in ingest(Ingestor(), ((p, None) for p in paths), workers=4)]
+    assert parallel == serial
+    assert [p for p, _ in parallel] == paths
+
+
+def test_window_is_bounded_by_bytes(tmp_path, monkeypatch):
+    paths = make_files(tmp_path, 320, 1000)
+    # Room for two chunks of 16 files; many more workers than that must not read further ahead
+    monkeypatch.setattr(pipeline, 'WINDOW_BYTES', 2 * CHUNK_FILES * 1000)
+    ingestor = CountingIngestor()
+    ahead = 0
+    for consumed, (path, _) in enumerate(ingest(ingestor, ((p, None) for p in paths), workers=32), 1):
+        ahead = max(ahead, ingestor.loaded - consumed)
+    assert ahead < 3 * CHUNK_FILES
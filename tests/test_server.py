@@ -0,0 +1,57 @@
+import io
+import json
+import os
+import threading
+
+import server
+from server import ScanServer
+
+
+class StubWatch:
+    """Stands in for ProjectWatch: runs until stopped"""
+
+    def __init__(self, scanner, root, on_event, debounce, lock):
+        self.root = root
+        self.lock = lock
+        self.stop_event = threading.Event()
+
+    def run(self):
+        self.stop_event.wait(5)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class StubScanner:
+    def __init__(self):
+        self.dirs = []
+
+    def scan(self, directory, **kwargs):
+        self.dirs.append(directory)
+        return {'directory': directory}
+
+
+def request(scan_server, method, **params):
+    scan_server.handle(json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}))
+
+
+def test_spellings_of_a_directory_share_lock_and_watch(tmp_path, monkeypatch):
+    project = tmp_path / 'project'
+    project.mkdir()
+    link = tmp_path / 'link'
+    link.symlink_to(project)
+    monkeypatch.setattr(server, 'ProjectWatch', StubWatch)
+    scan_server = ScanServer(lambda api_key: StubScanner(), default_api_key='x', output=io.StringIO())
+
+    spellings = [str(project), str(project) + os.sep, str(tmp_path / '.' / 'project'), str(link)]
+    assert len({id(scan_server._dir_lock(d)) for d in spellings}) == 1
+
+    for directory in spellings:
+        request(scan_server, 'watch', dir=directory)
+    assert list(scan_server._watches) == [os.path.realpath(project)]
+    watch = scan_server._watches[os.path.realpath(project)]
+    assert watch.lock is scan_server._dir_lock(str(project))
+
+    request(scan_server, 'unwatch', dir=str(link))
+    assert watch.stop_event.is_set()
+    scan_server.executor.shutdown()
@@ -0,0 +1,121 @@
+import json
+import zipfile
+
+import pytest
+
+from vulndb import VulnDB, update_vulndb, version_key
+
+
+def advisory(advisory_id, ecosystem, name, events, modified='2024-01-01T00:00:00Z', aliases=(), **extra):
+    return {
+        'id': advisory_id,
+        'modified': modified,
+        'aliases': list(aliases),
+        'summary': f'{name} is vulnerable',
+        'database_specific': {'severity': 'high'},
+        'affected': [{
+            'package': {'ecosystem': ecosystem, 'name': name},
+            'ranges': [{'type': 'ECOSYSTEM' if ecosystem == 'PyPI' else 'SEMVER', 'events': events}],
+            **extra,
+        }],
+    }
+
+
+DUMP = [
+    # Two affected ranges: [1.2.0, 1.4.1) and [2.0.0-beta.2, 2.3.0]
+    advisory('GHSA-aaaa', 'npm', 'left-pad', [
+        {'introduced': '1.2.0'}, {'fixed': '1.4.1'},
+        {'introduced': '2.0.0-beta.2'}, {'last_affected': '2.3.0'},
+    ], aliases=['CVE-2024-0001']),
+    # Every version before 0.9.0rc2, with a PyPI name that normalises
+    advisory('PYSEC-bbbb', 'PyPI', 'Flask_Login', [{'introduced': '0'}, {'fixed': '0.9.0rc2'}]),
+    # Introduced and never fixed
+    advisory('GHSA-cccc', 'npm', 'lodash', [{'introduced': '4.17.0'}]),
+    # The same CVE from another source is reported once
+    advisory('OSV-dddd', 'npm', 'left-pad', [{'introduced': '1.3.0'}, {'fixed': '1.4.0'}], aliases=['CVE-2024-0001']),
+    # Listed versions only
+    {**advisory('GHSA-eeee', 'npm', 'express', [], versions=['4.0.0', '4.1.0']), 'aliases': []},
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    dump = tmp_path / 'all.json'
+    dump.write_text(json.dumps(DUMP))
+    db = VulnDB(tmp_path / 'vulndb.sqlite3')
+    assert db.import_dump(str(dump)) == {'imported': 5, 'unchanged': 0}
+    yield db
+    db.close()
+
+
+def ids(db, ecosystem, package, version):
+    return sorted(match['id'] for match in db.lookup(ecosystem, package, version))
+
+
+@pytest.mark.parametrize('version, affected', [
+    ('1.1.9', False),
+    ('1.2.0-rc.1', False),  # A pre-release sorts before the version it leads to
+    ('1.2.0', True),  # == introduced
+    ('1.2', True),
+    ('1.4.0', True),
+    ('1.4.1-rc.1', True),
+    ('1.4.1', False),  # == fixed
+    ('1.9.9', False),
+    ('2.0.0-alpha', False),
+    ('2.0.0-beta.1', False),
+    ('2.0.0-beta.2', True),
+    ('2.0.0-beta.10', True),
+    ('2.0.0', True),
+    ('2.3.0', True),  # == last_affected
+    ('2.3.0+build.5', True),
+    ('2.3.1-rc.1', False),
+    ('2.3.1', False),
+])
+def test_range_boundaries(db, version, affected):
+    assert ids(db, 'npm', 'left-pad', version) == (['CVE-2024-0001'] if affected else [])
+
+
+def test_introduced_zero_and_pre_release_fix(db):
+    assert ids(db, 'pip', 'flask-login', '0.1') == ['PYSEC-bbbb']
+    assert ids(db, 'pip', 'Flask.Login', '0.9.0rc1') == ['PYSEC-bbbb']
+    assert ids(db, 'pip', 'flask_login', '0.9.0rc2') == []
+    assert ids(db, 'pip', 'flask-login', '0.9.0') == []
+
+
+def test_open_ended_range_and_version_lists(db):
+    assert ids(db, 'npm', 'lodash', '4.16.9') == []
+    assert ids(db, 'npm', 'lodash', '4.17.0') == ['GHSA-cccc']
+    assert ids(db, 'npm', 'lodash', '99.0.0') == ['GHSA-cccc']
+    assert ids(db, 'npm', 'express', '4.1') == ['GHSA-eeee']
+    assert ids(db, 'npm', 'express', '4.0.1') == []
+
+
+def test_unknown_version_matches_every_advisory(db):
+    assert ids(db, 'npm', 'left-pad', '') == ['CVE-2024-0001']
+    assert ids(db, 'npm', 'lodash', 'latest') == ['GHSA-cccc']
+
+
+def test_version_ordering():
+    ordered = ['1.0.0-alpha', '1.0.0-alpha.1', '1.0.0-beta', '1.0.0-rc.1', '1.0.0', '1.0.0.post1', '1.0.1', '1.10']
+    assert sorted(ordered, key=version_key) == ordered
+    assert version_key('v1.0') == version_key('1.0.0') == version_key('=1')
+    assert version_key('not-a-version') is None
+
+
+def test_only_newer_records_are_reimported(tmp_path):
+    first = [advisory('GHSA-ffff', 'npm', 'qs', [{'introduced': '0'}, {'fixed': '6.0.0'}])]
+    second = [advisory('GHSA-ffff', 'npm', 'qs', [{'introduced': '0'}, {'fixed': '6.5.0'}],
+                       modified='2024-06-01T00:00:00Z')]
+    (tmp_path / 'first.json').write_text(json.dumps(first))
+    with zipfile.ZipFile(tmp_path / 'all.zip', 'w') as archive:
+        archive.writestr('GHSA-ffff.json', json.dumps(second[0]))
+    path = tmp_path / 'vulndb.sqlite3'
+
+    assert update_vulndb([str(tmp_path / 'first.json')], path) == {'imported': 1, 'unchanged': 0}
+    assert update_vulndb([str(tmp_path / 'first.json')], path) == {'imported': 0, 'unchanged': 1}
+    assert update_vulndb([str(tmp_path / 'all.zip')], path) == {'imported': 1, 'unchanged': 0}
+
+    db = VulnDB.open_existing(path)
+    assert ids(db, 'npm', 'qs', '6.2.0') == ['GHSA-ffff']
+    db.close()
+    assert VulnDB.open_existing(tmp_path / 'missing.sqlite3') is None
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from walker import WalkStats, is_ignored, rebase_pattern, walk
+
+
+def make_tree(root, files):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+def walked(root, **kwargs):
+    return sorted(os.path.relpath(p, root).replace(os.sep, '/') for p in walk(str(root), **kwargs))
+
+
+@pytest.mark.parametrize('pattern, rel_dir, rebased', [
+    ('*.log', '', '*.log'),
+    ('/build', '', '/build'),
+    ('/build', 'web', 'web/build'),
+    ('/build/', 'web', 'web/build/'),
+    ('docs/*.md', 'web', 'web/docs/*.md'),
+    ('docs/', 'web', 'web/**/docs/'),
+    ('*.log', 'web/app', 'web/app/**/*.log'),
+    ('!keep.log', 'web', '!web/**/keep.log'),
+    ('!/dist/keep.js', 'web', '!web/dist/keep.js'),
+    ('!gen/keep.js', 'web', '!web/gen/keep.js'),
+    ('cache   ', 'web', 'web/**/cache'),
+    ('', 'web', None),
+    ('# comment', 'web', None),
+])
+def test_rebase_pattern(pattern, rel_dir, rebased):
+    assert rebase_pattern(pattern, rel_dir) == rebased
+
+
+def test_walk_applies_root_and_nested_gitignores(tmp_path):
+    make_tree(tmp_path, {
+        '.gitignore': '*.log\n!keep.log\n/out-root\n',
+        'app.py': '', 'debug.log': '', 'keep.log': '', 'package.json': '',
+        'out-root/a.py': '',
+        'node_modules/pkg/index.js': '',
+        'web/.gitignore': '/public\ngen/*.js\ncache/\n',
+        'web/index.js': '', 'web/trace.log': '', 'web/keep.log': '',
+        'web/public/bundle.js': '',
+        'web/sub/public/kept.js': '',  # /public is anchored to web/
+        'web/gen/api.js': '', 'web/gen/api.ts': '',
+        'web/sub/gen/other.js': '',  # gen/*.js has a middle slash, so it is anchored too
+        'web/sub/cache/x.js': '',
+        'web/out-root/b.py': '',  # /out-root is anchored to the project root
+    })
+
+    stats = WalkStats()
+    assert walked(tmp_path, stats=stats) == [
+        '.gitignore', 'app.py', 'keep.log',
+        'web/.gitignore', 'web/gen/api.ts', 'web/index.js', 'web/keep.log',
+        'web/out-root/b.py', 'web/sub/gen/other.js', 'web/sub/public/kept.js',
+    ]
+    assert stats.ignore_files == 2
+    assert stats.dirs_pruned == 4  # node_modules, out-root, web/public, web/sub/cache
+
+    # Single paths are judged the same way without a walk
+    for rel_path in ('debug.log', 'web/trace.log', 'web/public/bundle.js', 'web/gen/api.js', 'package.json'):
+        assert is_ignored(str(tmp_path), str(tmp_path / rel_path)), rel_path
+    for rel_path in ('keep.log', 'web/sub/public/kept.js', 'web/sub/gen/other.js', 'web/out-root/b.py'):
+        assert not is_ignored(str(tmp_path), str(tmp_path / rel_path)), rel_path
+    assert is_ignored(str(tmp_path), str(tmp_path / 'web' / 'public'), is_dir=True)
+
+
+def test_tracked_files_in_ignored_directories_are_yielded(tmp_path):
+    make_tree(tmp_path, {
+        '.gitignore': 'generated/\n*.log\n',
+        'app.py': '',
+        'generated/api/client.py': '',  # tracked before the directory was ignored
+        'generated/api/scratch.py': '',
+        'generated/other/untracked.py': '',
+        'generated/schema.py': '',
+        'build-cache/.gitignore': '*\n',
+        'build-cache/x.py': '',
+        'audit.log': '',
+        'node_modules/pkg/index.js': '',
+    })
+    tracked = {'.gitignore', 'app.py', 'generated/api/client.py', 'audit.log'}
+
+    stats = WalkStats()
+    assert walked(tmp_path, stats=stats, tracked=tracked) == [
+        '.gitignore', 'app.py', 'audit.log', 'generated/api/client.py',
+    ]
+    # Ignored directories without tracked files below them are still pruned unopened
+    assert stats.dirs_pruned == 2  # generated/other, node_modules
+
+    assert walked(tmp_path) == ['.gitignore', 'app.py']